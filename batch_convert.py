@@ -0,0 +1,175 @@
+import os
+import sys
+import glob
+import time
+import itertools
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pdf_extract import iter_rows, select_pages, DEFAULT_WORKERS
+from page_classify import parse_page_range
+from xlsx_export import select_row_columns, write_rows_streaming
+from xlsx_template import fill_template
+from table_normalize import normalize_rows
+from column_types import convert_rows
+from timing import TIMER
+
+
+def find_pdfs(inputs):
+    # Каталоги раскрываем в *.pdf, остальное считаем шаблонами glob
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, "*.pdf")
+        else:
+            pattern = item
+        matches = sorted(glob.glob(pattern))
+        found.extend(path for path in matches if path.lower().endswith(".pdf"))
+    # Убираем повторы, сохраняя порядок
+    return list(dict.fromkeys(found))
+
+
+def parse_columns(text):
+    # "1,3,5" -> [0, 2, 4]; номера столбцов как в окне программы (с единицы).
+    # Не число или номер меньше 1 — ValueError (0 иначе выбрал бы последний столбец)
+    if not text:
+        return None
+    columns = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            number = int(part)
+        except ValueError:
+            number = 0
+        if number < 1:
+            raise ValueError(f"bad column number {part!r}, columns are counted from 1")
+        columns.append(number - 1)
+    return columns
+
+
+def columns_arg(text):
+    # Тип аргумента -c/--columns: ошибка печатается argparse как ошибка командной строки
+    try:
+        return parse_columns(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def output_path_for(pdf_path, output_dir):
+    name = os.path.splitext(os.path.basename(pdf_path))[0] + ".xlsx"
+    return os.path.join(output_dir, name)
+
+
+def convert_file(pdf_path, output_dir, columns=None, engine="table", params=None, max_memory_mb=None,
+                 normalize=False, typed=False, template=None, pages=None, prefilter=False):
+    # Извлечение и экспорт одного файла; строки идут из PDF прямо в книгу,
+    # вся таблица в памяти не собирается (кроме режимов normalize и typed,
+    # где таблица обрабатывается целиком перед записью).
+    # template — (книга-шаблон, лист, ячейка): выгрузка делается копией шаблона
+    # с данными на листе начиная с этой ячейки.
+    # pages и prefilter — какие страницы извлекать (см. pdf_extract.select_pages).
+    # Возвращает (pdf, xlsx, секунды, замеры этапов)
+    TIMER.clear()
+    started = time.perf_counter()
+    pages = select_pages(pdf_path, pages, prefilter)
+    rows = iter_rows(pdf_path, engine, pages, max_memory_mb, **(params or {}))
+    if normalize:
+        rows = normalize_rows(list(rows))
+    if typed:
+        rows, _ = convert_rows(list(rows))
+    if columns is not None:
+        rows = select_row_columns(rows, columns)
+        headers = columns
+    else:
+        # Без выбора столбцов ширину узнаем по первой строке
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            raise ValueError("no tables found")
+        headers = list(range(len(first)))
+        rows = itertools.chain([first], rows)
+
+    out_path = output_path_for(pdf_path, output_dir)
+    if template is not None:
+        template_path, sheet, anchor = template
+        if fill_template(rows, template_path, out_path, sheet, anchor) == 0:
+            os.remove(out_path)
+            raise ValueError("no tables found")
+    elif write_rows_streaming(rows, out_path, headers) == 0:
+        os.remove(out_path)
+        raise ValueError("no tables found")
+    finished = time.perf_counter()
+    TIMER.add("convert_file", started, finished, file=os.path.basename(pdf_path))
+    return pdf_path, out_path, finished - started, TIMER.events
+
+
+def convert_all(pdf_paths, output_dir, columns=None, engine="table", params=None, workers=DEFAULT_WORKERS,
+                max_memory_mb=None, normalize=False, typed=False, template=None, pages=None, prefilter=False):
+    # Файлы обрабатываются параллельно, по одному на процесс.
+    # Возвращает списки успешных (pdf, xlsx, секунды) и ошибок (pdf, текст)
+    os.makedirs(output_dir, exist_ok=True)
+    done = []
+    failed = []
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(convert_file, pdf_path, output_dir, columns, engine, params, max_memory_mb, normalize,
+                        typed, template, pages, prefilter): pdf_path
+            for pdf_path in pdf_paths
+        }
+        for future in as_completed(futures):
+            pdf_path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failed.append((pdf_path, str(e)))
+                print(f"FAIL  {pdf_path}: {e}", file=sys.stderr)
+            else:
+                done.append(result[:3])
+                TIMER.extend(result[3])
+                print(f"OK    {pdf_path} -> {result[1]} ({result[2]:.2f} s)")
+    return done, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert PDF rate tables to XLSX without the GUI")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", default="output")
+    parser.add_argument("-c", "--columns", type=columns_arg, help="columns to export, e.g. 1,3,5 (default: all)")
+    parser.add_argument("--engine", choices=["table", "pymupdf", "camelot", "auto"], default="table")
+    parser.add_argument("--flavor", choices=["lattice", "stream"], default="lattice", help="camelot flavor")
+    parser.add_argument("-j", "--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--max-memory-mb", type=int, help="memory ceiling per worker process")
+    parser.add_argument("--normalize", action="store_true",
+                        help="drop repeated headers and empty rows, join rows split across pages")
+    parser.add_argument("--typed", action="store_true", help="write prices and other numbers as numeric cells")
+    parser.add_argument("--pages", help="pages to extract, e.g. 1-5,8 (default: all)")
+    parser.add_argument("--prefilter", action="store_true",
+                        help="extract only pages that look like ruled tables (saves camelot time)")
+    parser.add_argument("--template", help="fill a copy of this workbook instead of creating a new one")
+    parser.add_argument("--sheet", help="template sheet to fill (default: first)")
+    parser.add_argument("--anchor", default="A12", help="template cell where the data starts (default: A12)")
+    parser.add_argument("--trace", help="write per-file stage timings as a Chrome trace JSON")
+    args = parser.parse_args(argv)
+
+    pdf_paths = find_pdfs(args.inputs)
+    if not pdf_paths:
+        print("No PDF files found.", file=sys.stderr)
+        return 2
+
+    params = {"flavor": args.flavor, "strip_text": "\n"} if args.engine == "camelot" else {}
+    started = time.perf_counter()
+    done, failed = convert_all(
+        pdf_paths, args.output_dir, args.columns, args.engine, params, args.workers, args.max_memory_mb,
+        args.normalize, args.typed, (args.template, args.sheet, args.anchor) if args.template else None,
+        parse_page_range(args.pages), args.prefilter
+    )
+    print(f"{len(done)} converted, {len(failed)} failed in {time.perf_counter() - started:.2f} s")
+    if args.trace:
+        TIMER.dump_chrome_trace(args.trace)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+from bench_utils import peak_rss_mb
+
+
+# Способы экспорта, которые сравниваем
+PATHS = ("write_table", "write_table_streaming")
+
+
+def make_rows(num_rows):
+    # Строки, похожие на расценки: шифр, наименование, единица, цена
+    units = ["шт", "м", "м2", "м3", "т", "компл"]
+    return [
+        [f"{i // 1000:02d}-{i % 1000:03d}", f"Работа по расценке номер {i}", units[i % len(units)], f"{i * 1.37:.2f}"]
+        for i in range(num_rows)
+    ]
+
+
+def run_one(path_name, num_rows):
+    # Один замер в отдельном процессе, чтобы пиковая память не смешивалась
+    import pandas as pd
+    import xlsx_export
+
+    df = pd.DataFrame(make_rows(num_rows))
+    baseline = peak_rss_mb()
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, "bench.xlsx")
+        started = time.perf_counter()
+        getattr(xlsx_export, path_name)(df, file_path)
+        elapsed = time.perf_counter() - started
+        size = os.path.getsize(file_path)
+    return {
+        "path": path_name,
+        "rows": num_rows,
+        "seconds": round(elapsed, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "rss_before_export_mb": round(baseline, 1),
+        "file_bytes": size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare XLSX export paths: time and peak RSS")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--run", choices=PATHS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_one(args.run, args.rows)))
+        return
+
+    for path_name in PATHS:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run", path_name, "--rows", str(args.rows)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
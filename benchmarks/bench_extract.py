@@ -0,0 +1,189 @@
+import os
+import re
+import sys
+import json
+import glob
+import time
+import argparse
+import subprocess
+from datetime import datetime
+from collections import Counter
+
+from bench_utils import ROOT, peak_rss_mb
+
+
+# PDF, который лежит в репозитории, и проверенные вручную выгрузки из него
+DEFAULT_PDF = os.path.join(ROOT, "Расценки по шифрам.pdf")
+REFERENCE_PATTERN = os.path.join(ROOT, "*Расценки*.xlsx")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Способы извлечения из скриптов: имя -> (движок, параметры, только первая таблица)
+PATHS = {
+    "pdfplumber_first_table": ("table", {}, True),    # Выбор и перенос 2.py
+    "pdfplumber_table": ("table", {}, False),         # Выбор и перенос 3.py
+    "pdfplumber_tables": ("tables", {}, False),       # Выбор и перенос.py
+    "camelot_lattice": ("camelot", {"flavor": "lattice", "strip_text": "\n"}, False),  # с Camelot
+    "pymupdf": ("pymupdf", {}, False),
+    "auto": ("auto", {}, False),
+}
+
+
+def normalize_cell(value):
+    # Единый вид значения для сравнения: пробелы и переносы схлопнуты,
+    # числа приведены к одному виду ("73,40" и 73.4 совпадают)
+    if value is None:
+        return ""
+    text = re.sub(r"\s+", " ", str(value)).strip()
+    if re.fullmatch(r"-?[\d ]+([.,]\d+)?", text):
+        number = float(text.replace(" ", "").replace(",", "."))
+        text = str(int(number)) if number.is_integer() else repr(number).replace(".", ",")
+    return text
+
+
+def load_reference(file_path):
+    # Строки эталонной книги без пустых ячеек; первая строка — номера столбцов
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True)
+    rows = []
+    for row in workbook.active.iter_rows(values_only=True):
+        cells = [normalize_cell(value) for value in row]
+        cells = [cell for cell in cells if cell]
+        if cells:
+            rows.append(cells)
+    workbook.close()
+    return rows
+
+
+def score(extracted_rows, reference_rows):
+    # Доля ячеек эталона, найденных среди извлеченных, и доля строк эталона,
+    # все ячейки которых нашлись в одной извлеченной строке
+    extracted = [[normalize_cell(value) for value in row] for row in extracted_rows]
+    extracted_cells = Counter(cell for row in extracted for cell in row if cell)
+    reference_cells = Counter(cell for row in reference_rows for cell in row)
+    matched_cells = sum((extracted_cells & reference_cells).values())
+
+    # Индекс: значение ячейки -> номера извлеченных строк с ним
+    rows_by_cell = {}
+    for i, row in enumerate(extracted):
+        for cell in row:
+            if cell:
+                rows_by_cell.setdefault(cell, set()).add(i)
+    matched_rows = 0
+    for row in reference_rows:
+        candidates = None
+        for cell in row:
+            found = rows_by_cell.get(cell, set())
+            candidates = found if candidates is None else candidates & found
+            if not candidates:
+                break
+        if candidates:
+            matched_rows += 1
+
+    total_cells = sum(reference_cells.values())
+    return {
+        "cell_recall": round(matched_cells / total_cells, 4) if total_cells else None,
+        "row_recall": round(matched_rows / len(reference_rows), 4) if reference_rows else None,
+    }
+
+
+def run_path(name, pdf_path):
+    # Один способ извлечения в текущем процессе: время, задержка по страницам, память
+    from pdf_extract import iter_pages, to_rows
+
+    engine, params, first_only = PATHS[name]
+    rows = []
+    page_seconds = []
+    started = time.perf_counter()
+    page_started = started
+    for first, last, part in iter_pages(pdf_path, engine, 1, **params):
+        now = time.perf_counter()
+        page_seconds.append(round(now - page_started, 4))
+        page_started = now
+        part_rows = to_rows(part, engine)
+        rows.extend(part_rows)
+        if first_only and part_rows:
+            break
+    wall = time.perf_counter() - started
+
+    accuracy = {}
+    for reference_path in sorted(glob.glob(REFERENCE_PATTERN)):
+        accuracy[os.path.basename(reference_path)] = score(rows, load_reference(reference_path))
+
+    return {
+        "path": name,
+        "engine": engine,
+        "rows": len(rows),
+        "pages": len(page_seconds),
+        "wall_seconds": round(wall, 3),
+        "page_seconds_mean": round(sum(page_seconds) / len(page_seconds), 4) if page_seconds else None,
+        "page_seconds_max": max(page_seconds) if page_seconds else None,
+        "page_seconds": page_seconds,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "accuracy": accuracy,
+    }
+
+
+def compare(current, previous):
+    # Печать изменений относительно прошлого прогона
+    old = {result["path"]: result for result in previous["results"]}
+    for result in current["results"]:
+        before = old.get(result["path"])
+        if before is None or "error" in result or "error" in before:
+            continue
+        line = f"{result['path']:<24} time {before['wall_seconds']:>8.2f} -> {result['wall_seconds']:>8.2f} s"
+        line += f"   rss {before['peak_rss_mb']:>7.1f} -> {result['peak_rss_mb']:>7.1f} MB"
+        for reference, values in result["accuracy"].items():
+            old_values = before["accuracy"].get(reference)
+            if old_values and old_values["cell_recall"] != values["cell_recall"]:
+                line += f"   {reference}: {old_values['cell_recall']} -> {values['cell_recall']}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speed and accuracy of extraction paths on the bundled PDF")
+    parser.add_argument("--pdf", default=DEFAULT_PDF)
+    parser.add_argument("--paths", default=",".join(PATHS), help="comma-separated subset of: " + ", ".join(PATHS))
+    parser.add_argument("--output", help="JSON file for results (default: benchmarks/results/extract-<time>.json)")
+    parser.add_argument("--compare", help="previous results JSON to compare with")
+    parser.add_argument("--run", choices=list(PATHS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_path(args.run, args.pdf), ensure_ascii=False))
+        return 0
+
+    results = []
+    for name in args.paths.split(","):
+        # Каждый способ — в отдельном процессе, чтобы пиковая память не смешивалась
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run", name, "--pdf", args.pdf],
+            capture_output=True, text=True, encoding="utf-8"
+        )
+        if completed.returncode != 0:
+            result = {"path": name, "error": completed.stderr.strip().splitlines()[-1:]}
+        else:
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+        results.append(result)
+        print(json.dumps({key: value for key, value in result.items() if key != "page_seconds"}, ensure_ascii=False))
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "pdf": os.path.basename(args.pdf),
+        "python": sys.version.split()[0],
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"extract-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+    return 1 if any("error" in result for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
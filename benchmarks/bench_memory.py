@@ -0,0 +1,96 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+from bench_utils import peak_rss_mb
+
+
+# Способы хранения извлеченной таблицы, которые сравниваем
+LAYOUTS = ("rows", "frame", "columnar")
+
+
+def make_rows(num_rows):
+    # Строки, похожие на расценки: шифр, наименование, единица, цена, примечание
+    units = ["шт", "м", "м2", "м3", "т", "компл"]
+    return [
+        [f"ФЕР-{i // 1000:02d}-{i % 1000:03d}", f"Работа по расценке номер {i % 2000}", units[i % len(units)],
+         f"{i * 1.37:.2f}".replace(".", ","), "" if i % 7 else "Применяется с коэффициентом"]
+        for i in range(num_rows)
+    ]
+
+
+def build(layout, rows):
+    # Таблица в том виде, в каком ее держит окно после извлечения
+    if layout == "rows":
+        from column_types import convert_rows
+
+        return convert_rows(rows)[0]
+    if layout == "frame":
+        import pandas as pd
+        from column_types import convert_types
+
+        return convert_types(pd.DataFrame(rows))[0]
+    from columnar import ColumnarTable
+
+    return ColumnarTable.from_rows(rows)
+
+
+def run_one(layout, num_rows):
+    # Один замер в отдельном процессе, чтобы пиковая память не смешивалась
+    import gc
+    import tracemalloc
+
+    import pandas  # noqa: F401 — импорт библиотек не входит в замер
+
+    build(layout, make_rows(10))
+    baseline = peak_rss_mb()
+    # Исходные строки учитываются тоже: таблица может ссылаться на их значения
+    tracemalloc.start()
+    rows = make_rows(num_rows)
+    started = time.perf_counter()
+    table = build(layout, rows)
+    elapsed = time.perf_counter() - started
+    del rows
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    count = sum(1 for _ in (table.iter_rows() if layout == "columnar" else table.itertuples() if layout == "frame" else table))
+    scan = time.perf_counter() - started
+    return {
+        "layout": layout,
+        "rows": num_rows,
+        "build_seconds": round(elapsed, 3),
+        "scan_seconds": round(scan, 3),
+        "held_mb": round(held / (1024 * 1024), 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "rss_before_build_mb": round(baseline, 1),
+        "scanned_rows": count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare in-memory table layouts: memory held and build/scan time")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--run", choices=LAYOUTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_one(args.run, args.rows)))
+        return
+
+    for layout in LAYOUTS:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run", layout, "--rows", str(args.rows)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
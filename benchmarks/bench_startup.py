@@ -0,0 +1,61 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import subprocess
+from statistics import median
+
+from bench_utils import ROOT
+
+
+SCRIPTS = (
+    "Выбор и перенос.py",
+    "Выбор и перенос 2.py",
+    "Выбор и перенос 3.py",
+    "Выбор и перенос с Camelot.py",
+)
+
+
+def measure(script, runs, offscreen):
+    # Запуск окна до первой отрисовки: время процесса целиком и время,
+    # которое окно сообщило само (от начала скрипта до показа)
+    env = dict(os.environ, PDF_APP_EXIT_AFTER_START="1")
+    if offscreen:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+    process_seconds = []
+    shown_seconds = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, os.path.join(ROOT, script)],
+            cwd=ROOT, env=env, capture_output=True, text=True, encoding="utf-8"
+        )
+        process_seconds.append(time.perf_counter() - started)
+        if completed.returncode != 0:
+            return {"script": script, "error": completed.stderr.strip().splitlines()[-1:]}
+        match = re.search(r"Window shown in ([\d.]+) s", completed.stdout)
+        if match:
+            shown_seconds.append(float(match.group(1)))
+    return {
+        "script": script,
+        "runs": runs,
+        "process_seconds_median": round(median(process_seconds), 3),
+        "window_shown_seconds_median": round(median(shown_seconds), 3) if shown_seconds else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start time of the GUI scripts")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--scripts", nargs="*", default=list(SCRIPTS))
+    parser.add_argument("--offscreen", action="store_true", help="use the offscreen Qt platform (no display)")
+    args = parser.parse_args()
+
+    for script in args.scripts:
+        print(json.dumps(measure(script, args.runs, args.offscreen), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import os
+import sys
+
+# Корень репозитория, чтобы замеры импортировали модули программы
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def peak_rss_mb():
+    # Пиковое потребление памяти текущим процессом, МБ
+    try:
+        import resource
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдает КБ, macOS — байты
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
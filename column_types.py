@@ -0,0 +1,82 @@
+from timing import TIMER
+from table_normalize import code_mask
+
+
+# Число в расценках: "1 234,56", "-12.5", "7"; пробелы — разделители тысяч
+NUMBER_PATTERN = r"-?\d+(?:[.,]\d+)?"
+
+# Доля непустых ячеек, начиная с которой столбец считается числовым или шифрами
+# (шапка и подписи в столбце не должны мешать)
+KIND_SHARE = 0.8
+
+# По скольким строкам определяем тип столбца
+KIND_SAMPLE = 2000
+
+
+def as_text(column):
+    return column.fillna("").astype(str).str.strip()
+
+
+def parse_numbers(column):
+    # Весь столбец разом: убираем пробелы, запятую меняем на точку;
+    # что не похоже на число — NaN
+    import pandas as pd
+
+    text = as_text(column).str.replace(" ", "", regex=False).str.replace("\xa0", "", regex=False)
+    valid = text.str.fullmatch(NUMBER_PATTERN).fillna(False).astype(bool)
+    return pd.to_numeric(text.where(valid).str.replace(",", ".", regex=False), errors="coerce")
+
+
+def infer_kinds(df):
+    # Тип каждого столбца по первым KIND_SAMPLE строкам: "number", "code" или "text".
+    # Цикл только по столбцам, значения проверяются операциями над столбцом
+    kinds = {}
+    sample = df.head(KIND_SAMPLE)
+    for column in sample.columns:
+        text = as_text(sample[column])
+        filled = text.ne("")
+        total = int(filled.sum())
+        if total == 0:
+            kinds[column] = "text"
+        elif parse_numbers(text)[filled].notna().sum() >= KIND_SHARE * total:
+            kinds[column] = "number"
+        elif code_mask(text[filled]).sum() >= KIND_SHARE * total:
+            kinds[column] = "code"
+        else:
+            kinds[column] = "text"
+    return kinds
+
+
+def convert_types(df, kinds=None):
+    # DataFrame со строками -> (DataFrame с типами, типы столбцов).
+    # Числовой столбец становится float64; если в нем есть нечисловые ячейки
+    # (шапка), они остаются текстом, а остальные значения — числами.
+    # У шифров убираются пробелы, текст не меняется
+    import pandas as pd
+
+    with TIMER.stage("convert_types", rows=len(df)):
+        kinds = kinds or infer_kinds(df)
+        columns = {}
+        for column in df.columns:
+            values = df[column]
+            kind = kinds.get(column, "text")
+            if kind == "number":
+                numbers = parse_numbers(values)
+                text = as_text(values)
+                leftover = numbers.isna() & text.ne("")
+                columns[column] = numbers if not leftover.any() else numbers.astype(object).where(~leftover, text)
+            elif kind == "code":
+                columns[column] = as_text(values).str.replace(" ", "", regex=False)
+            else:
+                columns[column] = values
+        return pd.DataFrame(columns, index=df.index), kinds
+
+
+def convert_rows(rows):
+    # То же для списка строк (pdfplumber, PyMuPDF): числа становятся float
+    import pandas as pd
+
+    if not rows:
+        return [], {}
+    df, kinds = convert_types(pd.DataFrame(rows))
+    return df.astype(object).where(df.notna(), None).to_numpy().tolist(), kinds
@@ -0,0 +1,164 @@
+import sys
+
+from column_types import infer_kinds, parse_numbers, as_text, convert_types
+from timing import TIMER
+
+
+# Сколько строк собирается за раз при построчном чтении
+ROW_BLOCK = 4096
+
+
+class TextColumn:
+    # Текстовый столбец со словарным кодированием: каждое значение хранится
+    # один раз, в строках — только его номер (единицы измерения, разделы
+    # и пустые ячейки повторяются тысячи раз)
+
+    def __init__(self, codes, values):
+        import numpy as np
+
+        self.codes = codes
+        self.values = values
+        # Словарь массивом для выборки блоков по номерам; столбец после
+        # построения не меняется, массив строится один раз
+        self._lookup = np.asarray(values, dtype=object)
+
+    @classmethod
+    def from_series(cls, series):
+        import numpy as np
+        import pandas as pd
+
+        # Номер 0 — пустая ячейка (None), значения словаря — с 1
+        codes, uniques = pd.factorize(series.astype(object))
+        codes = (codes + 1).astype(np.min_scalar_type(len(uniques) + 1))
+        values = [sys.intern(value) if isinstance(value, str) else value for value in uniques]
+        return cls(codes, [None] + values)
+
+    def get(self, row):
+        return self.values[self.codes[row]]
+
+    def block(self, start, end):
+        return self._lookup[self.codes[start:end]].tolist()
+
+    def nbytes(self):
+        return self.codes.nbytes + self._lookup.nbytes + sum(sys.getsizeof(value) for value in self.values if value is not None)
+
+
+class NumberColumn:
+    # Числовой столбец: массив float64 (пустая ячейка — NaN). Редкие нечисловые
+    # ячейки (шапка) хранятся отдельно по номеру строки
+
+    def __init__(self, numbers, overrides):
+        self.numbers = numbers
+        self.overrides = overrides
+
+    @classmethod
+    def from_series(cls, series):
+        import numpy as np
+        import pandas as pd
+
+        if pd.api.types.is_numeric_dtype(series.dtype):
+            # Столбец уже переведен в числа (convert_types)
+            return cls(series.to_numpy(dtype=np.float64), {})
+        # Числа берем как есть, разбираем только строки
+        is_text = series.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool)
+        numbers = pd.to_numeric(series.where(~is_text), errors="coerce").to_numpy(dtype=np.float64, copy=True)
+        overrides = {}
+        if is_text.any():
+            text = as_text(series[is_text])
+            parsed = parse_numbers(text).to_numpy(dtype=np.float64)
+            numbers[is_text] = parsed
+            leftover = np.isnan(parsed) & text.ne("").to_numpy()
+            overrides = dict(zip(np.flatnonzero(is_text)[leftover].tolist(), text[leftover].tolist()))
+        return cls(numbers, overrides)
+
+    def get(self, row):
+        if row in self.overrides:
+            return self.overrides[row]
+        value = self.numbers[row]
+        return None if value != value else float(value)
+
+    def block(self, start, end):
+        import numpy as np
+
+        numbers = self.numbers[start:end]
+        values = np.where(np.isnan(numbers), None, numbers.astype(object)).tolist()
+        for row, text in self.overrides.items():
+            if start <= row < end:
+                values[row - start] = text
+        return values
+
+    def nbytes(self):
+        return self.numbers.nbytes + sum(sys.getsizeof(text) for text in self.overrides.values())
+
+
+class ColumnarTable:
+    # Извлеченная таблица по столбцам вместо списка строк: числа — в массивах
+    # float64, текст — номера в словаре значений. Модель таблицы, поиск
+    # и экспорт читают ее напрямую
+
+    def __init__(self, columns, row_count):
+        self.columns = columns
+        self.row_count = row_count
+
+    @classmethod
+    def from_frame(cls, df, kinds=None):
+        # kinds — типы столбцов, как у infer_kinds; None — определить по данным,
+        # {} — все столбцы текстом
+        with TIMER.stage("build_columnar", rows=len(df)):
+            if kinds is None:
+                kinds = infer_kinds(df)
+            columns = []
+            for column in df.columns:
+                series = df[column].reset_index(drop=True)
+                if kinds.get(column) == "number":
+                    columns.append(NumberColumn.from_series(series))
+                else:
+                    columns.append(TextColumn.from_series(series))
+            return cls(columns, len(df))
+
+    @classmethod
+    def from_rows(cls, rows, typed=True):
+        # Список строк (pdfplumber, PyMuPDF); typed — числа переводятся
+        # из текста, как в convert_rows, иначе все ячейки остаются текстом
+        import pandas as pd
+
+        df = pd.DataFrame(list(rows))
+        if not typed:
+            return cls.from_frame(df, {})
+        return cls.from_frame(*convert_types(df))
+
+    @property
+    def shape(self):
+        return self.row_count, len(self.columns)
+
+    def __len__(self):
+        return self.row_count
+
+    def cell(self, row, column):
+        return self.columns[column].get(row)
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += self.row_count
+        if not 0 <= row < self.row_count:
+            raise IndexError(row)
+        return [column.get(row) for column in self.columns]
+
+    def iter_rows(self, columns=None):
+        # Строки списками; columns — номера выбранных столбцов (для экспорта).
+        # Столбцы разворачиваются блоками, вся таблица строками не собирается
+        selected = [self.columns[i] if i < len(self.columns) else None
+                    for i in (columns if columns is not None else range(len(self.columns)))]
+        for start in range(0, self.row_count, ROW_BLOCK):
+            end = min(start + ROW_BLOCK, self.row_count)
+            blocks = [column.block(start, end) if column is not None else [None] * (end - start)
+                      for column in selected]
+            for row in zip(*blocks):
+                yield list(row)
+
+    def __iter__(self):
+        return self.iter_rows()
+
+    def nbytes(self):
+        # Примерный объем данных в памяти, байт
+        return sum(column.nbytes() for column in self.columns)
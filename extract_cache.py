@@ -0,0 +1,169 @@
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+import time
+import zlib
+
+
+# Каталог и предельный размер кэша по умолчанию
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".pdf_table_cache")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_ENTRY_SUFFIX = ".bin"
+
+# Как часто (в секундах) перечитывать размер каталога: записи других
+# процессов в памяти этого процесса не видны
+RESCAN_INTERVAL = 60.0
+
+
+def file_hash(file_path):
+    # Хэш содержимого PDF: переименование или перенос файла не сбрасывает кэш
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    # Кэш результатов извлечения на диске: одна запись на страницу,
+    # ключ — хэш PDF и номер страницы (или отпечаток страницы и None),
+    # движок и его параметры.
+    # Записи хранятся как сжатый pickle, при превышении лимита
+    # удаляются давно не использованные (LRU по времени изменения файла).
+    # Каталог могут делить несколько процессов (окна, служба, пакетная
+    # конвертация): запись атомарна, размер каталога перечитывается с диска
+    # раз в RESCAN_INTERVAL и перед удалением записей.
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._sizes = None
+        self._scanned_at = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(pdf_hash, page, engine, params):
+        raw = json.dumps([pdf_hash, page, engine, params], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + _ENTRY_SUFFIX)
+
+    def _scan(self):
+        # (время изменения, ключ, размер) всех записей на диске; запись,
+        # удаленную другим процессом во время обхода, пропускаем
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(_ENTRY_SUFFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, entry.name[:-len(_ENTRY_SUFFIX)], stat.st_size))
+        return entries
+
+    def _load_index(self, entries=None):
+        # Размеры записей ведем в памяти и время от времени сверяем с диском
+        if entries is None and (self._sizes is None or time.monotonic() - self._scanned_at > RESCAN_INTERVAL):
+            entries = self._scan()
+        if entries is not None:
+            self._sizes = {key: size for _, key, size in entries}
+            self._scanned_at = time.monotonic()
+        return self._sizes
+
+    def contains(self, pdf_hash, page, engine, params):
+        # Проверка без чтения записи и без учета в статистике
+        return os.path.exists(self._path(self.make_key(pdf_hash, page, engine, params)))
+
+    def get(self, pdf_hash, page, engine, params):
+        # Возвращает (True, значение) при попадании и (False, None) при промахе
+        key = self.make_key(pdf_hash, page, engine, params)
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.loads(zlib.decompress(f.read()))
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError):
+            self.misses += 1
+            return False, None
+        # Отмечаем запись как недавно использованную (ее мог уже удалить
+        # другой процесс — значение прочитано, это не ошибка)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return True, value
+
+    def put(self, pdf_hash, page, engine, params, value):
+        key = self.make_key(pdf_hash, page, engine, params)
+        path = self._path(key)
+        payload = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        # Свой временный файл у каждого писателя: одну страницу могут
+        # записывать одновременно несколько процессов
+        try:
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError:
+            # Не записалось (диск, права, файл занят в Windows) — страница
+            # просто останется не закэшированной
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        sizes = self._load_index()
+        sizes[key] = len(payload)
+        self._evict()
+
+    def _evict(self):
+        if sum(self._load_index().values()) <= self.max_bytes:
+            return
+
+        # Перед удалением перечитываем каталог целиком: другие процессы
+        # могли уже удалить записи или добавить свои
+        entries = self._scan()
+        sizes = self._load_index(entries)
+        total = sum(sizes.values())
+
+        # Удаляем самые давно использованные записи, пока не уложимся в лимит
+        entries.sort()
+        for _, key, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            total -= sizes.pop(key)
+            self.evictions += 1
+
+    def clear(self):
+        for key in list(self._load_index()):
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+        self._sizes = {}
+
+    def stats(self):
+        sizes = self._load_index()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(sizes),
+            "bytes": sum(sizes.values()),
+        }
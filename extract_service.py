@@ -0,0 +1,726 @@
+import os
+import sys
+import csv
+import io
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import hashlib
+import tempfile
+import importlib
+from functools import partial
+from collections import deque
+from urllib.parse import urlsplit, parse_qs, urlencode
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from pdf_extract import (
+    DEFAULT_WORKERS, PAGE_CHUNK, ENGINES, count_pages, page_fingerprints, select_pages, extract_page_results_timed,
+    to_rows, _chunks, _merge
+)
+from page_classify import parse_page_range, format_page_range
+from extract_cache import ExtractionCache, DEFAULT_CACHE_DIR
+from timing import TIMER
+
+
+# Локальная служба извлечения: окна и скрипты отдают ей PDF по HTTP, а она
+# извлекает таблицы общим пулом процессов, в которых библиотеки уже
+# загружены. Страницы берутся из общего кэша, если их уже кто-то извлекал.
+#
+#   POST   /jobs                  PDF в теле запроса (или JSON {"path": ...},
+#                                 только файлы .pdf), параметры в строке
+#                                 запроса: engine, flavor, pages, prefilter
+#   GET    /jobs/<id>             состояние задания
+#   GET    /jobs/<id>/chunks      готовые диапазоны страниц, ?start=N — с N-го
+#   GET    /jobs/<id>/result      таблица: ?format=json|csv|xlsx, columns=1,3,5,
+#                                 normalize=1, typed=1
+#   DELETE /jobs/<id>             отменить задание
+#   GET    /status                очередь, занятые процессы, счетчики
+
+# Служба слушает только этот компьютер: по JSON {"path": ...} она читает
+# PDF с его диска, открывать ее в сеть нельзя
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_URL = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+# Адрес службы для окон и скриптов, если не задан явно
+SERVICE_URL_ENV = "PDF_EXTRACT_SERVICE"
+
+# Сколько документов извлекается одновременно и сколько ждет в очереди
+DEFAULT_MAX_JOBS = 2
+DEFAULT_MAX_QUEUE = 32
+# Предельный размер загружаемого PDF
+MAX_UPLOAD_MB = 200
+# Сколько хранится готовое задание, с
+JOB_TTL = 3600.0
+
+# Библиотеки, которые процессы пула загружают заранее
+WARM_MODULES = ("pdfplumber", "fitz", "pandas", "camelot")
+
+# Размер куска при отдаче файла
+SEND_BLOCK = 64 * 1024
+
+# Как часто клиент спрашивает состояние задания, пока ждет его окончания, с
+CLIENT_POLL_INTERVAL = 0.5
+
+# Сколько последних замеров этапов хранит служба (работает неделями)
+TIMER_EVENTS = 100_000
+
+_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            409: "Conflict", 411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error",
+            503: "Service Unavailable"}
+
+
+def is_pdf_file(file_path):
+    # Файл .pdf, который начинается как PDF (как у загрузки в save_upload)
+    if not file_path.lower().endswith(".pdf") or not os.path.isfile(file_path):
+        return False
+    try:
+        with open(file_path, "rb") as f:
+            return f.read(4) == b"%PDF"
+    except OSError:
+        return False
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def warm_worker():
+    # Выполняется в каждом процессе пула при запуске
+    for name in WARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+def ping():
+    return None
+
+
+def engine_params(engine, flavor=None):
+    # Параметры движка как у окна Camelot и batch_convert
+    if engine == "camelot":
+        return {"flavor": flavor or "lattice", "strip_text": "\n"}
+    return {}
+
+
+def json_value(value):
+    # NaN (пустая числовая ячейка) в JSON — null
+    return None if isinstance(value, float) and value != value else value
+
+
+class Job:
+    # Одно задание: документ, параметры и готовые диапазоны страниц
+
+    def __init__(self, file_path, engine, params, pages=None, prefilter=False, upload=False):
+        self.id = uuid.uuid4().hex[:12]
+        self.file_path = file_path
+        self.engine = engine
+        self.params = params
+        self.pages = pages
+        self.prefilter = prefilter
+        # Загруженный файл удаляется вместе с заданием
+        self.upload = upload
+        self.status = "queued"
+        self.error = None
+        self.pages_total = 0
+        self.pages_done = 0
+        self.cache_hits = 0
+        # (первая страница, последняя страница, строки) в порядке страниц
+        self.chunks = []
+        self.created = time.time()
+        self._perf_created = time.perf_counter()
+        self.started = None
+        self.finished = None
+        self.task = None
+        self.done = asyncio.Event()
+
+    def rows(self):
+        for _, _, rows in self.chunks:
+            yield from rows
+
+    def describe(self):
+        now = self.finished or time.time()
+        return {
+            "id": self.id,
+            "status": self.status,
+            "file": os.path.basename(self.file_path) if not self.upload else None,
+            "engine": self.engine,
+            "pages_total": self.pages_total,
+            "pages_done": self.pages_done,
+            "cache_hits": self.cache_hits,
+            "chunks": len(self.chunks),
+            "rows": sum(len(rows) for _, _, rows in self.chunks),
+            "error": self.error,
+            "queued_seconds": round((self.started or now) - self.created, 3),
+            "seconds": round(now - self.started, 3) if self.started else None,
+        }
+
+
+class ExtractionService:
+    # Очередь заданий и общий пул процессов. Одновременно идет не больше
+    # max_jobs документов; страницы каждого уходят в пул кусками по
+    # PAGE_CHUNK, вперед — не больше двух кусков на процесс
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_jobs=DEFAULT_MAX_JOBS, max_queue=DEFAULT_MAX_QUEUE,
+                 cache_dir=DEFAULT_CACHE_DIR, upload_dir=None):
+        self.workers = max(1, workers)
+        self.max_jobs = max(1, max_jobs)
+        self.max_queue = max_queue
+        self.cache = ExtractionCache(cache_dir) if cache_dir else None
+        self.upload_dir = upload_dir or tempfile.mkdtemp(prefix="pdf_service_")
+        self.jobs = {}
+        self.pool = None
+        self.slots = None
+        self.started = time.time()
+        self.counters = {"submitted": 0, "done": 0, "failed": 0, "cancelled": 0, "rejected": 0, "pages": 0}
+        TIMER.max_events = TIMER_EVENTS
+
+    async def start_pool(self):
+        # Процессы запускаются сразу и загружают библиотеки до первого задания
+        self.slots = asyncio.Semaphore(self.max_jobs)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_worker)
+        loop = asyncio.get_running_loop()
+        with TIMER.stage("warm_pool", workers=self.workers):
+            await asyncio.gather(*(loop.run_in_executor(self.pool, ping) for _ in range(self.workers)))
+
+    def close(self):
+        for job in self.jobs.values():
+            if job.task is not None:
+                job.task.cancel()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def queued(self):
+        return sum(1 for job in self.jobs.values() if job.status == "queued")
+
+    def submit(self, job):
+        if self.queued() >= self.max_queue:
+            self.counters["rejected"] += 1
+            if job.upload:
+                self._remove_upload(job)
+            raise HttpError(503, f"queue is full ({self.max_queue} jobs), try again later")
+        self.jobs[job.id] = job
+        self.counters["submitted"] += 1
+        job.task = asyncio.get_running_loop().create_task(self._run(job))
+        return job
+
+    def cancel(self, job):
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+
+    async def _run(self, job):
+        try:
+            async with self.slots:
+                job.status = "running"
+                job.started = time.time()
+                await self._extract(job)
+            job.status = "done"
+            self.counters["done"] += 1
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            self.counters["cancelled"] += 1
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e) or type(e).__name__
+            self.counters["failed"] += 1
+            print(f"Job {job.id} failed: {job.error}", file=sys.stderr)
+        finally:
+            job.finished = time.time()
+            job.done.set()
+            if job.upload:
+                self._remove_upload(job)
+            TIMER.add("service_job", job._perf_created, time.perf_counter(), job=job.id, status=job.status)
+
+    async def _extract(self, job):
+        fingerprints = None
+        if self.cache is not None:
+            fingerprints = await asyncio.to_thread(page_fingerprints, job.file_path)
+            num_pages = len(fingerprints)
+        else:
+            num_pages = await asyncio.to_thread(count_pages, job.file_path)
+        pages = await asyncio.to_thread(select_pages, job.file_path, job.pages, job.prefilter)
+        numbers = list(range(1, num_pages + 1)) if pages is None else [n for n in pages if 1 <= n <= num_pages]
+        job.pages_total = len(numbers)
+
+        groups = deque(_chunks(numbers, PAGE_CHUNK))
+        pending = deque()
+        try:
+            while groups or pending:
+                while groups and len(pending) < self.workers * 2:
+                    group = groups.popleft()
+                    pending.append((group, asyncio.ensure_future(self._extract_group(job, group, fingerprints))))
+                group, future = pending.popleft()
+                rows = await future
+                job.chunks.append((group[0], group[-1], rows))
+                job.pages_done += len(group)
+                self.counters["pages"] += len(group)
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    async def _extract_group(self, job, numbers, fingerprints):
+        # Страницы из кэша берутся сразу, остальные — в пул. Записи кэша
+        # небольшие, читаются и пишутся прямо в цикле событий
+        found = {}
+        missing = []
+        for number in numbers:
+            hit, value = (False, None)
+            if fingerprints is not None:
+                hit, value = self.cache.get(fingerprints[number - 1], None, job.engine, job.params)
+            if hit:
+                found[number] = value
+                job.cache_hits += 1
+            else:
+                missing.append(number)
+        if missing:
+            loop = asyncio.get_running_loop()
+            call = partial(extract_page_results_timed, job.file_path, job.engine, missing, **job.params)
+            # Процесс пула упал (например, нехватка памяти): пул пересоздается
+            # (один раз на все задания, которые были в старом), и страницы
+            # пробуются еще раз в новом. Повторное падение — ошибка задания
+            for attempt in range(2):
+                pool = self.pool
+                try:
+                    fresh, events = await loop.run_in_executor(pool, call)
+                    TIMER.extend(events)
+                    break
+                except BrokenProcessPool:
+                    if pool is self.pool:
+                        self._restart_pool()
+                    if attempt:
+                        raise RuntimeError(
+                            f"worker process crashed twice on pages {format_page_range(missing)}"
+                        ) from None
+            for number, value in zip(missing, fresh):
+                found[number] = value
+                if fingerprints is not None:
+                    self.cache.put(fingerprints[number - 1], None, job.engine, job.params, value)
+        return to_rows(_merge(found[number] for number in numbers), job.engine)
+
+    def _restart_pool(self):
+        broken, self.pool = self.pool, ProcessPoolExecutor(max_workers=self.workers, initializer=warm_worker)
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def save_upload(self, body):
+        # Загруженный PDF сохраняется под хэшем содержимого
+        if not body.startswith(b"%PDF"):
+            raise HttpError(400, "request body is not a PDF")
+        name = hashlib.sha256(body).hexdigest()[:16] + "-" + uuid.uuid4().hex[:6] + ".pdf"
+        file_path = os.path.join(self.upload_dir, name)
+        with open(file_path, "wb") as f:
+            f.write(body)
+        return file_path
+
+    @staticmethod
+    def _remove_upload(job):
+        try:
+            os.remove(job.file_path)
+        except OSError:
+            pass
+
+    def forget_old_jobs(self):
+        now = time.time()
+        for job_id in [job.id for job in self.jobs.values() if job.finished and now - job.finished > JOB_TTL]:
+            del self.jobs[job_id]
+
+    def status(self):
+        return {
+            "workers": self.workers,
+            "max_jobs": self.max_jobs,
+            "max_queue": self.max_queue,
+            "queued": self.queued(),
+            "running": sum(1 for job in self.jobs.values() if job.status == "running"),
+            **self.counters,
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "uptime_seconds": round(time.time() - self.started),
+        }
+
+
+async def read_request(reader):
+    # Разбор запроса HTTP/1.1: (метод, путь, параметры, заголовки, тело)
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "bad request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if "chunked" in headers.get("transfer-encoding", ""):
+        raise HttpError(411, "send the file with Content-Length")
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise HttpError(400, f"bad Content-Length {headers.get('content-length')!r}")
+    if length > MAX_UPLOAD_MB * 1024 * 1024:
+        raise HttpError(413, f"file is larger than {MAX_UPLOAD_MB} MB")
+    body = await reader.readexactly(length) if length else b""
+    url = urlsplit(target)
+    query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+    return method.upper(), url.path.rstrip("/") or "/", query, headers, body
+
+
+def _head(status, content_type, extra=None):
+    lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}", f"Content-Type: {content_type}", "Connection: close"]
+    lines += [f"{name}: {value}" for name, value in (extra or {}).items()]
+    return ("\r\n".join(lines) + "\r\n").encode("latin-1")
+
+
+def json_body(data):
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+async def send_json(writer, status, data, body=None):
+    # body — уже готовое тело ответа (собранное вне цикла событий)
+    if body is None:
+        body = json_body(data)
+    writer.write(_head(status, "application/json; charset=utf-8", {"Content-Length": len(body)}) + b"\r\n" + body)
+    await writer.drain()
+
+
+async def send_stream(writer, content_type, blocks, filename=None):
+    # Ответ частями (chunked): таблица уходит клиенту по мере сборки. Каждый
+    # блок собирается в потоке (JSON, CSV, чтение файла), цикл событий в это
+    # время обслуживает другие запросы
+    extra = {"Transfer-Encoding": "chunked"}
+    if filename:
+        extra["Content-Disposition"] = f'attachment; filename="{filename}"'
+    writer.write(_head(200, content_type, extra) + b"\r\n")
+    blocks = iter(blocks)
+    while True:
+        block = await asyncio.to_thread(next, blocks, None)
+        if block is None:
+            break
+        if block:
+            writer.write(f"{len(block):x}\r\n".encode("latin-1") + block + b"\r\n")
+            await writer.drain()
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+def json_blocks(rows, rows_per_block=500):
+    yield b"["
+    first = True
+    block = []
+    for row in rows:
+        block.append(json.dumps([json_value(value) for value in row], ensure_ascii=False))
+        if len(block) >= rows_per_block:
+            yield (("" if first else ",") + ",".join(block)).encode("utf-8")
+            first = False
+            block = []
+    if block:
+        yield (("" if first else ",") + ",".join(block)).encode("utf-8")
+    yield b"]"
+
+
+def csv_blocks(rows, rows_per_block=500):
+    # UTF-8 с BOM: Excel открывает такой CSV с кириллицей без вопросов
+    buffer = io.StringIO()
+    buffer.write("﻿")
+    writer = csv.writer(buffer)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([json_value(value) for value in row])
+        if count % rows_per_block == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def file_blocks(file_path):
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(SEND_BLOCK), b""):
+            yield block
+
+
+def result_rows(job, query):
+    # Строки задания с обработкой, заказанной в запросе
+    from batch_convert import parse_columns
+    from xlsx_export import select_row_columns
+
+    try:
+        columns = parse_columns(query.get("columns"))
+    except ValueError as e:
+        raise HttpError(400, str(e))
+    rows = job.rows()
+    if query.get("normalize") in ("1", "true"):
+        from table_normalize import normalize_rows
+
+        rows = normalize_rows(list(rows))
+    if query.get("typed") in ("1", "true"):
+        from column_types import convert_rows
+
+        rows, _ = convert_rows(list(rows))
+    return (rows if columns is None else select_row_columns(rows, columns)), columns
+
+
+def write_xlsx(job, query, file_path):
+    from xlsx_export import write_rows_streaming
+
+    rows, columns = result_rows(job, query)
+    if columns is None:
+        rows = list(rows)
+        columns = list(range(max((len(row) for row in rows), default=0)))
+    write_rows_streaming(rows, file_path, columns)
+
+
+class ServiceServer:
+    # HTTP-часть: разбор запросов и ответы
+
+    def __init__(self, service):
+        self.service = service
+
+    async def handle(self, reader, writer):
+        try:
+            request = await read_request(reader)
+            if request is not None:
+                await self.route(writer, *request)
+        except HttpError as e:
+            await send_json(writer, e.status, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            print(f"Request failed: {e}", file=sys.stderr)
+            try:
+                await send_json(writer, 500, {"error": str(e)})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    def job(self, job_id):
+        job = self.service.jobs.get(job_id)
+        if job is None:
+            raise HttpError(404, f"no job {job_id}")
+        return job
+
+    async def route(self, writer, method, path, query, headers, body):
+        self.service.forget_old_jobs()
+        parts = path.strip("/").split("/")
+        if path == "/status" and method == "GET":
+            await send_json(writer, 200, self.service.status())
+        elif path == "/jobs" and method == "POST":
+            job = self.create_job(query, headers, body)
+            await send_json(writer, 202, job.describe())
+        elif path == "/jobs" and method == "GET":
+            await send_json(writer, 200, [job.describe() for job in self.service.jobs.values()])
+        elif len(parts) == 2 and parts[0] == "jobs" and method == "GET":
+            job = self.job(parts[1])
+            if query.get("wait") in ("1", "true"):
+                await job.done.wait()
+            await send_json(writer, 200, job.describe())
+        elif len(parts) == 2 and parts[0] == "jobs" and method == "DELETE":
+            job = self.job(parts[1])
+            self.service.cancel(job)
+            await send_json(writer, 200, {"id": job.id, "status": "cancelling" if not job.done.is_set() else job.status})
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "chunks" and method == "GET":
+            try:
+                start = int(query.get("start", 0))
+            except ValueError:
+                start = -1
+            if start < 0:
+                raise HttpError(400, f"bad start {query.get('start')!r}")
+            await self.send_chunks(writer, self.job(parts[1]), start)
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "result" and method == "GET":
+            await self.send_result(writer, self.job(parts[1]), query)
+        elif parts[0] in ("jobs", "status"):
+            raise HttpError(405, f"{method} is not supported for {path}")
+        else:
+            raise HttpError(404, f"unknown path {path}")
+
+    def create_job(self, query, headers, body):
+        engine = query.get("engine", "table")
+        if engine not in ENGINES:
+            raise HttpError(400, f"unknown engine {engine!r}, choose from {', '.join(sorted(ENGINES))}")
+        try:
+            pages = parse_page_range(query.get("pages"))
+        except ValueError:
+            raise HttpError(400, f"bad page range {query.get('pages')!r}")
+        prefilter = query.get("prefilter") in ("1", "true")
+
+        if headers.get("content-type", "").startswith("application/json"):
+            # Путь к файлу на этом же компьютере — без копирования
+            file_path = json.loads(body.decode("utf-8") or "{}").get("path")
+            if not isinstance(file_path, str) or not is_pdf_file(file_path):
+                raise HttpError(400, f"not a PDF file: {file_path}")
+            upload = False
+        elif body:
+            file_path = self.service.save_upload(body)
+            upload = True
+        else:
+            raise HttpError(400, "send a PDF in the request body or JSON {\"path\": ...}")
+        job = Job(file_path, engine, engine_params(engine, query.get("flavor")), pages, prefilter, upload)
+        return self.service.submit(job)
+
+    async def send_chunks(self, writer, job, start):
+        # Для окна программы: состояние и новые диапазоны страниц с номера start;
+        # ответ собирается в потоке
+        def build(describe, ready):
+            chunks = [
+                {"first": first, "last": last, "rows": [[json_value(value) for value in row] for row in rows]}
+                for first, last, rows in ready
+            ]
+            return json_body({**describe, "start": start, "items": chunks})
+
+        body = await asyncio.to_thread(build, job.describe(), job.chunks[start:])
+        await send_json(writer, 200, None, body)
+
+    async def send_result(self, writer, job, query):
+        if query.get("wait", "1") in ("1", "true"):
+            await job.done.wait()
+        if job.status != "done":
+            raise HttpError(409, f"job is {job.status}" + (f": {job.error}" if job.error else ""))
+        output = query.get("format", "json")
+        if output == "json":
+            rows, _ = await asyncio.to_thread(result_rows, job, query)
+            await send_stream(writer, "application/json; charset=utf-8", json_blocks(rows))
+        elif output == "csv":
+            rows, _ = await asyncio.to_thread(result_rows, job, query)
+            await send_stream(writer, "text/csv; charset=utf-8", csv_blocks(rows), f"{job.id}.csv")
+        elif output == "xlsx":
+            file_path = os.path.join(self.service.upload_dir, f"{job.id}-{uuid.uuid4().hex[:6]}.xlsx")
+            try:
+                await asyncio.to_thread(write_xlsx, job, query, file_path)
+                await send_stream(
+                    writer, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    file_blocks(file_path), f"{job.id}.xlsx"
+                )
+            finally:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+        else:
+            raise HttpError(400, f"unknown format {output!r}, choose json, csv or xlsx")
+
+
+class ServiceClient:
+    # Обращение к службе из окна программы и скриптов (только стандартная библиотека)
+
+    def __init__(self, url=None, timeout=30.0):
+        self.url = (url or os.environ.get(SERVICE_URL_ENV) or DEFAULT_URL).rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method, path, body=None, content_type=None, query=None):
+        from urllib.request import Request, urlopen
+        from urllib.error import HTTPError
+
+        url = self.url + path + ("?" + urlencode(query) if query else "")
+        request = Request(url, data=body, method=method)
+        if content_type:
+            request.add_header("Content-Type", content_type)
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return response.read()
+        except HTTPError as e:
+            try:
+                message = json.loads(e.read().decode("utf-8")).get("error")
+            except ValueError:
+                message = None
+            raise RuntimeError(f"service: {message or e}") from None
+
+    def _json(self, method, path, **kwargs):
+        return json.loads(self._request(method, path, **kwargs).decode("utf-8"))
+
+    def submit(self, file_path, engine="table", pages=None, prefilter=False, flavor=None, send_file=True):
+        # Новое задание; send_file=False — служба читает файл по пути сама
+        query = {"engine": engine}
+        if pages:
+            query["pages"] = ",".join(str(number) for number in pages)
+        if prefilter:
+            query["prefilter"] = "1"
+        if flavor:
+            query["flavor"] = flavor
+        if send_file:
+            with open(file_path, "rb") as f:
+                body = f.read()
+            return self._json("POST", "/jobs", body=body, content_type="application/pdf", query=query)
+        body = json.dumps({"path": os.path.abspath(file_path)}).encode("utf-8")
+        return self._json("POST", "/jobs", body=body, content_type="application/json", query=query)
+
+    def job(self, job_id, wait=False, timeout=None):
+        if wait:
+            return self.wait(job_id, timeout)
+        return self._json("GET", f"/jobs/{job_id}")
+
+    def wait(self, job_id, timeout=None):
+        # Ждем окончания задания короткими запросами состояния: долгий сборник
+        # не упирается в таймаут сокета. timeout — общий предел ожидания, с
+        # (None — без предела)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            state = self._json("GET", f"/jobs/{job_id}")
+            if state["status"] not in ("queued", "running"):
+                return state
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"job {job_id} is still {state['status']} after {timeout} s")
+            time.sleep(CLIENT_POLL_INTERVAL)
+
+    def chunks(self, job_id, start=0):
+        return self._json("GET", f"/jobs/{job_id}/chunks", query={"start": start})
+
+    def cancel(self, job_id):
+        return self._json("DELETE", f"/jobs/{job_id}")
+
+    def result(self, job_id, output="json", columns=None, normalize=False, typed=False, timeout=None):
+        # Готовая таблица: список строк (json) или содержимое файла (csv, xlsx).
+        # Сначала дожидаемся задания (см. wait), потом забираем результат
+        self.wait(job_id, timeout)
+        query = {"format": output, "wait": "0"}
+        if columns is not None:
+            query["columns"] = ",".join(str(column + 1) for column in columns)
+        if normalize:
+            query["normalize"] = "1"
+        if typed:
+            query["typed"] = "1"
+        data = self._request("GET", f"/jobs/{job_id}/result", query=query)
+        return json.loads(data.decode("utf-8")) if output == "json" else data
+
+    def status(self):
+        return self._json("GET", "/status")
+
+
+async def serve(host, port, service):
+    await service.start_pool()
+    server = await asyncio.start_server(ServiceServer(service).handle, host, port)
+    print(f"Serving on http://{host}:{port}, {service.workers} worker(s), up to {service.max_jobs} job(s) at a time")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local PDF table extraction service with a shared worker pool")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("-j", "--workers", type=int, default=DEFAULT_WORKERS, help="extraction processes kept warm")
+    parser.add_argument("--max-jobs", type=int, default=DEFAULT_MAX_JOBS, help="documents extracted at the same time")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE, help="jobs waiting before new ones are refused")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="per-page results shared with the GUI")
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args(argv)
+
+    service = ExtractionService(args.workers, args.max_jobs, args.max_queue, None if args.no_cache else args.cache_dir)
+    try:
+        asyncio.run(serve(args.host, args.port, service))
+    except KeyboardInterrupt:
+        print("Stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import time
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from pdf_extract import count_pages, iter_pages, select_pages
+from timing import TIMER
+
+
+class ExtractionWorker(QThread):
+    # Результат очередного диапазона страниц (строки или таблицы)
+    rows_ready = pyqtSignal(list)
+    # Первая и последняя страница диапазона, приходит перед его rows_ready
+    range_ready = pyqtSignal(int, int)
+    # Обработано страниц, всего страниц
+    progress = pyqtSignal(int, int)
+    # Текст ошибки
+    failed = pyqtSignal(str)
+    # Страницы, которые пойдут в извлечение (после разметки или по списку)
+    pages_selected = pyqtSignal(list)
+
+    def __init__(self, file_path, engine="table", workers=1, params=None, cache=None, parent=None,
+                 pages=None, prefilter=False):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.engine = engine
+        self.workers = workers
+        self.params = params or {}
+        self.cache = cache
+        self.pages = pages
+        self.prefilter = prefilter
+
+    def cancel(self):
+        self.requestInterruption()
+
+    def run(self):
+        try:
+            total = count_pages(self.file_path)
+            self.progress.emit(0, total)
+            selected = select_pages(self.file_path, self.pages, self.prefilter)
+            if selected is not None:
+                self.pages_selected.emit(selected)
+            pages = self.iter_results(total, selected)
+            started = time.perf_counter()
+            for first, last, part in pages:
+                TIMER.add("extract_pages", started, time.perf_counter(), first=first, last=last)
+                # Отмена проверяется между страницами
+                if self.isInterruptionRequested():
+                    pages.close()
+                    break
+                if part:
+                    self.range_ready.emit(first, last)
+                    self.rows_ready.emit(part)
+                self.progress.emit(last, total)
+                started = time.perf_counter()
+        except Exception as e:
+            self.failed.emit(str(e))
+
+    def iter_results(self, total, selected):
+        return iter_pages(
+            self.file_path, self.engine, self.workers, num_pages=total, cache=self.cache, pages=selected,
+            **self.params
+        )
+
+
+class RetuneWorker(ExtractionWorker):
+    # Повторное извлечение с другими настройками таблиц pdfplumber: разметка
+    # страниц берется из кэша, заново выполняется только сборка таблиц.
+    # Строки приходят списками; all_tables — все таблицы страницы, а не одна
+    def __init__(self, file_path, settings, all_tables=False, workers=1, cache=None, parent=None, pages=None):
+        super().__init__(file_path, "layout", workers, cache=cache, parent=parent, pages=pages)
+        self.settings = settings
+        self.all_tables = all_tables
+
+    def iter_results(self, total, selected):
+        from layout_cache import iter_retuned
+
+        return iter_retuned(self.file_path, self.settings, self.all_tables, self.workers, self.cache, selected)
+
+
+class ServiceExtractionWorker(QThread):
+    # То же, что ExtractionWorker, но извлекает локальная служба
+    # (extract_service.py): окно отправляет PDF и забирает готовые диапазоны
+    # страниц. Строки приходят уже списками, для любого движка
+    rows_ready = pyqtSignal(list)
+    range_ready = pyqtSignal(int, int)
+    progress = pyqtSignal(int, int)
+    failed = pyqtSignal(str)
+    pages_selected = pyqtSignal(list)
+
+    # Как часто спрашивать службу о готовых страницах, мс
+    POLL_MS = 300
+
+    def __init__(self, file_path, engine="table", url=None, parent=None, pages=None, prefilter=False, flavor=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.engine = engine
+        self.url = url
+        self.pages = pages
+        self.prefilter = prefilter
+        self.flavor = flavor
+
+    def cancel(self):
+        self.requestInterruption()
+
+    def run(self):
+        from extract_service import ServiceClient
+
+        client = ServiceClient(self.url)
+        try:
+            job_id = client.submit(self.file_path, self.engine, self.pages, self.prefilter, self.flavor)["id"]
+            start = 0
+            while True:
+                if self.isInterruptionRequested():
+                    client.cancel(job_id)
+                    break
+                state = client.chunks(job_id, start)
+                for item in state["items"]:
+                    if item["rows"]:
+                        self.range_ready.emit(item["first"], item["last"])
+                        self.rows_ready.emit(item["rows"])
+                start += len(state["items"])
+                self.progress.emit(state["pages_done"], state["pages_total"])
+                if state["status"] == "done":
+                    break
+                if state["status"] in ("failed", "cancelled"):
+                    self.failed.emit(state["error"] or f"job {state['status']}")
+                    break
+                self.msleep(self.POLL_MS)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class SessionWorker(QThread):
+    # Несколько документов на общем пуле процессов (session.py)
+    # Документ, [(страница, строки), ...] — по порядку страниц документа
+    pages_ready = pyqtSignal(int, list)
+    # Документ завершен: "" — успешно, иначе текст ошибки
+    document_finished = pyqtSignal(int, str)
+    progress = pyqtSignal(int, int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, file_paths, engine="table", workers=1, params=None, cache=None, parent=None):
+        super().__init__(parent)
+        self.file_paths = file_paths
+        self.engine = engine
+        self.workers = workers
+        self.params = params or {}
+        self.cache = cache
+
+    def cancel(self):
+        self.requestInterruption()
+
+    def run(self):
+        from session import ExtractionSession
+
+        session = ExtractionSession(self.file_paths, self.engine, self.workers, self.cache, **self.params)
+        results = session.iter_results()
+        try:
+            for kind, index, payload in results:
+                if self.isInterruptionRequested():
+                    results.close()
+                    break
+                if kind == "pages":
+                    self.pages_ready.emit(index, payload)
+                else:
+                    self.document_finished.emit(index, payload)
+                self.progress.emit(session.pages_done, session.pages_total)
+        except Exception as e:
+            self.failed.emit(str(e))
@@ -0,0 +1,94 @@
+import time
+
+from pdf_extract import CHAR_KEYS, EDGE_KEYS, iter_pages
+from timing import TIMER
+
+
+# Повторная сборка таблиц с другими настройками pdfplumber. Дорогая часть
+# извлечения — разбор страницы (символы, линии); он делается один раз
+# движком "layout" и лежит в кэше страниц. Смена настроек заново выполняет
+# только сборку таблицы по сохраненным символам и линиям.
+
+# Настройки TableSettings pdfplumber, которые можно менять в окне
+TABLE_SETTINGS = {
+    "vertical_strategy": "lines",
+    "horizontal_strategy": "lines",
+    "snap_tolerance": 3.0,
+    "join_tolerance": 3.0,
+    "edge_min_length": 3.0,
+    "intersection_tolerance": 3.0,
+    "text_x_tolerance": 3.0,
+    "text_y_tolerance": 3.0,
+}
+
+STRATEGIES = ("lines", "lines_strict", "text")
+
+
+def _unpack(rows, keys):
+    return [dict(zip(keys, row)) for row in rows]
+
+
+class LayoutPage:
+    # Страница, восстановленная из разметки: отдает сборщику таблиц
+    # pdfplumber (TableFinder) то же, что настоящая страница — символы,
+    # отрезки линий, слова и рамку
+
+    def __init__(self, layout):
+        self.page_number = layout["page"]
+        self.bbox = layout["bbox"]
+        self.chars = _unpack(layout["chars"], CHAR_KEYS)
+        self.edges = _unpack(layout["edges"], EDGE_KEYS)
+
+    def extract_words(self, **kwargs):
+        from pdfplumber import utils
+
+        return utils.extract_words(self.chars, **kwargs)
+
+    def find_tables(self, table_settings=None):
+        from pdfplumber.table import TableFinder, TableSettings
+
+        return TableFinder(self, TableSettings.resolve(table_settings)).tables
+
+    def extract_tables(self, table_settings=None):
+        from pdfplumber.table import TableSettings
+
+        settings = TableSettings.resolve(table_settings)
+        return [table.extract(**(settings.text_settings or {})) for table in self.find_tables(settings)]
+
+    def extract_table(self, table_settings=None):
+        # Самая большая таблица страницы, как у pdfplumber Page.extract_table
+        from pdfplumber.table import TableSettings
+
+        settings = TableSettings.resolve(table_settings)
+        tables = self.find_tables(settings)
+        if not tables:
+            return None
+        largest = min(tables, key=lambda table: (-len(table.cells), table.bbox[1], table.bbox[0]))
+        return largest.extract(**(settings.text_settings or {}))
+
+
+def layout_rows(layout, settings=None, all_tables=False):
+    # Строки таблицы страницы: одной (как движок "table") или всех ("tables")
+    with TIMER.stage("assemble_table", page=layout["page"]):
+        page = LayoutPage(layout)
+        if all_tables:
+            return [row for table in page.extract_tables(settings) for row in table]
+        return page.extract_table(settings) or []
+
+
+def layouts_to_rows(layouts, settings=None, all_tables=False):
+    rows = []
+    for layout in layouts:
+        rows.extend(layout_rows(layout, settings, all_tables))
+    return rows
+
+
+def iter_retuned(file_path, settings=None, all_tables=False, workers=1, cache=None, pages=None):
+    # То же, что iter_pages, но таблицы собираются из разметки страниц:
+    # (первая страница, последняя страница, строки). Разметка берется из
+    # кэша, недостающие страницы разбираются один раз
+    started = time.perf_counter()
+    for first, last, layouts in iter_pages(file_path, "layout", workers, cache=cache, pages=pages):
+        TIMER.add("load_layouts", started, time.perf_counter(), first=first, last=last)
+        yield first, last, layouts_to_rows(layouts, settings, all_tables)
+        started = time.perf_counter()
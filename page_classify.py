@@ -0,0 +1,107 @@
+from timing import TIMER
+
+
+# Быстрая предварительная разметка страниц по векторной графике и тексту PDF,
+# без растеризации: дорогой извлекатель (Camelot lattice) получает только
+# страницы, на которых есть таблица с линиями.
+
+# Толщина, до которой прямоугольник считается линией, пт
+LINE_WIDTH = 2.0
+
+# Сколько горизонтальных и вертикальных линий нужно для таблицы с линейкой
+MIN_HORIZONTAL = 3
+MIN_VERTICAL = 2
+
+# Виды страниц
+RULED = "ruled"      # таблица с линиями
+TEXT = "text"        # текст без таблицы (титул, примечания)
+SCANNED = "scanned"  # только картинка, текста нет
+BLANK = "blank"      # пустая страница
+
+
+def count_rules(page):
+    # Горизонтальные и вертикальные линии страницы: отрезки и тонкие
+    # прямоугольники; у обычного прямоугольника (рамка ячейки) — по две каждого
+    horizontal = vertical = 0
+    for path in page.get_drawings():
+        for item in path["items"]:
+            if item[0] == "l":
+                start, end = item[1], item[2]
+                if abs(start.y - end.y) <= LINE_WIDTH:
+                    horizontal += 1
+                elif abs(start.x - end.x) <= LINE_WIDTH:
+                    vertical += 1
+            elif item[0] == "re":
+                rect = item[1]
+                if rect.height <= LINE_WIDTH:
+                    horizontal += 1
+                elif rect.width <= LINE_WIDTH:
+                    vertical += 1
+                else:
+                    horizontal += 2
+                    vertical += 2
+    return horizontal, vertical
+
+
+def classify_page(page):
+    # Вид страницы и то, по чему он определен
+    words = len(page.get_text("words"))
+    horizontal, vertical = count_rules(page)
+    if horizontal >= MIN_HORIZONTAL and vertical >= MIN_VERTICAL:
+        kind = RULED
+    elif words:
+        kind = TEXT
+    elif page.get_images():
+        kind = SCANNED
+    else:
+        kind = BLANK
+    return {"page": page.number + 1, "kind": kind, "words": words,
+            "horizontal": horizontal, "vertical": vertical}
+
+
+def classify_pages(file_path, pages=None):
+    # Разметка страниц документа (нумерация с 1); pages — только эти страницы
+    import fitz as pymupdf  # PyMuPDF
+
+    result = []
+    with pymupdf.open(file_path) as doc:
+        numbers = pages if pages is not None else range(1, doc.page_count + 1)
+        for number in numbers:
+            with TIMER.stage("classify_page", page=number):
+                result.append(classify_page(doc[number - 1]))
+    return result
+
+
+def table_pages(file_path, pages=None):
+    # Номера страниц с таблицами с линиями
+    return [item["page"] for item in classify_pages(file_path, pages) if item["kind"] == RULED]
+
+
+def parse_page_range(text):
+    # "1-5, 8" -> [1, 2, 3, 4, 5, 8]; пустая строка — None (все страницы)
+    if not text or not text.strip():
+        return None
+    numbers = []
+    for part in text.replace(" ", "").split(","):
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            numbers.extend(range(int(first), int(last) + 1))
+        else:
+            numbers.append(int(part))
+    return sorted(set(numbers))
+
+
+def format_page_range(numbers):
+    # [1, 2, 3, 5] -> "1-3, 5"
+    parts = []
+    numbers = sorted(numbers)
+    i = 0
+    while i < len(numbers):
+        j = i
+        while j + 1 < len(numbers) and numbers[j + 1] == numbers[j] + 1:
+            j += 1
+        parts.append(str(numbers[i]) if i == j else f"{numbers[i]}-{numbers[j]}")
+        i = j + 1
+    return ", ".join(parts)
@@ -0,0 +1,226 @@
+import time
+from collections import OrderedDict
+
+from PyQt6.QtCore import Qt, QThread, QMutex, QWaitCondition, pyqtSignal
+from PyQt6.QtGui import QImage, QPixmap
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QScrollArea
+
+from timing import TIMER
+
+
+# Масштаб миниатюры (показывается сразу) и полного изображения страницы
+THUMB_ZOOM = 0.35
+FULL_ZOOM = 1.5
+
+# Сколько отрисованных изображений держим в памяти
+PIXMAP_CACHE_SIZE = 48
+
+# Сколько найденных страниц для диапазонов (кусков) помним
+LOCATED_CACHE_SIZE = 1024
+
+
+class PageRenderer(QThread):
+    # Фоновая отрисовка страниц PyMuPDF. Выполняется только последний запрос:
+    # при быстрой прокрутке промежуточные страницы пропускаются
+
+    # Путь к PDF, номер страницы (с 1), масштаб, изображение
+    rendered = pyqtSignal(str, int, float, QImage)
+    # Страница, найденная для запроса (по тексту в диапазоне страниц)
+    located = pyqtSignal(int, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._mutex = QMutex()
+        self._condition = QWaitCondition()
+        self._request = None
+        self._stopped = False
+        self._doc = None
+        self._doc_path = None
+
+    def request(self, request_id, file_path, first, last, needle, cached):
+        # Новый запрос заменяет еще не начатый; cached — уже отрисованные
+        # (страница, масштаб), их не рисуем
+        self._mutex.lock()
+        self._request = (request_id, file_path, first, last, needle, cached)
+        self._condition.wakeOne()
+        self._mutex.unlock()
+
+    def stop(self):
+        self._mutex.lock()
+        self._stopped = True
+        self._condition.wakeOne()
+        self._mutex.unlock()
+        self.wait()
+
+    def _take(self):
+        self._mutex.lock()
+        while self._request is None and not self._stopped:
+            self._condition.wait(self._mutex)
+        request, self._request = self._request, None
+        stopped = self._stopped
+        self._mutex.unlock()
+        return None if stopped else request
+
+    def _superseded(self):
+        self._mutex.lock()
+        newer = self._request is not None or self._stopped
+        self._mutex.unlock()
+        return newer
+
+    def _open(self, file_path):
+        import fitz as pymupdf  # PyMuPDF
+
+        if self._doc_path != file_path:
+            if self._doc is not None:
+                self._doc.close()
+            self._doc = pymupdf.open(file_path)
+            self._doc_path = file_path
+        return self._doc
+
+    def run(self):
+        while True:
+            request = self._take()
+            if request is None:
+                break
+            request_id, file_path, first, last, needle, cached = request
+            try:
+                doc = self._open(file_path)
+                page_number = self._locate(doc, first, last, needle)
+                self.located.emit(request_id, page_number)
+                for zoom in (THUMB_ZOOM, FULL_ZOOM):
+                    if (page_number, zoom) in cached:
+                        continue
+                    if self._superseded():
+                        break
+                    self.rendered.emit(file_path, page_number, zoom, self._render(doc, page_number, zoom))
+            except Exception as e:
+                print(f"Preview error: {e}")
+        if self._doc is not None:
+            self._doc.close()
+
+    @staticmethod
+    def _locate(doc, first, last, needle):
+        # В диапазоне страниц (при параллельном извлечении строки приходят
+        # кусками по несколько страниц) ищем ту, где есть текст строки
+        if needle and last > first:
+            for number in range(first, last + 1):
+                if doc[number - 1].search_for(needle):
+                    return number
+        return first
+
+    @staticmethod
+    def _render(doc, page_number, zoom):
+        import fitz as pymupdf  # PyMuPDF
+
+        started = time.perf_counter()
+        pixmap = doc[page_number - 1].get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+        image = QImage(pixmap.samples, pixmap.width, pixmap.height, pixmap.stride, QImage.Format.Format_RGB888).copy()
+        TIMER.add("render_page", started, time.perf_counter(), page=page_number, zoom=zoom)
+        return image
+
+
+class PagePreview(QWidget):
+    # Панель предпросмотра страницы PDF для выбранной строки таблицы.
+    # Сначала показывается миниатюра, затем полное изображение; готовые
+    # изображения хранятся в LRU-кэше, повторный показ — без отрисовки
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.caption = QLabel("", self)
+        layout.addWidget(self.caption)
+        self.image_label = QLabel(self)
+        self.image_label.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignHCenter)
+        self.scroll = QScrollArea(self)
+        self.scroll.setWidget(self.image_label)
+        self.scroll.setWidgetResizable(True)
+        layout.addWidget(self.scroll)
+
+        self.file_path = None
+        self.current = None
+        self._request_id = 0
+        self._request_key = None
+        self._cache = OrderedDict()
+        # (файл, first, last, текст) -> найденная в диапазоне страница
+        self._located = OrderedDict()
+        self.renderer = PageRenderer(self)
+        self.renderer.rendered.connect(self.on_rendered)
+        self.renderer.located.connect(self.on_located)
+        self.renderer.start()
+
+    def set_document(self, file_path):
+        self.file_path = file_path
+        self.current = None
+        self.caption.setText("")
+        self.image_label.clear()
+
+    def show_pages(self, first, last=None, needle=None):
+        # Показать страницу first (или ту из first..last, где есть needle)
+        if self.file_path is None:
+            return
+        last = last or first
+        self._request_id += 1
+        self._request_key = (self.file_path, first, last, needle)
+        if first != last and self._request_key in self._located:
+            # Страница для этого диапазона уже искалась
+            first = last = self._located[self._request_key]
+            self._located.move_to_end(self._request_key)
+        if first == last:
+            self.on_located(self._request_id, first)
+        # Готовые изображения берутся из кэша, рисуются только недостающие
+        cached = {(number, zoom) for number in range(first, last + 1) for zoom in (THUMB_ZOOM, FULL_ZOOM)
+                  if (self.file_path, number, zoom) in self._cache}
+        if first == last and (first, FULL_ZOOM) in cached:
+            return
+        self.renderer.request(self._request_id, self.file_path, first, last, needle, cached)
+
+    def on_located(self, request_id, page_number):
+        if request_id != self._request_id:
+            return
+        self._located[self._request_key] = page_number
+        while len(self._located) > LOCATED_CACHE_SIZE:
+            self._located.popitem(last=False)
+        self.current = page_number
+        self.caption.setText(f"Page {page_number}")
+        # Лучшее из уже готового: полное изображение или миниатюра
+        for zoom in (FULL_ZOOM, THUMB_ZOOM):
+            pixmap = self._cached(self.file_path, page_number, zoom)
+            if pixmap is not None:
+                self._show(pixmap, zoom)
+                return
+        self.image_label.clear()
+
+    def on_rendered(self, file_path, page_number, zoom, image):
+        pixmap = QPixmap.fromImage(image)
+        self._store(file_path, page_number, zoom, pixmap)
+        if file_path == self.file_path and page_number == self.current:
+            shown = self.image_label.property("zoom")
+            if zoom == FULL_ZOOM or shown != FULL_ZOOM:
+                self._show(pixmap, zoom)
+
+    def _show(self, pixmap, zoom):
+        if zoom != FULL_ZOOM:
+            # Миниатюру растягиваем до размера полного изображения
+            pixmap = pixmap.scaled(
+                int(pixmap.width() * FULL_ZOOM / zoom), int(pixmap.height() * FULL_ZOOM / zoom),
+                Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.FastTransformation
+            )
+        self.image_label.setPixmap(pixmap)
+        self.image_label.setProperty("zoom", zoom)
+
+    def _cached(self, file_path, page_number, zoom):
+        key = (file_path, page_number, zoom)
+        pixmap = self._cache.get(key)
+        if pixmap is not None:
+            self._cache.move_to_end(key)
+        return pixmap
+
+    def _store(self, file_path, page_number, zoom, pixmap):
+        self._cache[(file_path, page_number, zoom)] = pixmap
+        self._cache.move_to_end((file_path, page_number, zoom))
+        while len(self._cache) > PIXMAP_CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    def close_renderer(self):
+        self.renderer.stop()
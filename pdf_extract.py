@@ -0,0 +1,556 @@
+import gc
+import os
+import sys
+import hashlib
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# pdfplumber, camelot и PyMuPDF импортируются внутри функций: окно программы
+# открывается сразу, а библиотеки грузятся при первом извлечении
+
+from extract_cache import ExtractionCache, file_hash
+from page_classify import table_pages, classify_pages, parse_page_range, format_page_range
+from timing import TIMER
+
+
+# Количество процессов по умолчанию — по числу ядер
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# Сколько страниц отдаётся процессу за раз при потоковом извлечении
+PAGE_CHUNK = 4
+
+# Доля пустых ячеек, начиная с которой таблица считается распознанной неверно
+MAX_EMPTY_SHARE = 0.5
+
+
+class MemoryLimitError(MemoryError):
+    # Процесс превысил заданный потолок памяти даже после сброса кэшей документа
+    pass
+
+
+def count_pages(file_path):
+    import pdfplumber
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def page_fingerprints(file_path):
+    # Отпечаток каждой страницы: хэш ее содержимого (поток команд отрисовки,
+    # потоки форм и картинок, которые страница рисует через Do, в том числе
+    # вложенных, размер, поворот и шрифты без номеров объектов). У неизменной
+    # страницы в новой редакции PDF отпечаток тот же, даже если другие
+    # страницы поменялись. Без PyMuPDF — хэш файла и номер страницы, как раньше
+    try:
+        import fitz as pymupdf  # PyMuPDF
+    except ImportError:
+        pdf_hash = file_hash(file_path)
+        return [f"{pdf_hash}:{number}" for number in range(1, count_pages(file_path) + 1)]
+
+    fingerprints = []
+    with TIMER.stage("fingerprint_pages"), pymupdf.open(file_path) as doc:
+        for page in doc:
+            digest = hashlib.sha256(page.read_contents())
+            digest.update(repr((tuple(page.rect), page.rotation)).encode())
+            digest.update(repr(sorted(font[1:] for font in page.get_fonts())).encode())
+            # Формы (get_xobjects обходит и вложенные) и картинки: имя, рамка
+            # и поток; номер объекта в отпечаток не входит
+            for xref, name, _, bbox in page.get_xobjects():
+                digest.update(repr((name, tuple(bbox))).encode())
+                digest.update(doc.xref_stream_raw(xref) or b"")
+            for xref, smask, *properties, _ in page.get_images(full=True):
+                digest.update(repr(properties).encode())
+                for stream_xref in (xref, smask):
+                    if stream_xref:
+                        digest.update(doc.xref_stream_raw(stream_xref) or b"")
+            fingerprints.append(digest.hexdigest())
+    return fingerprints
+
+
+def current_rss_mb():
+    # Текущая резидентная память процесса, МБ (None, если узнать нельзя)
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _over_limit(max_memory_mb):
+    if not max_memory_mb:
+        return False
+    rss = current_rss_mb()
+    return rss is not None and rss > max_memory_mb
+
+
+def split_pages(num_pages, workers):
+    # Делим документ на непрерывные диапазоны страниц (нумерация с 1)
+    workers = max(1, min(workers, num_pages))
+    size, rest = divmod(num_pages, workers)
+    ranges = []
+    start = 1
+    for i in range(workers):
+        end = start + size + (1 if i < rest else 0) - 1
+        ranges.append((start, end))
+        start = end + 1
+    return ranges
+
+
+# Движки извлечения. Каждый — генератор: открывает документ один раз
+# и отдает результат по каждой странице из pages в том же порядке.
+
+def iter_pdfplumber_table(file_path, pages, table_settings=None):
+    # pdfplumber extract_table: строки одной таблицы страницы
+    import pdfplumber
+    with pdfplumber.open(file_path) as pdf:
+        for number in pages:
+            with TIMER.stage("parse_page", page=number):
+                page = pdf.pages[number - 1]
+                page.objects
+            with TIMER.stage("detect_tables", page=number):
+                rows = page.extract_table(table_settings) or []
+            # Освобождаем разобранные объекты страницы, иначе они живут до закрытия PDF
+            page.close()
+            yield rows
+
+
+def iter_pdfplumber_tables(file_path, pages, table_settings=None):
+    # pdfplumber extract_tables: все таблицы страницы
+    import pdfplumber
+    with pdfplumber.open(file_path) as pdf:
+        for number in pages:
+            with TIMER.stage("parse_page", page=number):
+                page = pdf.pages[number - 1]
+                page.objects
+            with TIMER.stage("detect_tables", page=number):
+                tables = page.extract_tables(table_settings)
+            page.close()
+            yield tables
+
+
+def iter_camelot(file_path, pages, flavor="lattice", strip_text="\n", **options):
+    # Camelot: DataFrame для каждой таблицы страницы (lattice или stream)
+    import camelot
+    for number in pages:
+        with TIMER.stage("camelot_read_pdf", page=number, flavor=flavor):
+            tables = camelot.read_pdf(
+                file_path,
+                pages=str(number),
+                flavor=flavor,
+                strip_text=strip_text,
+                suppress_stdout=True,
+                **options
+            )
+            frames = [table.df for table in tables]
+        yield frames
+
+
+# Что сохраняется из разбора страницы pdfplumber: рамки символов и отрезки
+# линий (линии, стороны прямоугольников и кривых). По ним таблица собирается
+# заново с любыми настройками без повторного разбора PDF (см. layout_cache.py)
+CHAR_KEYS = ("text", "x0", "x1", "y0", "y1", "top", "bottom", "doctop", "width", "height", "upright", "size",
+             "fontname")
+EDGE_KEYS = ("x0", "x1", "top", "bottom", "doctop", "width", "height", "orientation", "object_type")
+
+
+def _pack(objects, keys):
+    # Кортежи вместо словарей: в кэше в несколько раз меньше места
+    return [tuple(obj.get(key) for key in keys) for obj in objects]
+
+
+def iter_layouts(file_path, pages):
+    # Разметка страницы pdfplumber: рамка страницы, символы и линии.
+    # Значение страницы — список из одной разметки, чтобы куски страниц
+    # склеивались так же, как у других движков
+    import pdfplumber
+    with pdfplumber.open(file_path) as pdf:
+        for number in pages:
+            with TIMER.stage("parse_page", page=number):
+                page = pdf.pages[number - 1]
+                layout = {
+                    "page": number,
+                    "bbox": tuple(page.bbox),
+                    "chars": _pack(page.chars, CHAR_KEYS),
+                    "edges": _pack(page.edges, EDGE_KEYS),
+                }
+            page.close()
+            yield [layout]
+
+
+def pymupdf_page_rows(page, strategy="lines"):
+    rows = []
+    for table in page.find_tables(strategy=strategy).tables:
+        rows.extend(table.extract())
+    return rows
+
+
+def iter_pymupdf(file_path, pages, strategy="lines"):
+    # PyMuPDF find_tables: строки всех таблиц страницы
+    import fitz as pymupdf  # PyMuPDF
+    with pymupdf.open(file_path) as doc:
+        for number in pages:
+            with TIMER.stage("parse_page", page=number):
+                page = doc[number - 1]
+            with TIMER.stage("detect_tables", page=number):
+                rows = pymupdf_page_rows(page, strategy)
+            yield rows
+
+
+def looks_broken(rows):
+    # Признаки неверно собранной таблицы: одна колонка, разное число ячеек
+    # в строках или почти одни пустые ячейки. Пустой результат не считается
+    # ошибкой — на странице может просто не быть таблицы.
+    if not rows:
+        return False
+    widths = {len(row) for row in rows}
+    if len(widths) > 1 or max(widths) < 2:
+        return True
+    cells = len(rows) * widths.pop()
+    empty = sum(1 for row in rows for item in row if item is None or item == "")
+    return empty > cells * MAX_EMPTY_SHARE
+
+
+def frames_to_rows(frames):
+    return [row for df in frames for row in df.values.tolist()]
+
+
+# Camelot не установлен: предупреждение печатается один раз на процесс
+_camelot_missing_reported = False
+
+
+def iter_auto(file_path, pages, strategy="lines"):
+    # Сначала самый дешевый PyMuPDF, Camelot lattice — только для страниц,
+    # где результат выглядит неверно. Без Camelot остается результат PyMuPDF
+    global _camelot_missing_reported
+    import fitz as pymupdf  # PyMuPDF
+    with pymupdf.open(file_path) as doc:
+        for number in pages:
+            with TIMER.stage("detect_tables", page=number):
+                rows = pymupdf_page_rows(doc[number - 1], strategy)
+            if looks_broken(rows):
+                try:
+                    rows = frames_to_rows(next(iter_camelot(file_path, [number], flavor="lattice")))
+                except ImportError:
+                    if not _camelot_missing_reported:
+                        _camelot_missing_reported = True
+                        print("Camelot is not installed, broken-looking pages keep the PyMuPDF result",
+                              file=sys.stderr)
+            yield rows
+
+
+# Доступные движки
+ENGINES = {
+    "table": iter_pdfplumber_table,
+    "tables": iter_pdfplumber_tables,
+    "camelot": iter_camelot,
+    "pymupdf": iter_pymupdf,
+    "auto": iter_auto,
+    "layout": iter_layouts,
+}
+
+# Что отдает движок по странице: строки, список таблиц или список DataFrame
+ENGINE_KINDS = {
+    "table": "rows",
+    "tables": "tables",
+    "camelot": "frames",
+    "pymupdf": "rows",
+    "auto": "rows",
+    "layout": "layouts",
+}
+
+
+def extract_page_results(file_path, engine, pages, **params):
+    # Результат отдельно для каждой страницы из списка pages, в том же порядке
+    return list(ENGINES[engine](file_path, pages, **params))
+
+
+def extract_page_results_timed(file_path, engine, pages, **params):
+    # Для процесса пула: результаты страниц и замеры, сделанные при их
+    # извлечении, — замеры процесса пула иначе до родителя не доходят
+    TIMER.clear()
+    return extract_page_results(file_path, engine, pages, **params), TIMER.events
+
+
+def timed_result(future):
+    # Результат extract_page_results_timed; замеры добавляются к TIMER родителя
+    results, events = future.result()
+    TIMER.extend(events)
+    return results
+
+
+def iter_page_results(file_path, engine="table", pages=None, max_memory_mb=None, **params):
+    # Генератор (номер страницы, результат) без накопления результатов.
+    # Если память процесса выше max_memory_mb, документ открывается заново
+    # (сбрасываются его кэши); если и это не помогло — MemoryLimitError.
+    if pages is None:
+        pages = list(range(1, count_pages(file_path) + 1))
+    position = 0
+    while position < len(pages):
+        results = ENGINES[engine](file_path, pages[position:], **params)
+        try:
+            for value in results:
+                number = pages[position]
+                position += 1
+                yield number, value
+                del value
+                if _over_limit(max_memory_mb):
+                    break
+        finally:
+            results.close()
+
+        if position < len(pages):
+            gc.collect()
+            if _over_limit(max_memory_mb):
+                raise MemoryLimitError(
+                    f"memory above {max_memory_mb} MB after page {pages[position - 1]}"
+                )
+
+
+def iter_rows(file_path, engine="table", pages=None, max_memory_mb=None, **params):
+    # Строки таблиц по одной, страница за страницей
+    for number, value in iter_page_results(file_path, engine, pages, max_memory_mb, **params):
+        yield from to_rows(value, engine)
+
+
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _merge(results):
+    merged = []
+    for result in results:
+        merged.extend(result)
+    return merged
+
+
+def extract_cached(file_path, engine, workers, cache, **params):
+    # Берем готовые страницы из кэша, остальные извлекаем и кладем в кэш.
+    # Ключ — отпечаток страницы, поэтому из новой редакции PDF извлекаются
+    # только изменившиеся страницы
+    fingerprints = page_fingerprints(file_path)
+    num_pages = len(fingerprints)
+    results = {}
+    missing = []
+    for number in range(1, num_pages + 1):
+        hit, value = cache.get(fingerprints[number - 1], None, engine, params)
+        if hit:
+            results[number] = value
+        else:
+            missing.append(number)
+
+    if missing:
+        groups = _chunks(missing, -(-len(missing) // max(1, workers)))
+        if len(groups) == 1:
+            fresh = extract_page_results(file_path, engine, missing, **params)
+        else:
+            with ProcessPoolExecutor(max_workers=len(groups)) as pool:
+                futures = [pool.submit(extract_page_results_timed, file_path, engine, group, **params) for group in groups]
+                fresh = [value for future in futures for value in timed_result(future)]
+        for number, value in zip(missing, fresh):
+            results[number] = value
+            cache.put(fingerprints[number - 1], None, engine, params, value)
+
+    return _merge(results[number] for number in range(1, num_pages + 1))
+
+
+def extract(file_path, engine="table", workers=1, cache=None, **params):
+    # Извлекаем данные, разбивая документ на диапазоны страниц по процессам.
+    # Каждый процесс открывает PDF сам, результаты склеиваются в порядке страниц.
+    if cache is not None:
+        return extract_cached(file_path, engine, workers, cache, **params)
+
+    num_pages = count_pages(file_path)
+    if num_pages == 0:
+        return []
+
+    ranges = split_pages(num_pages, workers)
+    if len(ranges) == 1:
+        parts = extract_page_results(file_path, engine, list(range(1, num_pages + 1)), **params)
+    else:
+        with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+            futures = [
+                pool.submit(extract_page_results_timed, file_path, engine, list(range(first, last + 1)), **params)
+                for first, last in ranges
+            ]
+            parts = [value for future in futures for value in timed_result(future)]
+    return _merge(parts)
+
+
+def select_pages(file_path, pages=None, prefilter=False):
+    # Страницы для извлечения: явный список pages или, при prefilter, только
+    # страницы с таблицами с линиями по быстрой разметке. None — все страницы
+    if pages is not None or not prefilter:
+        return pages
+    return table_pages(file_path)
+
+
+def iter_pages(file_path, engine="table", workers=1, num_pages=None, chunk=PAGE_CHUNK, cache=None,
+               max_memory_mb=None, pages=None, **params):
+    # Потоковое извлечение: отдаём (первая страница, последняя страница, результат)
+    # по мере готовности, строго в порядке страниц. Вперед считается не больше
+    # двух диапазонов на процесс, чтобы готовые результаты не копились в памяти.
+    # pages — номера страниц для извлечения (см. select_pages), остальные
+    # страницы пропускаются
+    # С кэшем страницы узнаются по отпечатку: неизменные страницы новой
+    # редакции PDF берутся из кэша, извлекаются только изменившиеся
+    fingerprints = page_fingerprints(file_path) if cache is not None else None
+    if num_pages is None:
+        num_pages = len(fingerprints) if fingerprints is not None else count_pages(file_path)
+
+    if pages is None:
+        numbers_all = list(range(1, num_pages + 1))
+    else:
+        numbers_all = sorted(number for number in set(pages) if 1 <= number <= num_pages)
+
+    def is_missing(number):
+        if cache is None:
+            return True
+        if cache.contains(fingerprints[number - 1], None, engine, params):
+            return False
+        cache.misses += 1
+        return True
+
+    def from_cache(number):
+        hit, value = cache.get(fingerprints[number - 1], None, engine, params)
+        if not hit:
+            # Запись могла быть вытеснена между проверкой и чтением
+            value = extract_page_results(file_path, engine, [number], **params)[0]
+        return value
+
+    def store(number, value):
+        if cache is not None:
+            cache.put(fingerprints[number - 1], None, engine, params, value)
+
+    if workers <= 1:
+        # Один документ открыт на все страницы, которых нет в кэше
+        missing = [number for number in numbers_all if is_missing(number)]
+        fresh = iter_page_results(file_path, engine, missing, max_memory_mb, **params)
+        missing = set(missing)
+        try:
+            for number in numbers_all:
+                if number in missing:
+                    _, value = next(fresh)
+                    store(number, value)
+                else:
+                    value = from_cache(number)
+                yield number, number, value
+        finally:
+            fresh.close()
+        return
+
+    groups = deque(_chunks(numbers_all, chunk))
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = deque()
+
+        def submit_next():
+            # Задачи ставятся только для страниц, которых нет в кэше
+            numbers = groups.popleft()
+            missing = [number for number in numbers if is_missing(number)]
+            future = pool.submit(extract_page_results_timed, file_path, engine, missing, **params) if missing else None
+            pending.append((numbers, missing, future))
+
+        while groups and len(pending) < workers * 2:
+            submit_next()
+
+        while pending:
+            numbers, missing, future = pending.popleft()
+            if groups:
+                submit_next()
+            found = dict(zip(missing, timed_result(future))) if future is not None else {}
+            for number, value in found.items():
+                store(number, value)
+            yield numbers[0], numbers[-1], _merge(
+                found[number] if number in found else from_cache(number) for number in numbers
+            )
+            del found
+            if _over_limit(max_memory_mb):
+                gc.collect()
+                if _over_limit(max_memory_mb):
+                    raise MemoryLimitError(f"memory above {max_memory_mb} MB after page {numbers[-1]}")
+    finally:
+        # При отмене не ждём оставшиеся диапазоны
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def to_rows(result, engine):
+    # Приводим результат любого движка к списку строк
+    kind = ENGINE_KINDS[engine]
+    if kind == "frames":
+        return frames_to_rows(result)
+    if kind == "tables":
+        return [row for table in result for row in table]
+    if kind == "layouts":
+        # Таблица из разметки с настройками pdfplumber по умолчанию
+        from layout_cache import layouts_to_rows
+        return layouts_to_rows(result)
+    return list(result)
+
+
+def check_equivalence(file_path, engine="table", workers=DEFAULT_WORKERS, **params):
+    # Сравниваем параллельное извлечение с последовательным построчно
+    sequential = to_rows(extract(file_path, engine, 1, **params), engine)
+    parallel = to_rows(extract(file_path, engine, workers, **params), engine)
+    if len(sequential) != len(parallel):
+        print(f"Row count differs: sequential {len(sequential)}, parallel {len(parallel)}")
+        return False
+    for i, (a, b) in enumerate(zip(sequential, parallel)):
+        if a != b:
+            print(f"Row {i} differs: {a!r} != {b!r}")
+            return False
+    print(f"OK: {len(sequential)} rows match ({workers} workers)")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract tables from PDF by page ranges")
+    parser.add_argument("pdf")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="table")
+    parser.add_argument("--flavor", choices=["lattice", "stream"], help="camelot flavor")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--check", action="store_true", help="compare parallel output with sequential")
+    parser.add_argument("--cache-dir", help="reuse per-page results stored in this directory")
+    parser.add_argument("--max-memory-mb", type=int, help="stop if the process grows beyond this size")
+    parser.add_argument("--pages", help="pages to extract, e.g. 1-5,8 (default: all)")
+    parser.add_argument("--prefilter", action="store_true", help="extract only pages that look like ruled tables")
+    parser.add_argument("--classify", action="store_true", help="print the page pre-classification and exit")
+    args = parser.parse_args()
+
+    params = {"flavor": args.flavor} if args.flavor else {}
+    if args.classify:
+        report = classify_pages(args.pdf, parse_page_range(args.pages))
+        for item in report:
+            print(f"{item['page']:>5}  {item['kind']:<8} words {item['words']:>5}  "
+                  f"lines {item['horizontal']:>4} h {item['vertical']:>4} v")
+        print(f"Ruled tables: {format_page_range(item['page'] for item in report if item['kind'] == 'ruled')}")
+        sys.exit(0)
+    pages = select_pages(args.pdf, parse_page_range(args.pages), args.prefilter)
+    if pages is not None:
+        print(f"Pages: {format_page_range(pages)}")
+    if args.check:
+        sys.exit(0 if check_equivalence(args.pdf, args.engine, args.workers, **params) else 1)
+    if args.max_memory_mb:
+        # Построчно, не держа всю таблицу в памяти
+        try:
+            count = sum(1 for _ in iter_rows(args.pdf, args.engine, pages, args.max_memory_mb, **params))
+        except MemoryLimitError as e:
+            print(f"Stopped: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"{count} rows extracted")
+        sys.exit(0)
+    cache = ExtractionCache(args.cache_dir) if args.cache_dir else None
+    if pages is not None:
+        count = sum(
+            len(to_rows(part, args.engine))
+            for _, _, part in iter_pages(args.pdf, args.engine, args.workers, cache=cache, pages=pages, **params)
+        )
+    else:
+        count = len(to_rows(extract(args.pdf, args.engine, args.workers, cache, **params), args.engine))
+    print(f"{count} rows extracted")
+    if cache is not None:
+        print(f"Cache: {cache.stats()}")
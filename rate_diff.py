@@ -0,0 +1,134 @@
+import os
+import sys
+import argparse
+
+from pdf_extract import extract, to_rows, DEFAULT_WORKERS
+from extract_cache import ExtractionCache, DEFAULT_CACHE_DIR
+from rate_index import normalize_code, normalize_text, guess_code_column
+from table_normalize import normalize_rows
+from timing import TIMER
+
+
+def load_rows(file_path, engine="table", workers=DEFAULT_WORKERS, cache=None, columns=None, **params):
+    # Строки редакции справочника: из PDF (через кэш по отпечаткам страниц,
+    # извлекаются только изменившиеся страницы) или из готовой выгрузки XLSX
+    if file_path.lower().endswith(".xlsx"):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file_path, read_only=True)
+        rows = [list(row) for row in workbook.active.iter_rows(values_only=True)]
+        workbook.close()
+        return [row for row in rows if any(value not in (None, "") for value in row)]
+
+    rows = normalize_rows(to_rows(extract(file_path, engine, workers, cache, **params), engine))
+    if columns is not None:
+        rows = [[row[i] if i < len(row) else None for i in columns] for row in rows]
+    return rows
+
+
+def cell_key(value):
+    # Значение для сравнения: "1 234,50", "1234.5" и 1234.5 совпадают
+    text = normalize_text(value)
+    try:
+        number = float(text.replace(" ", "").replace(",", "."))
+    except ValueError:
+        return text
+    return repr(number)
+
+
+def rows_by_code(rows, code_column):
+    # Шифр -> строка; строки без шифра (шапка, разделы) не сравниваются,
+    # при повторе шифра берется первая строка
+    result = {}
+    for row in rows:
+        code = normalize_code(row[code_column]) if code_column < len(row) else ""
+        if code and code not in result:
+            result[code] = row
+    return result
+
+
+def diff_rates(old_rows, new_rows, code_column=None):
+    # Построчное сравнение двух редакций по шифру.
+    # Возвращает словарь: added и removed — списки строк,
+    # changed — список (шифр, номер столбца, было, стало)
+    with TIMER.stage("diff_rates", old=len(old_rows), new=len(new_rows)):
+        if code_column is None:
+            code_column = guess_code_column(new_rows or old_rows)
+        old = rows_by_code(old_rows, code_column)
+        new = rows_by_code(new_rows, code_column)
+
+        changed = []
+        for code in old.keys() & new.keys():
+            before, after = old[code], new[code]
+            for column in range(max(len(before), len(after))):
+                a = before[column] if column < len(before) else None
+                b = after[column] if column < len(after) else None
+                if cell_key(a) != cell_key(b):
+                    changed.append((after[code_column], column, a, b))
+        # По шифру и столбцу; значения ячеек бывают и текстом, и числами
+        changed.sort(key=lambda item: (normalize_code(item[0]), item[1]))
+        return {
+            "added": [new[code] for code in new if code not in old],
+            "removed": [old[code] for code in old if code not in new],
+            "changed": changed,
+        }
+
+
+def write_report(diff, file_path):
+    # Отчет XLSX: листы Added, Removed и Changed
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    for title in ("added", "removed"):
+        sheet = workbook.create_sheet(title.capitalize())
+        for row in diff[title]:
+            sheet.append(list(row))
+    sheet = workbook.create_sheet("Changed")
+    sheet.append(["Code", "Column", "Old", "New"])
+    for code, column, before, after in diff["changed"]:
+        sheet.append([code, column + 1, before, after])
+    workbook.save(file_path)
+
+
+def main(argv=None):
+    from batch_convert import columns_arg
+
+    parser = argparse.ArgumentParser(description="Compare two editions of the rate book by code")
+    parser.add_argument("old", help="previous edition: PDF or exported XLSX")
+    parser.add_argument("new", help="new edition: PDF or exported XLSX")
+    parser.add_argument("--engine", choices=["table", "pymupdf", "camelot", "auto"], default="table")
+    parser.add_argument("-j", "--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("-c", "--columns", type=columns_arg, help="PDF columns to compare, e.g. 1,3,5, to match an exported XLSX")
+    parser.add_argument("--code-column", type=int, help="column with the code, counted from 1 (default: guess)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="per-page results reused between editions")
+    parser.add_argument("-o", "--output", help="write the report to this XLSX file")
+    args = parser.parse_args(argv)
+
+    for path in (args.old, args.new):
+        if not os.path.exists(path):
+            print(f"File not found: {path}", file=sys.stderr)
+            return 2
+
+    columns = args.columns
+    params = {"flavor": "lattice", "strip_text": "\n"} if args.engine == "camelot" else {}
+    cache = ExtractionCache(args.cache_dir)
+    old_rows = load_rows(args.old, args.engine, args.workers, cache, columns, **params)
+    new_rows = load_rows(args.new, args.engine, args.workers, cache, columns, **params)
+    stats = cache.stats()
+    print(f"Pages reused from cache: {stats['hits']}, extracted: {stats['misses']}")
+
+    code_column = args.code_column - 1 if args.code_column else None
+    diff = diff_rates(old_rows, new_rows, code_column)
+    print(f"Added: {len(diff['added'])}, removed: {len(diff['removed'])}, changed cells: {len(diff['changed'])}")
+    for code, column, before, after in diff["changed"][:20]:
+        print(f"  {code}  column {column + 1}: {before!r} -> {after!r}")
+    if len(diff["changed"]) > 20:
+        print(f"  ... {len(diff['changed']) - 20} more")
+    if args.output:
+        write_report(diff, args.output)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import re
+from itertools import chain, islice
+from bisect import bisect_left, bisect_right
+
+from timing import TIMER
+
+
+# Шифр расценки: буквенный префикс и группы через дефис, точку или косую черту
+# (ЦС-01.20.03, ЦС-16/22/23.212) или не меньше трех групп цифр (01-01-001,
+# 02.05.019-В.НВ1). Сравнивается с шифром после normalize_code
+CODE_PATTERN = re.compile(r"[^\W\d_]{1,4}-\d+(?:[-./][^\W_]+)*|\d+(?:[-./][^\W_]+){2,}")
+
+# Разделитель строк в общем тексте индекса, в самих ячейках его не бывает
+ROW_SEPARATOR = "\n"
+
+# По скольким первым строкам угадываем столбец с шифром
+CODE_SAMPLE = 500
+
+# Если совпадений больше, чем строк / DENSE_SHARE, ищем по текстам строк
+DENSE_SHARE = 8
+
+
+def normalize_text(value):
+    # Поиск без учета регистра, лишних пробелов и разницы "ё"/"е"
+    if value is None or value != value:
+        return ""
+    text = str(value).replace(ROW_SEPARATOR, " ").lower().replace("ё", "е")
+    return " ".join(text.split())
+
+
+def normalize_code(value):
+    # Шифр сравниваем без пробелов: "01-01- 001" и "01-01-001" — один шифр
+    return "".join(normalize_text(value).split())
+
+
+def guess_code_column(rows, sample=CODE_SAMPLE):
+    # Столбец с наибольшим числом разных значений вида шифра: шифр расценки
+    # уникален, а шифр группы повторяется во всех ее строках
+    codes = {}
+    for row in rows[:sample]:
+        for column, value in enumerate(row):
+            code = normalize_code(value)
+            if CODE_PATTERN.fullmatch(code):
+                codes.setdefault(column, set()).add(code)
+    return max(codes, key=lambda column: len(codes[column])) if codes else 0
+
+
+class RateIndex:
+    # Индекс по извлеченной таблице, строится один раз после извлечения:
+    # - шифр -> номера строк (точное совпадение);
+    # - отсортированный список шифров (поиск по началу шифра через bisect);
+    # - весь текст строк одной строкой с началом каждой строки (поиск подстроки
+    #   делает str.find на C, строки таблицы по одной не перебираются).
+    # Если новый запрос продолжает предыдущий (пользователь дописал символ),
+    # ищем только среди уже найденных строк.
+
+    def __init__(self, rows, code_column=None):
+        # rows — любой итерируемый набор строк; таблица не копируется целиком
+        # (ColumnarTable отдает строки по блокам), для угадывания столбца
+        # с шифром берутся только первые строки
+        count = len(rows) if hasattr(rows, "__len__") else None
+        rows = iter(rows)
+        head = list(islice(rows, CODE_SAMPLE))
+        self.code_column = guess_code_column(head) if code_column is None else code_column
+
+        with TIMER.stage("build_rate_index", rows=count):
+            self._codes = {}
+            self._row_codes = []
+            texts = []
+            for i, row in enumerate(chain(head, rows)):
+                code = normalize_code(row[self.code_column]) if self.code_column < len(row) else ""
+                if code:
+                    self._codes.setdefault(code, []).append(i)
+                self._row_codes.append(code)
+                text = " ".join(str(value) for value in row if value is not None and value == value)
+                texts.append(" ".join(text.lower().replace("ё", "е").split()))
+            self._sorted_codes = sorted(self._codes)
+            self.row_count = len(texts)
+
+            self._texts = texts
+            self._starts = []
+            position = 0
+            for text in texts:
+                self._starts.append(position)
+                position += len(text) + len(ROW_SEPARATOR)
+            self._blob = ROW_SEPARATOR.join(texts)
+
+        self._last_query = None
+        self._last_result = None
+
+    def find_code(self, code):
+        # Строки с точно таким шифром
+        return list(self._codes.get(normalize_code(code), []))
+
+    def find_code_prefix(self, prefix):
+        # Строки, шифр которых начинается с prefix
+        prefix = normalize_code(prefix)
+        if not prefix:
+            return []
+        first = bisect_left(self._sorted_codes, prefix)
+        last = bisect_left(self._sorted_codes, prefix + "￿")
+        result = []
+        for code in self._sorted_codes[first:last]:
+            result.extend(self._codes[code])
+        return result
+
+    def find_text(self, query):
+        # Строки, текст которых содержит query; после совпадения сразу
+        # переходим к следующей строке, так что шагов не больше, чем совпавших строк
+        query = normalize_text(query)
+        if not query:
+            return list(range(self.row_count))
+        if self._blob.count(query) > self.row_count // DENSE_SHARE:
+            # Совпадений почти в каждой строке (одна-две буквы) — проверка
+            # готовых текстов строк выходит дешевле, чем переходы по совпадениям
+            return [row for row, text in enumerate(self._texts) if query in text]
+        result = []
+        position = self._blob.find(query)
+        while position != -1:
+            row = bisect_right(self._starts, position) - 1
+            result.append(row)
+            if row + 1 >= self.row_count:
+                break
+            position = self._blob.find(query, self._starts[row + 1])
+        return result
+
+    def search(self, query):
+        # Номера подходящих строк в порядке таблицы; None — фильтра нет
+        query = normalize_text(query)
+        if not query:
+            self._last_query = None
+            self._last_result = None
+            return None
+
+        if self._last_query and query.startswith(self._last_query):
+            # Сужаем прошлый результат вместо поиска по всей таблице
+            code = normalize_code(query)
+            result = [
+                row for row in self._last_result
+                if query in self._texts[row] or (code and self._row_codes[row].startswith(code))
+            ]
+        else:
+            result = self.find_text(query)
+            by_code = self.find_code_prefix(query)
+            if by_code:
+                result = sorted(set(result).union(by_code))
+
+        self._last_query = query
+        self._last_result = result
+        return result
@@ -0,0 +1,266 @@
+import os
+import sys
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, CancelledError, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from pdf_extract import (
+    DEFAULT_WORKERS, PAGE_CHUNK, count_pages, page_fingerprints, extract_page_results_timed, timed_result, to_rows,
+    _chunks
+)
+from page_classify import format_page_range
+from table_normalize import normalize_rows
+from timing import TIMER
+
+
+# Несколько PDF (разделы одного сборника) извлекаются одновременно на общем
+# пуле процессов и сводятся в одну таблицу со столбцами документа и страницы.
+# Ошибка в одном документе не останавливает остальные.
+
+# Столбцы, которые сводная таблица добавляет перед столбцами документа
+SOURCE_COLUMNS = ["Source", "Page"]
+
+
+class ExtractionSession:
+    # Куски страниц всех документов ставятся в пул по очереди (по куску от
+    # каждого документа), вперед — не больше двух кусков на процесс. Готовые
+    # страницы отдаются по каждому документу в порядке страниц.
+    # Падение процесса пула ломает весь пул: пул пересоздается, а куски,
+    # которые были в работе, пробуются заново по одному. Кусок, на котором
+    # процесс упал и в одиночку, — ошибка только его документа
+
+    def __init__(self, file_paths, engine="table", workers=DEFAULT_WORKERS, cache=None, chunk=PAGE_CHUNK, **params):
+        self.file_paths = list(file_paths)
+        self.engine = engine
+        self.workers = max(1, workers)
+        self.cache = cache
+        self.chunk = chunk
+        self.params = params
+        # Итог по документу: None — в работе, "" — готово, иначе текст ошибки
+        self.errors = [None] * len(self.file_paths)
+        self.pages_total = 0
+        self.pages_done = 0
+
+    def _prepare(self, index):
+        # Страницы документа и их отпечатки для кэша
+        file_path = self.file_paths[index]
+        if self.cache is not None:
+            fingerprints = page_fingerprints(file_path)
+            return fingerprints, len(fingerprints)
+        return None, count_pages(file_path)
+
+    def _from_cache(self, fingerprints, number):
+        if fingerprints is None:
+            return False, None
+        return self.cache.get(fingerprints[number - 1], None, self.engine, self.params)
+
+    def iter_results(self):
+        # Генератор событий:
+        #   ("pages", документ, [(страница, строки), ...]) — по порядку страниц;
+        #   ("done", документ, "") или ("failed", документ, текст ошибки)
+        documents = []
+        for index, file_path in enumerate(self.file_paths):
+            try:
+                fingerprints, num_pages = self._prepare(index)
+            except Exception as e:
+                self.errors[index] = str(e) or type(e).__name__
+                yield "failed", index, self.errors[index]
+                continue
+            groups = _chunks(list(range(1, num_pages + 1)), self.chunk)
+            documents.append({"index": index, "fingerprints": fingerprints, "groups": deque(enumerate(groups)),
+                              "count": len(groups), "ready": {}, "next": 0})
+            self.pages_total += num_pages
+
+        active = deque(document for document in documents if document["count"])
+        for document in documents:
+            if not document["count"]:
+                self.errors[document["index"]] = ""
+                yield "done", document["index"], ""
+
+        # Текущий пул (в списке, чтобы вложенные функции могли его заменить)
+        current = [ProcessPoolExecutor(max_workers=self.workers)]
+        running = {}
+        # Куски, которые были в работе при падении процесса, — по одному
+        suspects = deque()
+
+        def submit(item, alone=False):
+            document, _, _, missing, _ = item
+            pool = current[0]
+            try:
+                future = pool.submit(extract_page_results_timed, self.file_paths[document["index"]], self.engine,
+                                     missing, **self.params)
+            except BrokenProcessPool:
+                restart(pool)
+                return submit(item, alone)
+            running[future] = (item, pool, alone)
+
+        def restart(broken):
+            # Новый пул один раз на все куски сломанного
+            if broken is current[0]:
+                current[0] = ProcessPoolExecutor(max_workers=self.workers)
+                broken.shutdown(wait=False, cancel_futures=True)
+
+        try:
+            while active or running or suspects:
+                if suspects:
+                    # Подозрительный кусок идет, только когда пул свободен
+                    while suspects and not running:
+                        item = suspects.popleft()
+                        if self.errors[item[0]["index"]] is None:
+                            submit(item, alone=True)
+                else:
+                    # По куску от каждого документа по кругу, пока есть место в пуле
+                    while active and len(running) < self.workers * 2:
+                        document = active.popleft()
+                        position, numbers = document["groups"].popleft()
+                        found = {}
+                        for number in numbers:
+                            hit, value = self._from_cache(document["fingerprints"], number)
+                            if hit:
+                                found[number] = value
+                        missing = [number for number in numbers if number not in found]
+                        if missing:
+                            submit((document, position, numbers, missing, found))
+                        else:
+                            document["ready"][position] = [(number, found[number]) for number in numbers]
+                        if document["groups"]:
+                            active.append(document)
+                        yield from self._release(document)
+
+                if not running:
+                    continue
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    item, pool, alone = running.pop(future)
+                    document, position, numbers, missing, found = item
+                    index = document["index"]
+                    if self.errors[index] is not None:
+                        # Документ уже завершился ошибкой
+                        continue
+                    try:
+                        fresh = timed_result(future)
+                    except (BrokenProcessPool, CancelledError):
+                        restart(pool)
+                        if not alone:
+                            suspects.append(item)
+                            continue
+                        self.errors[index] = f"worker process crashed on pages {format_page_range(missing)}"
+                        self._drop(document, active, running)
+                        yield "failed", index, self.errors[index]
+                        continue
+                    except Exception as e:
+                        self.errors[index] = str(e) or type(e).__name__
+                        self._drop(document, active, running)
+                        yield "failed", index, self.errors[index]
+                        continue
+                    for number, value in zip(missing, fresh):
+                        found[number] = value
+                        if document["fingerprints"] is not None:
+                            self.cache.put(document["fingerprints"][number - 1], None, self.engine, self.params, value)
+                    document["ready"][position] = [(number, found[number]) for number in numbers]
+                    yield from self._release(document)
+        finally:
+            # При отмене не ждем оставшиеся куски
+            current[0].shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, document):
+        # Готовые куски подряд с начала документа
+        index = document["index"]
+        while document["next"] in document["ready"]:
+            pages = document["ready"].pop(document["next"])
+            document["next"] += 1
+            self.pages_done += len(pages)
+            with TIMER.stage("session_rows", document=index, first=pages[0][0], last=pages[-1][0]):
+                items = [(number, to_rows(value, self.engine)) for number, value in pages]
+            yield "pages", index, items
+        if document["next"] == document["count"] and self.errors[index] is None:
+            self.errors[index] = ""
+            yield "done", index, ""
+
+    def _drop(self, document, active, running):
+        # Оставшиеся куски документа с ошибкой не извлекаются
+        if document in active:
+            active.remove(document)
+        for future, (item, _, _) in list(running.items()):
+            if item[0] is document:
+                future.cancel()
+        self.pages_total -= sum(len(numbers) for _, numbers in document["groups"])
+        document["groups"].clear()
+
+
+def merge_documents(results, names, normalize=False):
+    # Сводная таблица: results — для каждого документа [(страница, строки), ...].
+    # Перед столбцами документа — имя файла и страница. Каждый документ
+    # чистится отдельно (у разделов своя шапка). Возвращает строки и
+    # (документ, страница) для каждой строки
+    merged = []
+    sources = []
+    with TIMER.stage("merge_documents", documents=len(results)):
+        for index, pages in enumerate(results):
+            rows = [row for _, page_rows in pages for row in page_rows]
+            row_pages = [number for number, page_rows in pages for _ in page_rows]
+            if normalize:
+                rows, row_pages = normalize_rows(rows, row_pages, return_pages=True)
+            merged.extend([names[index], number] + list(row) for row, number in zip(rows, row_pages))
+            sources.extend((index, number) for number in row_pages)
+    return merged, sources
+
+
+def extract_documents(file_paths, engine="table", workers=DEFAULT_WORKERS, cache=None, normalize=False, **params):
+    # Извлечь и свести несколько документов. Возвращает строки, источники
+    # строк и ошибки по документам ("" — документ извлечен)
+    session = ExtractionSession(file_paths, engine, workers, cache, **params)
+    results = [[] for _ in file_paths]
+    for kind, index, payload in session.iter_results():
+        if kind == "pages":
+            results[index].extend(payload)
+    names = [os.path.basename(path) for path in file_paths]
+    rows, sources = merge_documents(
+        [pages if not session.errors[index] else [] for index, pages in enumerate(results)], names, normalize
+    )
+    return rows, sources, session.errors
+
+
+def main(argv=None):
+    from batch_convert import find_pdfs, columns_arg
+    from xlsx_export import select_row_columns, write_rows_streaming
+
+    parser = argparse.ArgumentParser(description="Extract several PDFs into one XLSX with source and page columns")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns")
+    parser.add_argument("-o", "--output", required=True, help="XLSX file for the combined table")
+    parser.add_argument("-c", "--columns", type=columns_arg,
+                        help="columns to export counted from 1, source and page included")
+    parser.add_argument("--engine", choices=["table", "pymupdf", "camelot", "auto"], default="table")
+    parser.add_argument("--flavor", choices=["lattice", "stream"], default="lattice", help="camelot flavor")
+    parser.add_argument("-j", "--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--normalize", action="store_true",
+                        help="drop repeated headers and empty rows, join rows split across pages")
+    parser.add_argument("--typed", action="store_true", help="write prices and other numbers as numeric cells")
+    args = parser.parse_args(argv)
+
+    pdf_paths = find_pdfs(args.inputs)
+    if not pdf_paths:
+        print("No PDF files found.", file=sys.stderr)
+        return 2
+    params = {"flavor": args.flavor, "strip_text": "\n"} if args.engine == "camelot" else {}
+    rows, _, errors = extract_documents(pdf_paths, args.engine, args.workers, None, args.normalize, **params)
+    for path, error in zip(pdf_paths, errors):
+        print(f"FAIL  {path}: {error}" if error else f"OK    {path}", file=sys.stderr if error else sys.stdout)
+    if args.typed:
+        from column_types import convert_rows
+
+        rows, _ = convert_rows(rows)
+    width = max((len(row) for row in rows), default=len(SOURCE_COLUMNS))
+    headers = SOURCE_COLUMNS + list(range(width - len(SOURCE_COLUMNS)))
+    columns = args.columns
+    if columns is not None:
+        rows = select_row_columns(rows, columns)
+        headers = [headers[i] if i < len(headers) else i for i in columns]
+    count = write_rows_streaming(rows, args.output, headers)
+    print(f"{count} rows from {sum(1 for error in errors if not error)} of {len(pdf_paths)} documents -> {args.output}")
+    return 1 if any(errors) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
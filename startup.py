@@ -0,0 +1,68 @@
+import os
+import sys
+import json
+import time
+import threading
+import importlib
+from datetime import datetime
+
+from PyQt6.QtCore import QTimer
+
+from extract_cache import DEFAULT_CACHE_DIR
+from timing import TIMER
+
+
+# Журнал времени холодного старта, по строке JSON на запуск
+STARTUP_LOG = os.path.join(DEFAULT_CACHE_DIR, "startup.jsonl")
+
+# Если переменная задана, окно закрывается сразу после первой отрисовки (для замеров)
+EXIT_AFTER_START_ENV = "PDF_APP_EXIT_AFTER_START"
+
+
+def warm_up(modules):
+    # Загружаем тяжелые библиотеки в фоне, пока пользователь выбирает файл
+    def run():
+        for name in modules:
+            try:
+                with TIMER.stage("import", module=name):
+                    importlib.import_module(name)
+            except ImportError:
+                pass
+
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def record_startup(started, script, log_path=STARTUP_LOG):
+    # Время от запуска скрипта до показа окна: в таймер и в журнал
+    finished = time.perf_counter()
+    TIMER.add("cold_start", started, finished, script=script)
+    seconds = finished - started
+    try:
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        with open(log_path, "a", encoding="utf-8") as f:
+            record = {
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "script": script,
+                "seconds": round(seconds, 4),
+                "python": sys.version.split()[0],
+            }
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError:
+        pass
+    return seconds
+
+
+def after_window_shown(app, started, script, warm_modules=()):
+    # Вызывается после window.show(): как только цикл событий отрисует окно,
+    # записываем время старта и запускаем фоновую загрузку библиотек
+    def on_shown():
+        seconds = record_startup(started, script)
+        print(f"Window shown in {seconds:.3f} s")
+        if os.environ.get(EXIT_AFTER_START_ENV):
+            app.quit()
+            return
+        warm_up(warm_modules)
+
+    QTimer.singleShot(0, on_shown)
@@ -0,0 +1,54 @@
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget, QTableWidgetItem, QFileDialog, QHeaderView
+)
+
+from timing import TIMER
+
+
+class StatsDialog(QDialog):
+    # Небольшая панель с временем по этапам и выгрузкой Chrome trace
+
+    def __init__(self, timer=TIMER, parent=None):
+        super().__init__(parent)
+        self.timer = timer
+        self.setWindowTitle("Stage timings")
+        self.resize(520, 320)
+
+        layout = QVBoxLayout(self)
+        self.table = QTableWidget(0, 5, self)
+        self.table.setHorizontalHeaderLabels(["Stage", "Count", "Total, ms", "Mean, ms", "Max, ms"])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        for title, handler in (("Refresh", self.refresh), ("Save trace...", self.save_trace), ("Clear", self.clear)):
+            button = QPushButton(title, self)
+            button.clicked.connect(handler)
+            buttons.addWidget(button)
+        layout.addLayout(buttons)
+
+        self.refresh()
+
+    def refresh(self):
+        # Этапы по убыванию суммарного времени
+        summary = sorted(self.timer.summary().items(), key=lambda item: item[1]["total"], reverse=True)
+        self.table.setRowCount(len(summary))
+        for i, (name, item) in enumerate(summary):
+            values = [
+                name,
+                str(item["count"]),
+                f"{item['total'] * 1000:.1f}",
+                f"{item['total'] * 1000 / item['count']:.1f}",
+                f"{item['max'] * 1000:.1f}",
+            ]
+            for j, value in enumerate(values):
+                self.table.setItem(i, j, QTableWidgetItem(value))
+
+    def save_trace(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Trace", "trace.json", "Trace Files (*.json)")
+        if file_path:
+            self.timer.dump_chrome_trace(file_path)
+
+    def clear(self):
+        self.timer.clear()
+        self.refresh()
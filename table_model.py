@@ -0,0 +1,129 @@
+from bisect import bisect_right
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+
+class DataTableModel(QAbstractTableModel):
+    # Модель над извлеченными данными: хранит куски (списки строк, DataFrame
+    # или ColumnarTable) как есть и отдает представлению только видимые ячейки
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._chunks = []
+        self._offsets = []
+        self._row_count = 0
+        self._column_count = 0
+        self._visible = None
+
+    def clear(self):
+        self.beginResetModel()
+        self._chunks = []
+        self._offsets = []
+        self._row_count = 0
+        self._column_count = 0
+        self._visible = None
+        self.endResetModel()
+
+    def set_row_filter(self, rows):
+        # Показываем только строки с этими номерами (в порядке списка); None — все строки
+        self.beginResetModel()
+        self._visible = rows
+        self.endResetModel()
+
+    def source_row(self, row):
+        # Номер строки в данных для строки представления
+        return row if self._visible is None else self._visible[row]
+
+    def set_data(self, data):
+        # Полная замена содержимого: список строк, DataFrame или ColumnarTable
+        self.beginResetModel()
+        self._chunks = []
+        self._offsets = []
+        self._row_count = 0
+        self._column_count = 0
+        self._visible = None
+        if data is not None and len(data):
+            self._add_chunk(data)
+        self.endResetModel()
+
+    def append_chunk(self, chunk):
+        # Дописываем строки в конец (потоковое заполнение)
+        num_rows = len(chunk)
+        if num_rows == 0:
+            return
+        num_columns = self._chunk_columns(chunk)
+        if num_columns > self._column_count:
+            self.beginInsertColumns(QModelIndex(), self._column_count, num_columns - 1)
+            self._column_count = num_columns
+            self.endInsertColumns()
+
+        self.beginInsertRows(QModelIndex(), self._row_count, self._row_count + num_rows - 1)
+        self._chunks.append(chunk)
+        self._offsets.append(self._row_count)
+        self._row_count += num_rows
+        self.endInsertRows()
+
+    def _add_chunk(self, chunk):
+        self._chunks.append(chunk)
+        self._offsets.append(self._row_count)
+        self._row_count += len(chunk)
+        self._column_count = max(self._column_count, self._chunk_columns(chunk))
+
+    @staticmethod
+    def _is_frame(chunk):
+        # DataFrame узнаем по атрибутам, чтобы не импортировать pandas ради модели
+        return hasattr(chunk, "iat") and hasattr(chunk, "shape")
+
+    @staticmethod
+    def _is_columnar(chunk):
+        # ColumnarTable сама отдает ячейку по номеру строки и столбца
+        return hasattr(chunk, "cell") and hasattr(chunk, "shape")
+
+    @classmethod
+    def _chunk_columns(cls, chunk):
+        if cls._is_columnar(chunk) or cls._is_frame(chunk):
+            return chunk.shape[1]
+        return max(len(row) for row in chunk)
+
+    def cell(self, row, column):
+        # Значение ячейки по сквозному номеру строки
+        index = bisect_right(self._offsets, row) - 1
+        chunk = self._chunks[index]
+        local_row = row - self._offsets[index]
+        if self._is_columnar(chunk):
+            return chunk.cell(local_row, column) if column < chunk.shape[1] else None
+        if self._is_frame(chunk):
+            if column >= chunk.shape[1]:
+                return None
+            return chunk.iat[local_row, column]
+        values = chunk[local_row]
+        return values[column] if column < len(values) else None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._row_count if self._visible is None else len(self._visible)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._column_count
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        value = self.cell(self.source_row(index.row()), index.column())
+        # NaN не равен сам себе
+        if value is None or value != value:
+            return ""
+        # Целые числа показываем без ".0"
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Vertical:
+            # При фильтре показываем номер строки в исходной таблице
+            section = self.source_row(section)
+        # Нумерация как у QTableWidget — с единицы
+        return str(section + 1)
@@ -0,0 +1,202 @@
+from timing import TIMER
+from rate_index import CODE_PATTERN
+
+
+# Сколько первых строк таблицы считаем возможной шапкой
+HEADER_ROWS = 3
+
+# По скольким строкам угадываем столбец с шифром
+KEY_SAMPLE = 500
+
+# Число в ячейке: "1 200,50", "-3.5", "12"
+NUMBER_PATTERN = r"-?\d[\d\s]*(?:[.,]\d+)?"
+
+
+def clean_cells(df):
+    # Все ячейки — строки без переносов и двойных пробелов; по столбцам целиком
+    df = df.fillna("").astype(str)
+    return df.apply(lambda column: column.str.replace(r"\s+", " ", regex=True).str.strip())
+
+
+def code_mask(column):
+    # Какие ячейки столбца похожи на шифр (см. rate_index.normalize_code)
+    codes = column.str.lower().str.replace("ё", "е").str.replace(" ", "")
+    return codes.str.fullmatch(CODE_PATTERN.pattern).fillna(False).astype(bool)
+
+
+def guess_key_column(cells):
+    # Столбец с наибольшим числом разных значений вида шифра
+    sample = cells.head(KEY_SAMPLE)
+    counts = sample.apply(lambda column: column[code_mask(column)].nunique())
+    return counts.idxmax() if len(counts) and counts.max() > 0 else cells.columns[0]
+
+
+def row_roles(cells, keyed, key):
+    # Роли столбцов по строкам с шифром: числовые (число в большинстве таких
+    # строк) и столбец наименования (самый длинный текст среди остальных)
+    sample = cells[keyed].head(KEY_SAMPLE)
+    others = [column for column in cells.columns if column != key]
+    if sample.empty or not others:
+        return [], None
+    numbers = sample[others].apply(lambda column: column.str.fullmatch(NUMBER_PATTERN).fillna(False).mean())
+    numeric = [column for column in others if numbers[column] >= 0.5]
+    texts = [column for column in others if column not in numeric]
+    description = sample[texts].apply(lambda column: column.str.len().mean()).idxmax() if texts else None
+    return numeric, description
+
+
+def looks_like_heading(text):
+    # Название раздела начинается с заглавной буквы ("Раздел 2", "2. Бетонные
+    # работы"), а продолжение строки с прошлой страницы обычно со строчной
+    letters = [char for char in text if char.isalpha()]
+    return bool(letters) and letters[0].isupper()
+
+
+def is_continuation(anchor, anchor_keyed, row, numeric, description):
+    # Строка в начале страницы продолжает последнюю строку прошлой страницы:
+    # - у той строки шифр и пустые числовые столбцы, которые эта строка заполняет
+    #   (строку разрезало посередине);
+    # - или в этой строке только текст наименования и он не похож на название раздела
+    if anchor_keyed and any(not anchor[column] and row[column] for column in numeric):
+        return True
+    filled = [column for column, value in enumerate(row) if value]
+    return filled == [description] and not looks_like_heading(row[description])
+
+
+def header_repeats(hashes, coded):
+    # Маска строк — повторов шапки. Шапка — строки без шифра в начале таблицы
+    # (не больше HEADER_ROWS). Повтор начинается со строки, равной первой
+    # строке шапки; длина блока — наибольшая, которая повторяется целиком при
+    # каждом таком повторе (за шапкой может идти название раздела, которого
+    # на следующих страницах нет)
+    import numpy as np
+
+    repeated = np.zeros(len(hashes), dtype=bool)
+    lead = 0
+    while lead < min(HEADER_ROWS, len(hashes)) and not coded[lead]:
+        lead += 1
+    if not lead:
+        return repeated
+    starts = np.flatnonzero(hashes == hashes[0])[1:]
+    if not len(starts):
+        return repeated
+    size = 1
+    while size < lead:
+        positions = starts + size
+        if positions[-1] >= len(hashes) or not np.all(hashes[positions] == hashes[size]):
+            break
+        size += 1
+    # Повторы не перекрываются: блок не начинается внутри предыдущего
+    starts = starts[np.diff(starts, prepend=-size) >= size]
+    for offset in range(size):
+        repeated[starts + offset] = True
+    return repeated
+
+
+def normalize_table(df, pages=None, key_column=None, return_pages=False):
+    # Чистка склеенной из страниц таблицы одним проходом:
+    # - пустые строки и столбцы удаляются;
+    # - шапка, повторенная на следующих страницах, удаляется (остается первая);
+    # - строки без шифра в начале страницы — продолжение последней строки
+    #   предыдущей страницы, их текст дописывается к ней (если строку разрезало
+    #   или это продолжение наименования, см. is_continuation; название раздела
+    #   в начале страницы остается отдельной строкой).
+    # pages — номер страницы (или куска страниц) для каждой строки; граница
+    # страниц также видна по повторенной шапке.
+    # key_column — номер столбца с шифром среди оставшихся столбцов.
+    # С return_pages возвращает также pages для каждой строки результата
+    # (у склеенной строки — страница ее начала).
+    import numpy as np
+    import pandas as pd
+
+    with TIMER.stage("normalize_table", rows=len(df)):
+        source = np.zeros(len(df), dtype=np.int64) if pages is None else np.asarray(pages)
+        if df.empty:
+            return (df.reset_index(drop=True), source) if return_pages else df.reset_index(drop=True)
+        cells = clean_cells(df.reset_index(drop=True))
+        segment = pd.factorize(source)[0]
+
+        # Пустые строки и столбцы
+        filled = cells.ne("")
+        keep = filled.any(axis=1).to_numpy()
+        cells = cells.loc[keep, filled.any(axis=0)]
+        segment = segment[keep]
+        source = source[keep]
+        cells.columns = range(cells.shape[1])
+        if cells.empty:
+            return (cells.reset_index(drop=True), source) if return_pages else cells.reset_index(drop=True)
+
+        key = guess_key_column(cells) if key_column is None else key_column
+        keyed = cells[key].ne("").to_numpy()
+        coded = code_mask(cells[key]).to_numpy()
+
+        # Повторы шапки: блок первых строк таблицы без шифра, повторенный целиком
+        # с той же первой строки. Отдельная строка без шифра (название раздела)
+        # повтором шапки не считается
+        hashes = pd.util.hash_pandas_object(cells, index=False).to_numpy()
+        repeated = header_repeats(hashes, coded)
+        # После повторенной шапки начинается новая страница
+        segment = segment + np.cumsum(repeated)
+        cells = cells[~repeated]
+        segment = segment[~repeated]
+        source = source[~repeated]
+        keyed = keyed[~repeated]
+
+        # Кандидаты в продолжения: строки без шифра до первой строки с шифром
+        # на странице (кроме первой страницы)
+        seen_key = pd.Series(keyed.astype(np.int8)).groupby(segment).cummax().to_numpy() > 0
+        continuation = ~seen_key & (segment != segment[0])
+
+        if continuation.any():
+            numeric, description = row_roles(cells, keyed, key)
+            positions = np.arange(len(cells))
+            # Строка, к которой дописывается каждое продолжение, — последняя не-кандидат выше
+            anchors = np.maximum.accumulate(np.where(continuation, -1, positions))
+            values = cells.to_numpy(dtype=object)
+            stitched = np.zeros(len(cells), dtype=bool)
+            stopped = set()
+            # Кандидатов не больше нескольких на страницу, поэтому цикл по ним дешевый
+            for position in np.flatnonzero(continuation & (anchors >= 0)):
+                anchor = anchors[position]
+                # После первой самостоятельной строки (названия раздела)
+                # остальные строки страницы к прошлой странице не относятся
+                if segment[position] in stopped:
+                    continue
+                if not is_continuation(values[anchor], keyed[anchor], values[position], numeric, description):
+                    stopped.add(segment[position])
+                    continue
+                values[anchor] = [
+                    f"{a} {b}" if a and b else a or b for a, b in zip(values[anchor], values[position])
+                ]
+                stitched[position] = True
+            keep = ~stitched
+            cells = pd.DataFrame(values[keep], columns=cells.columns)
+            source = source[keep]
+
+        cells = cells.reset_index(drop=True)
+        return (cells, source) if return_pages else cells
+
+
+def normalize_frames(frames, key_column=None):
+    # Таблицы страниц (camelot) -> одна чистая таблица
+    import numpy as np
+    import pandas as pd
+
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame()
+    pages = np.repeat(np.arange(len(frames)), [len(df) for df in frames])
+    return normalize_table(pd.concat(frames, ignore_index=True), pages, key_column)
+
+
+def normalize_rows(rows, pages=None, key_column=None, return_pages=False):
+    # Строки (pdfplumber, PyMuPDF) -> чистые строки; pages — номер страницы
+    # (или куска страниц) для каждой строки
+    import pandas as pd
+
+    if not rows:
+        return ([], []) if return_pages else []
+    result = normalize_table(pd.DataFrame(rows), pages, key_column, return_pages)
+    if return_pages:
+        return result[0].to_numpy().tolist(), result[1].tolist()
+    return result.to_numpy().tolist()
@@ -0,0 +1,85 @@
+from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QPushButton, QComboBox, QDoubleSpinBox, QCheckBox, QLabel
+)
+
+from layout_cache import TABLE_SETTINGS, STRATEGIES
+
+
+class TableSettingsDialog(QDialog):
+    # Настройки сборки таблиц pdfplumber для повторного извлечения.
+    # Окно не модальное: после Apply таблица пересобирается, настройки
+    # можно менять дальше и сравнивать результат
+
+    # Настройки TableSettings и флаг "все таблицы страницы"
+    apply_settings = pyqtSignal(dict, bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Re-extract with settings")
+        self.setModal(False)
+
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
+        self.fields = {}
+        for name, default in TABLE_SETTINGS.items():
+            if name.endswith("_strategy"):
+                field = QComboBox(self)
+                field.addItems(STRATEGIES)
+                field.setCurrentText(default)
+            else:
+                field = QDoubleSpinBox(self)
+                field.setRange(0.0, 50.0)
+                field.setSingleStep(0.5)
+                field.setValue(default)
+            self.fields[name] = field
+            form.addRow(name.replace("_", " ").capitalize() + ":", field)
+        self.all_tables_checkbox = QCheckBox("All tables on a page", self)
+        form.addRow(self.all_tables_checkbox)
+        layout.addLayout(form)
+
+        # Сколько заняла последняя пересборка
+        self.result_label = QLabel("", self)
+        layout.addWidget(self.result_label)
+
+        buttons = QHBoxLayout()
+        self.btn_apply = QPushButton("Apply", self)
+        self.btn_apply.clicked.connect(self.on_apply)
+        buttons.addWidget(self.btn_apply)
+        btn_defaults = QPushButton("Defaults", self)
+        btn_defaults.clicked.connect(self.reset)
+        buttons.addWidget(btn_defaults)
+        btn_close = QPushButton("Close", self)
+        btn_close.clicked.connect(self.close)
+        buttons.addWidget(btn_close)
+        layout.addLayout(buttons)
+
+    def settings(self):
+        result = {}
+        for name, field in self.fields.items():
+            result[name] = field.currentText() if isinstance(field, QComboBox) else field.value()
+        return result
+
+    def reset(self):
+        for name, default in TABLE_SETTINGS.items():
+            field = self.fields[name]
+            if isinstance(field, QComboBox):
+                field.setCurrentText(default)
+            else:
+                field.setValue(default)
+        self.all_tables_checkbox.setChecked(False)
+
+    def on_apply(self):
+        # Apply блокирует окно программы, когда пересборка действительно началась
+        self.apply_settings.emit(self.settings(), self.all_tables_checkbox.isChecked())
+
+    def set_busy(self, busy, message=None):
+        self.btn_apply.setEnabled(not busy)
+        if message is not None:
+            self.result_label.setText(message)
+
+    def show_result(self, rows, seconds):
+        self.set_busy(False, f"{rows} rows in {seconds:.2f} s")
+
+    def show_error(self, message):
+        self.set_busy(False, f"Failed: {message}")
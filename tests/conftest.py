@@ -0,0 +1,18 @@
+import os
+import sys
+
+# Корень репозитория, чтобы тесты импортировали модули программы
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def make_pdf(path, pages=2):
+    # Маленький PDF с номером на каждой странице
+    import fitz as pymupdf
+    doc = pymupdf.open()
+    for number in range(pages):
+        doc.new_page().insert_text((72, 72), f"Страница {number + 1}")
+    doc.save(path)
+    doc.close()
+    return path
@@ -0,0 +1,12 @@
+import pytest
+
+from batch_convert import parse_columns
+
+
+def test_parse_columns_counts_from_one():
+    assert parse_columns("1, 3,5,") == [0, 2, 4]
+    assert parse_columns("") is None
+    # 0 выбрал бы последний столбец
+    for text in ("0", "1,-2", "1,a"):
+        with pytest.raises(ValueError):
+            parse_columns(text)
@@ -0,0 +1,42 @@
+import columnar
+from columnar import ColumnarTable, NumberColumn, TextColumn
+
+ROWS = [
+    ["Шифр", "Ед.", "Цена"],
+    ["ФЕР-1", "м3", "1 200,50"],
+    ["ФЕР-2", "м3", "900"],
+    ["ФЕР-3", None, ""],
+    ["ФЕР-4", "шт", "12.5"],
+    ["ФЕР-5", "шт", "-3"],
+]
+
+
+def test_rows_round_trip_with_typed_numbers(monkeypatch):
+    # Маленький блок: строки собираются из нескольких блоков столбцов
+    monkeypatch.setattr(columnar, "ROW_BLOCK", 2)
+    table = ColumnarTable.from_rows(ROWS)
+    assert table.shape == (6, 3)
+    assert isinstance(table.columns[1], TextColumn)
+    assert isinstance(table.columns[2], NumberColumn)
+    expected = [
+        ["Шифр", "Ед.", "Цена"],
+        ["ФЕР-1", "м3", 1200.5],
+        ["ФЕР-2", "м3", 900.0],
+        ["ФЕР-3", None, None],
+        ["ФЕР-4", "шт", 12.5],
+        ["ФЕР-5", "шт", -3.0],
+    ]
+    assert list(table) == expected
+    assert [table[row] for row in range(len(table))] == expected
+    assert table[-1] == expected[-1]
+    assert table.cell(0, 2) == "Цена"
+    # Выбор столбцов для экспорта, несуществующий столбец — пустые ячейки
+    assert list(table.iter_rows([2, 0, 5]))[1] == [1200.5, "ФЕР-1", None]
+
+
+def test_text_values_are_stored_once():
+    table = ColumnarTable.from_rows(ROWS, typed=False)
+    units = table.columns[1]
+    assert units.values.count("м3") == 1
+    assert units.block(0, 6) == ["Ед.", "м3", "м3", None, "шт", "шт"]
+    assert table.cell(2, 2) == "900"
@@ -0,0 +1,67 @@
+import os
+
+import extract_cache
+from extract_cache import ExtractionCache
+
+
+def test_round_trip_and_miss(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    rows = [["ФЕР-1", "м3", 10.5], ["ФЕР-2", "", None]]
+    cache.put("pdf", 1, "table", {"a": 1}, rows)
+    assert cache.get("pdf", 1, "table", {"a": 1}) == (True, rows)
+    # Другие параметры или страница — другая запись
+    assert cache.get("pdf", 1, "table", {"a": 2}) == (False, None)
+    assert cache.get("pdf", 2, "table", {"a": 1}) == (False, None)
+    assert (cache.hits, cache.misses) == (1, 2)
+    # Временных файлов после записи не остается
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    cache.put("pdf", 1, "table", {}, [["x"]])
+    with open(cache._path(cache.make_key("pdf", 1, "table", {})), "wb") as f:
+        f.write(b"not zlib")
+    assert cache.get("pdf", 1, "table", {}) == (False, None)
+    # Запись заменяется новой
+    cache.put("pdf", 1, "table", {}, [["y"]])
+    assert cache.get("pdf", 1, "table", {}) == (True, [["y"]])
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    for page in range(3):
+        cache.put("pdf", page, "table", {}, [[page]])
+        os.utime(cache._path(cache.make_key("pdf", page, "table", {})), (page, page))
+    # Страница 0 прочитана последней
+    assert cache.get("pdf", 0, "table", {})[0]
+    cache.max_bytes = sum(cache._load_index().values())
+    cache.put("pdf", 3, "table", {}, [[3]])
+    assert cache.evictions == 1
+    assert not cache.contains("pdf", 1, "table", {})
+    assert all(cache.contains("pdf", page, "table", {}) for page in (0, 2, 3))
+
+
+def test_eviction_sees_other_processes_entries(tmp_path, monkeypatch):
+    # Записи второго экземпляра (другого процесса) в тот же каталог
+    # учитываются при удалении, хотя в памяти первого их нет
+    monkeypatch.setattr(extract_cache, "RESCAN_INTERVAL", 0)
+    first = ExtractionCache(str(tmp_path))
+    first.put("pdf", 0, "table", {}, [[0]])
+    size = first.stats()["bytes"]
+    other = ExtractionCache(str(tmp_path))
+    for page in range(1, 4):
+        other.put("other", page, "table", {}, [[page]])
+    first.max_bytes = 2 * size
+    first.put("pdf", 4, "table", {}, [[4]])
+    assert first.stats()["bytes"] <= 2 * size
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".bin")]) == 2
+
+
+def test_failed_write_is_not_an_error(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    # На месте записи каталог — replace не удается
+    os.makedirs(cache._path(cache.make_key("pdf", 1, "table", {})))
+    cache.put("pdf", 1, "table", {}, [["x"]])
+    assert cache.get("pdf", 1, "table", {}) == (False, None)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
@@ -0,0 +1,39 @@
+import asyncio
+import json
+
+import pytest
+
+from extract_service import HttpError, Job, json_blocks, read_request, result_rows
+
+
+def parse(raw):
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        return await read_request(reader)
+    return asyncio.run(run())
+
+
+def test_read_request():
+    method, path, query, headers, body = parse(
+        b"POST /jobs/?engine=table&pages=1-2 HTTP/1.1\r\nContent-Length: 4\r\n\r\n%PDF"
+    )
+    assert (method, path, query, body) == ("POST", "/jobs", {"engine": "table", "pages": "1-2"}, b"%PDF")
+
+
+@pytest.mark.parametrize("length", [b"abc", b"-5"])
+def test_bad_content_length_is_400(length):
+    with pytest.raises(HttpError) as error:
+        parse(b"POST /jobs HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n")
+    assert error.value.status == 400
+
+
+def test_result_columns():
+    job = Job("doc.pdf", "table", {})
+    job.chunks = [(1, 1, [["ФЕР-1", "Работа", 1.5]]), (2, 2, [["ФЕР-2", None, 2]])]
+    rows, columns = result_rows(job, {"columns": "1,3"})
+    assert json.loads(b"".join(json_blocks(rows, rows_per_block=1))) == [["ФЕР-1", 1.5], ["ФЕР-2", 2]]
+    with pytest.raises(HttpError) as error:
+        result_rows(job, {"columns": "0"})
+    assert error.value.status == 400
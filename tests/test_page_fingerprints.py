@@ -0,0 +1,53 @@
+import pytest
+
+from pdf_extract import page_fingerprints
+
+pymupdf = pytest.importorskip("fitz")
+
+
+def text_page(text):
+    doc = pymupdf.open()
+    doc.new_page().insert_text((72, 72), text)
+    return doc
+
+
+def save_shown(path, *sources, nested=False):
+    # Страницы рисуют чужие страницы как форму (Do), поток страницы одинаковый
+    doc = pymupdf.open()
+    for source in sources:
+        if nested:
+            middle = pymupdf.open()
+            page = middle.new_page()
+            page.show_pdf_page(page.rect, source, 0)
+            source = middle
+        page = doc.new_page()
+        page.show_pdf_page(page.rect, source, 0)
+    doc.save(path)
+    return str(path)
+
+
+@pytest.mark.parametrize("nested", [False, True])
+def test_form_content_changes_fingerprint(tmp_path, nested):
+    first = save_shown(tmp_path / "a.pdf", text_page("Rate 73,40"), nested=nested)
+    second = save_shown(tmp_path / "b.pdf", text_page("Rate 99,99"), nested=nested)
+    assert page_fingerprints(first) != page_fingerprints(second)
+
+
+def test_same_form_page_keeps_fingerprint(tmp_path):
+    # Та же страница на другом месте (другие номера объектов) — тот же отпечаток
+    old = save_shown(tmp_path / "old.pdf", text_page("Rate 73,40"), text_page("Rate 10,00"))
+    new = save_shown(tmp_path / "new.pdf", text_page("Rate 99,99"), text_page("Rate 73,40"))
+    assert page_fingerprints(old)[0] == page_fingerprints(new)[1]
+    assert page_fingerprints(old)[1] != page_fingerprints(new)[0]
+
+
+def test_image_content_changes_fingerprint(tmp_path):
+    paths = []
+    for name, color in (("a", b"\x00\x00\x00"), ("b", b"\xff\xff\xff")):
+        doc = pymupdf.open()
+        page = doc.new_page()
+        page.insert_image(page.rect, pixmap=pymupdf.Pixmap(pymupdf.csRGB, 1, 1, color, False))
+        path = str(tmp_path / f"{name}.pdf")
+        doc.save(path)
+        paths.append(path)
+    assert page_fingerprints(paths[0]) != page_fingerprints(paths[1])
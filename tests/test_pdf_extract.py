@@ -0,0 +1,27 @@
+import sys
+
+import pdf_extract
+from conftest import make_pdf
+
+
+def test_auto_keeps_pymupdf_rows_without_camelot(tmp_path, monkeypatch, capsys):
+    pdf = make_pdf(str(tmp_path / "doc.pdf"))
+    # Все страницы выглядят неверно, а Camelot не импортируется
+    monkeypatch.setattr(pdf_extract, "looks_broken", lambda rows: True)
+    monkeypatch.setattr(pdf_extract, "pymupdf_page_rows", lambda page, strategy: [[str(page.number + 1)]])
+    monkeypatch.setattr(pdf_extract, "_camelot_missing_reported", False)
+    monkeypatch.setitem(sys.modules, "camelot", None)
+    assert list(pdf_extract.iter_auto(pdf, [1, 2])) == [[["1"]], [["2"]]]
+    assert capsys.readouterr().err.count("Camelot is not installed") == 1
+
+
+def test_pool_timings_reach_parent(tmp_path):
+    import os
+    from timing import TIMER
+
+    pdf = make_pdf(str(tmp_path / "doc.pdf"), pages=4)
+    TIMER.clear()
+    pdf_extract.extract(pdf, "table", workers=2)
+    pages = [event for event in TIMER.events if event["name"] == "parse_page"]
+    assert sorted(event["args"]["page"] for event in pages) == [1, 2, 3, 4]
+    assert os.getpid() not in {event["pid"] for event in pages}
@@ -0,0 +1,12 @@
+from rate_diff import diff_rates
+
+
+def test_changed_sorts_mixed_codes_and_values():
+    # После перевода в числа шифры и ячейки бывают и текстом, и числами
+    old = [["Шифр", "Цена"], ["ФЕР-2", "abc"], [1201.0, "x"], ["ФЕР-1", 10.0]]
+    new = [["Шифр", "Цена"], ["ФЕР-1", "11"], [1201.0, "y"], ["ФЕР-2", 3.0]]
+    assert diff_rates(old, new, 0)["changed"] == [
+        (1201.0, 1, "x", "y"),
+        ("ФЕР-1", 1, 10.0, "11"),
+        ("ФЕР-2", 1, "abc", 3.0),
+    ]
@@ -0,0 +1,50 @@
+from rate_index import RateIndex, normalize_code
+
+ROWS = [
+    ["Шифр", "Наименование", "Ед.", "Цена"],
+    ["01-01-001", "Разработка грунта экскаватором", "1000 м3", 1200.5],
+    ["01-01-002", "Разработка грунта бульдозером", "1000 м3", 900.0],
+    ["01-02-001", "Уплотнение грунта катками", "1000 м3", None],
+    ["ЦС-16/22/23.212", "Щебень  Ёлкинский", "м3", "350"],
+    [None, "продолжение: засыпка", "", ""],
+]
+
+
+def test_guesses_code_column_and_finds_codes():
+    index = RateIndex(iter(ROWS))
+    assert index.code_column == 0
+    assert index.row_count == len(ROWS)
+    assert index.find_code("01-01- 001") == [1]
+    assert index.find_code_prefix("01-01") == [1, 2]
+    assert index.find_code_prefix("цс-16") == [4]
+    assert index.find_code("02-01-001") == []
+
+
+def test_text_search_ignores_case_spaces_and_yo():
+    index = RateIndex(ROWS)
+    assert index.find_text("ГРУНТА") == [1, 2, 3]
+    assert index.find_text("щебень елкинский") == [4]
+    assert index.find_text("1200.5") == [1]
+    assert index.find_text("") == list(range(len(ROWS)))
+
+
+def test_narrowing_matches_fresh_search():
+    # Запрос, набираемый по символу: каждый следующий ищется среди прошлых
+    # совпадений, результат тот же, что у поиска с нуля
+    index = RateIndex(ROWS)
+    for query in ["0", "01", "01-", "01-0", "01-01", "01-01-", "01-01-0", "01-01-00", "01-01-002"]:
+        assert index.search(query) == RateIndex(ROWS).search(query), query
+    assert index.search("01-01-002") == [2]
+    for query in ["г", "гр", "грун", "грунта б"]:
+        assert index.search(query) == RateIndex(ROWS).search(query), query
+    assert index.search("") is None
+    # После сброса поиск снова идет по всей таблице
+    assert index.search("засыпка") == [5]
+
+
+def test_dense_query_uses_row_texts():
+    rows = [[f"01-01-{i:03}", "грунт"] for i in range(100)]
+    index = RateIndex(rows)
+    assert index.find_text("г") == list(range(100))
+    assert index.search("01-01-05") == list(range(50, 60))
+    assert normalize_code(" 01-01- 05 ") == "01-01-05"
@@ -0,0 +1,28 @@
+import os
+
+import session
+from conftest import make_pdf
+from session import ExtractionSession
+
+
+def crashing_extract(file_path, engine, pages, **params):
+    # Процесс пула падает на документе с "crash" в имени
+    name = os.path.basename(file_path)
+    if "crash" in name:
+        os._exit(1)
+    return [[[name, number]] for number in pages], []
+
+
+def test_worker_crash_fails_only_its_document(tmp_path, monkeypatch):
+    monkeypatch.setattr(session, "extract_page_results_timed", crashing_extract)
+    paths = [make_pdf(str(tmp_path / name), pages=3) for name in ("a.pdf", "crash.pdf", "b.pdf")]
+    extraction = ExtractionSession(paths, workers=2, chunk=1)
+    pages = {index: [] for index in range(len(paths))}
+    for kind, index, payload in extraction.iter_results():
+        if kind == "pages":
+            pages[index].extend(payload)
+    assert extraction.errors[0] == extraction.errors[2] == ""
+    assert extraction.errors[1].startswith("worker process crashed on pages")
+    assert pages[0] == [(number, [["a.pdf", number]]) for number in (1, 2, 3)]
+    assert pages[2] == [(number, [["b.pdf", number]]) for number in (1, 2, 3)]
+    assert pages[1] == []
@@ -0,0 +1,76 @@
+from table_normalize import normalize_rows
+
+
+HEADER = ["Шифр", "Наименование", "Цена"]
+
+
+def test_repeated_section_title_is_kept():
+    # Название раздела сразу под шапкой и еще раз в данных — не шапка
+    rows = [
+        HEADER,
+        ["Раздел 1", "", ""],
+        ["ФЕР01-01-001", "Работа a", "10"],
+        HEADER,
+        ["ФЕР01-01-002", "Работа b", "11"],
+        ["Раздел 1", "", ""],
+        ["ФЕР01-01-003", "Работа c", "12"],
+        HEADER,
+        ["", "продолжение c", ""],
+        ["ФЕР01-01-004", "Работа d", "13"],
+    ]
+    assert normalize_rows(rows, [1, 1, 1, 2, 2, 2, 2, 3, 3, 3]) == [
+        HEADER,
+        ["Раздел 1", "", ""],
+        ["ФЕР01-01-001", "Работа a", "10"],
+        ["ФЕР01-01-002", "Работа b", "11"],
+        ["Раздел 1", "", ""],
+        ["ФЕР01-01-003", "Работа c продолжение c", "12"],
+        ["ФЕР01-01-004", "Работа d", "13"],
+    ]
+
+
+def test_multi_row_header_repeats_without_pages():
+    # Шапка из двух строк; границы страниц видны только по ее повтору
+    second = ["", "", "руб."]
+    rows = [
+        HEADER, second,
+        ["ФЕР01-01-001", "Работа a", "10"],
+        HEADER, second,
+        ["", "продолжение a", ""],
+        ["ФЕР01-01-002", "Работа b", "11"],
+    ]
+    assert normalize_rows(rows) == [
+        HEADER, second,
+        ["ФЕР01-01-001", "Работа a продолжение a", "10"],
+        ["ФЕР01-01-002", "Работа b", "11"],
+    ]
+
+
+def test_section_title_at_page_start_is_not_stitched():
+    # Страница начинается с названия раздела без шифра — оно остается
+    # отдельной строкой, как и строки под ним до первого шифра
+    rows = [
+        HEADER,
+        ["ФЕР01-01-001", "Работа a", "10"],
+        ["", "Раздел 2. Бетонные работы", ""],
+        ["", "подраздел без заглавной", ""],
+        ["ФЕР01-01-002", "Работа b", "11"],
+    ]
+    assert normalize_rows(rows, [1, 1, 2, 2, 2]) == rows
+
+
+def test_row_cut_across_pages_is_stitched():
+    # Цена строки ушла на следующую страницу вместе с концом наименования
+    rows = [
+        HEADER,
+        ["ФЕР01-01-001", "Работа a", "10"],
+        ["ФЕР01-01-002", "Работа b с", ""],
+        ["", "Окончанием", "11"],
+        ["ФЕР01-01-003", "Работа c", "12"],
+    ]
+    assert normalize_rows(rows, [1, 1, 1, 2, 2]) == [
+        HEADER,
+        ["ФЕР01-01-001", "Работа a", "10"],
+        ["ФЕР01-01-002", "Работа b с Окончанием", "11"],
+        ["ФЕР01-01-003", "Работа c", "12"],
+    ]
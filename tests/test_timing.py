@@ -0,0 +1,12 @@
+from timing import StageTimer
+
+
+def test_max_events_keeps_latest():
+    timer = StageTimer(max_events=8)
+    for number in range(20):
+        timer.add("page", 0.0, 1.0, page=number)
+    assert 8 <= len(timer.events) <= 10
+    assert timer.events[-1]["args"]["page"] == 19
+    timer.extend([dict(timer.events[0], args={"page": number}) for number in range(20, 40)])
+    assert timer.events[-1]["args"]["page"] == 39
+    assert len(timer.events) <= 10
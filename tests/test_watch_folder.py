@@ -0,0 +1,69 @@
+import os
+import time
+
+import watch_folder
+from watch_folder import FolderWatcher
+
+
+def fake_convert(pdf_path, output_dir, columns=None, **options):
+    # Вместо конвертации: "crash" в имени роняет процесс пула, "bad" — ошибка
+    name = os.path.basename(pdf_path)
+    if "crash" in name:
+        os._exit(1)
+    if "bad" in name:
+        raise ValueError("broken table")
+    return pdf_path, os.path.join(output_dir, name + ".xlsx"), 0.0, []
+
+
+def drain(watcher, timeout=60):
+    deadline = time.time() + timeout
+    while (watcher.pending or watcher.running) and time.time() < deadline:
+        watcher.submit()
+        watcher.collect(0.2)
+
+
+def test_crash_and_error_do_not_stop_or_poison_the_watcher(tmp_path, monkeypatch):
+    monkeypatch.setattr(watch_folder, "convert_file", fake_convert)
+    inbox = tmp_path / "in"
+    inbox.mkdir()
+    for name in ("a.pdf", "crash.pdf", "bad.pdf", "b.pdf"):
+        (inbox / name).write_bytes(b"%PDF " + name.encode())
+
+    watcher = FolderWatcher(str(inbox), str(tmp_path / "out"), workers=1)
+    watcher.pool = watcher.new_pool()
+    try:
+        # Вторая проверка видит, что размер не изменился
+        watcher.scan()
+        watcher.scan()
+        assert len(watcher.pending) == 4
+        drain(watcher)
+        assert watcher.counters == {"converted": 2, "failed": 2, "skipped": 0}
+        assert sorted(os.path.basename(record["pdf"]) for record in watcher.processed.values()) == ["a.pdf", "b.pdf"]
+        assert max(watcher.crashes.values()) == watch_folder.CRASH_RETRIES + 1
+
+        # Пул после падений рабочий; файлы с ошибкой снова берутся после перезапуска
+        (inbox / "c.pdf").write_bytes(b"%PDF c")
+        restarted = FolderWatcher(str(inbox), str(tmp_path / "out"), workers=1)
+        restarted.pool = watcher.pool
+        restarted.scan()
+        restarted.scan()
+        assert sorted(os.path.basename(path) for path, _, _ in restarted.pending) == ["bad.pdf", "c.pdf", "crash.pdf"]
+        assert restarted.counters["skipped"] == 2
+    finally:
+        watcher.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def test_scan_skips_files_removed_during_the_scan(tmp_path, monkeypatch):
+    (tmp_path / "a.pdf").write_bytes(b"%PDF a")
+    (tmp_path / "gone.pdf").write_bytes(b"%PDF gone")
+    real_scandir = os.scandir
+
+    def scandir(path):
+        entries = list(real_scandir(path))
+        os.remove(tmp_path / "gone.pdf")
+        return iter(entries)
+
+    watcher = FolderWatcher(str(tmp_path), str(tmp_path / "out"), workers=1)
+    monkeypatch.setattr(watch_folder.os, "scandir", scandir)
+    watcher.scan()
+    assert list(watcher._seen) == [str(tmp_path / "a.pdf")]
@@ -0,0 +1,68 @@
+import os
+import shutil
+import zipfile
+
+import pytest
+
+from conftest import ROOT
+from xlsx_template import fill_template
+
+TEMPLATES = ["Расценки.xlsx", "1.xlsx", "!Расценки 5.xlsx"]
+
+
+@pytest.mark.parametrize("name", TEMPLATES)
+def test_fill_keeps_other_cells_and_parts(tmp_path, name):
+    import openpyxl
+
+    template = os.path.join(ROOT, name)
+    output = str(tmp_path / "out.xlsx")
+    rows = [["ЦС-01.01.001", "Работа <a> & b", 12.5, None], ["ЦС-01.01.002", "", 7, True]]
+    # Вставка между существующими строками и за последней строкой листа
+    assert fill_template(rows, template, output, anchor="B3") == 2
+    last = openpyxl.load_workbook(template).active.max_row
+    fill_template(rows[:1], output, anchor=f"A{last + 2}")
+
+    before = openpyxl.load_workbook(template).active
+    after = openpyxl.load_workbook(output).active
+    # None очищает ячейку (стиль остается)
+    assert [[cell.value for cell in row] for row in after.iter_rows(min_row=3, max_row=4, min_col=2, max_col=5)] == [
+        ["ЦС-01.01.001", "Работа <a> & b", 12.5, None],
+        ["ЦС-01.01.002", "", 7, True],
+    ]
+    assert after.cell(last + 2, 1).value == "ЦС-01.01.001"
+    # Ячейки вне вставки не меняются
+    for row in (1, 2, 5, last):
+        assert [after.cell(row, column).value for column in range(1, before.max_column + 1)] == [
+            cell.value for cell in before[row]
+        ]
+    assert after.cell(3, 1).value == before.cell(3, 1).value
+
+    # Нетронутые части скопированы теми же сжатыми байтами
+    with zipfile.ZipFile(template) as source, zipfile.ZipFile(output) as result:
+        assert result.testzip() is None
+        assert result.namelist() == source.namelist()
+        for info in source.infolist():
+            if not info.filename.startswith("xl/worksheets/"):
+                copied = result.getinfo(info.filename)
+                assert (copied.CRC, copied.compress_size) == (info.CRC, info.compress_size)
+
+
+def test_fill_in_place_drops_calc_chain(tmp_path):
+    template = str(tmp_path / "book.xlsx")
+    shutil.copy(os.path.join(ROOT, "1.xlsx"), template)
+    # Книга с цепочкой вычислений: она удаляется вместе со ссылками на нее
+    with zipfile.ZipFile(template) as source:
+        parts = {info.filename: source.read(info) for info in source.infolist()}
+    parts["xl/calcChain.xml"] = b'<calcChain xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"/>'
+    parts["[Content_Types].xml"] = parts["[Content_Types].xml"].replace(
+        b"</Types>", b'<Override PartName="/xl/calcChain.xml" ContentType="application/calc"/></Types>'
+    )
+    with zipfile.ZipFile(template, "w", zipfile.ZIP_DEFLATED) as book:
+        for name, data in parts.items():
+            book.writestr(name, data)
+
+    fill_template([[1, 2]], template, anchor="A2")
+    with zipfile.ZipFile(template) as result:
+        assert "xl/calcChain.xml" not in result.namelist()
+        assert b"calcChain" not in result.read("[Content_Types].xml")
+    assert not os.path.exists(template + ".tmp")
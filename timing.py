@@ -0,0 +1,95 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+
+class StageTimer:
+    # Замеры этапов обработки: имя этапа, начало, длительность и доп. данные
+    # (например, номер страницы). Можно выгрузить в формате Chrome trace
+    # и открыть в chrome://tracing или Perfetto. Начало хранится как время
+    # по часам, поэтому замеры из разных процессов можно сложить вместе.
+    # max_events — сколько последних замеров хранить (для долго работающих
+    # процессов вроде службы извлечения); None — без ограничения.
+
+    def __init__(self, max_events=None):
+        self.events = []
+        self.max_events = max_events
+        self._origin = time.perf_counter()
+        self._wall_origin = time.time()
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self.events = []
+
+    def add(self, name, started, finished, **args):
+        # started/finished — значения time.perf_counter()
+        event = {
+            "name": name,
+            "start": self._wall_origin + (started - self._origin),
+            "duration": finished - started,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+        with self._lock:
+            self.events.append(event)
+            self._trim()
+
+    def extend(self, events):
+        # Добавить замеры, сделанные в другом процессе
+        with self._lock:
+            self.events.extend(events)
+            self._trim()
+
+    def _trim(self):
+        # Старые замеры удаляются пачкой, когда их на четверть больше предела,
+        # чтобы не сдвигать список при каждом новом замере
+        if self.max_events is not None and len(self.events) > self.max_events + self.max_events // 4:
+            del self.events[:len(self.events) - self.max_events]
+
+    @contextmanager
+    def stage(self, name, **args):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, started, time.perf_counter(), **args)
+
+    def summary(self):
+        # По каждому этапу: количество, суммарное и максимальное время, секунды
+        result = {}
+        with self._lock:
+            events = list(self.events)
+        for event in events:
+            item = result.setdefault(event["name"], {"count": 0, "total": 0.0, "max": 0.0})
+            item["count"] += 1
+            item["total"] += event["duration"]
+            item["max"] = max(item["max"], event["duration"])
+        return result
+
+    def dump_chrome_trace(self, file_path):
+        with self._lock:
+            events = list(self.events)
+        origin = min((event["start"] for event in events), default=0)
+        trace = [
+            {
+                "name": event["name"],
+                "cat": "stage",
+                "ph": "X",
+                "ts": round((event["start"] - origin) * 1e6, 1),
+                "dur": round(event["duration"] * 1e6, 1),
+                "pid": event["pid"],
+                "tid": event["tid"],
+                "args": event["args"],
+            }
+            for event in events
+        ]
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+
+# Общий таймер процесса
+TIMER = StageTimer()
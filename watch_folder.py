@@ -0,0 +1,319 @@
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from pdf_extract import DEFAULT_WORKERS
+from page_classify import parse_page_range
+from extract_cache import file_hash
+from batch_convert import convert_file, columns_arg
+
+
+# Служебный режим: каталог, куда приходят PDF справочников, проверяется раз
+# в несколько секунд; новые и измененные файлы конвертируются в XLSX тем же
+# способом, что batch_convert, с сохраненным выбором столбцов.
+
+# Как часто проверять каталог и печатать счетчики, с
+POLL_INTERVAL = 5.0
+STATUS_INTERVAL = 60.0
+
+# Файл состояния в каталоге выгрузки: настройки и уже обработанные PDF
+STATE_NAME = ".watch_state.json"
+# Текущие счетчики для внешнего мониторинга
+STATUS_NAME = ".watch_status.json"
+
+# За сколько последних секунд считается пропускная способность
+THROUGHPUT_WINDOW = 600.0
+
+# Сколько раз файл пробуется заново после падения процесса пула. Падение
+# ломает весь пул, и файлы, которые шли рядом, тоже пробуются заново
+CRASH_RETRIES = 2
+
+
+def write_json(data, file_path):
+    # Запись через временный файл: при остановке посреди записи старый файл цел
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, file_path)
+
+
+def ignore_interrupt():
+    # Ctrl+C получает вся группа процессов; останавливает работу только
+    # главный процесс, иначе начатые файлы считались бы ошибочными
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class FolderWatcher:
+    # Наблюдение за каталогом. Файл ставится в очередь, когда его размер
+    # и время изменения не менялись между двумя проверками (копирование
+    # закончено). Содержимое, которое уже обрабатывалось (по хэшу), не
+    # конвертируется повторно, даже если файл переименован или скопирован
+    # заново. Файл с ошибкой в состояние не записывается: после перезапуска
+    # службы (или нового копирования) он пробуется снова. Одновременно
+    # конвертируется не больше workers файлов, остальные ждут в очереди.
+
+    def __init__(self, watch_dir, output_dir, columns=None, workers=DEFAULT_WORKERS, options=None):
+        self.watch_dir = watch_dir
+        self.output_dir = output_dir
+        self.workers = max(1, workers)
+        # Остальные параметры convert_file: engine, params, normalize, typed...
+        self.options = options or {}
+        os.makedirs(output_dir, exist_ok=True)
+        self.state_path = os.path.join(output_dir, STATE_NAME)
+        self.status_path = os.path.join(output_dir, STATUS_NAME)
+
+        state = self._load_state()
+        # Выбор столбцов сохраняется: без -c берется выбор прошлого запуска
+        self.columns = columns if columns is not None else state.get("columns")
+        # Хэш содержимого -> итог успешной обработки (ошибки прежних версий
+        # состояния отбрасываются, такие файлы пробуются снова)
+        self.processed = {digest: record for digest, record in state.get("processed", {}).items()
+                          if "error" not in record}
+        # Хэш содержимого -> сколько раз на нем падал процесс пула
+        self.crashes = {}
+
+        # путь -> (размер, время изменения, уже поставлен в очередь) при прошлой проверке
+        self._seen = {}
+        self._queued = set()   # пути в очереди и в работе
+        self.pending = deque()
+        self.running = {}      # future -> (путь, хэш, момент постановки, пул)
+        self.pool = None
+        self.stopping = False
+        self.started = time.time()
+        self.counters = {"converted": 0, "failed": 0, "skipped": 0}
+        self._finished_times = deque()
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_state(self):
+        write_json({"columns": self.columns, "processed": self.processed}, self.state_path)
+
+    def scan(self):
+        # Новые и измененные PDF, копирование которых закончено
+        try:
+            entries = [entry for entry in os.scandir(self.watch_dir)
+                       if entry.is_file() and entry.name.lower().endswith(".pdf")]
+        except OSError as e:
+            print(f"Cannot read {self.watch_dir}: {e}", file=sys.stderr)
+            return
+        current = {}
+        for entry in sorted(entries, key=lambda item: item.name):
+            try:
+                stat = entry.stat()
+            except OSError:
+                # Файл удалили или переместили во время проверки
+                continue
+            signature = (stat.st_size, stat.st_mtime)
+            previous = self._seen.get(entry.path)
+            if previous is None or previous[:2] != signature:
+                # Файл появился или еще пишется — ждем следующей проверки
+                current[entry.path] = signature + (False,)
+                continue
+            if previous[2] or entry.path in self._queued:
+                current[entry.path] = previous
+                continue
+            # Размер не изменился с прошлой проверки: файл готов
+            current[entry.path] = signature + (True,)
+            self._enqueue(entry.path)
+        self._seen = current
+
+    def _enqueue(self, pdf_path):
+        try:
+            digest = file_hash(pdf_path)
+        except OSError as e:
+            print(f"Cannot read {pdf_path}: {e}", file=sys.stderr)
+            return
+        done = self.processed.get(digest)
+        if done is not None:
+            self.counters["skipped"] += 1
+            if os.path.basename(done["pdf"]) != os.path.basename(pdf_path):
+                print(f"SKIP  {pdf_path}: same content as {done['pdf']}")
+            return
+        self._queued.add(pdf_path)
+        self.pending.append((pdf_path, digest, time.time()))
+
+    def new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=ignore_interrupt)
+
+    def restart_pool(self, broken):
+        # Процесс пула упал (нехватка памяти, сбой в библиотеке): пул
+        # пересоздается один раз, даже если упавших задач несколько
+        if broken is self.pool:
+            self.pool = self.new_pool()
+            broken.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self):
+        # В пул уходит не больше workers файлов, остальные ждут в очереди
+        while self.pending and len(self.running) < self.workers and not self.stopping:
+            pdf_path, digest, queued = self.pending.popleft()
+            pool = self.pool
+            try:
+                future = pool.submit(convert_file, pdf_path, self.output_dir, self.columns, **self.options)
+            except BrokenProcessPool:
+                # Пул сломался до итога упавшей задачи: файл остается первым в очереди
+                self.pending.appendleft((pdf_path, digest, queued))
+                self.restart_pool(pool)
+                continue
+            self.running[future] = (pdf_path, digest, queued, pool)
+
+    def collect(self, timeout):
+        # Итоги завершившихся файлов; ждем не дольше timeout
+        if not self.running:
+            time.sleep(timeout)
+            return
+        done, _ = wait(list(self.running), timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            pdf_path, digest, queued, pool = self.running.pop(future)
+            try:
+                _, out_path, seconds, _ = future.result()
+            except BrokenProcessPool:
+                self.restart_pool(pool)
+                self.crashes[digest] = self.crashes.get(digest, 0) + 1
+                if self.crashes[digest] <= CRASH_RETRIES and not self.stopping:
+                    print(f"RETRY {pdf_path}: worker process crashed", file=sys.stderr)
+                    self.pending.appendleft((pdf_path, digest, queued))
+                    continue
+                error = "worker process crashed"
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            else:
+                error = None
+
+            self._queued.discard(pdf_path)
+            self._finished_times.append(time.time())
+            if error is not None:
+                # Ошибка одного файла не останавливает службу
+                self.counters["failed"] += 1
+                print(f"FAIL  {pdf_path}: {error}", file=sys.stderr)
+                continue
+            self.counters["converted"] += 1
+            self.crashes.pop(digest, None)
+            self.processed[digest] = {"pdf": pdf_path, "finished": time.strftime("%Y-%m-%d %H:%M:%S"),
+                                      "since_queued": round(time.time() - queued, 2),
+                                      "xlsx": out_path, "seconds": round(seconds, 2)}
+            print(f"OK    {pdf_path} -> {out_path} ({seconds:.2f} s)")
+        if done:
+            self.save_state()
+
+    def status(self):
+        # Счетчики: очередь, в работе, итоги и файлов в минуту за последние 10 минут
+        now = time.time()
+        while self._finished_times and self._finished_times[0] < now - THROUGHPUT_WINDOW:
+            self._finished_times.popleft()
+        window = min(THROUGHPUT_WINDOW, max(now - self.started, 1.0))
+        return {
+            "queued": len(self.pending),
+            "running": len(self.running),
+            **self.counters,
+            "files_per_minute": round(len(self._finished_times) * 60.0 / window, 2),
+            "uptime_seconds": round(now - self.started),
+            "stopping": self.stopping,
+        }
+
+    def report(self):
+        status = self.status()
+        write_json(status, self.status_path)
+        print(
+            f"Queue: {status['queued']}, running: {status['running']}, converted: {status['converted']}, "
+            f"failed: {status['failed']}, skipped: {status['skipped']}, {status['files_per_minute']} files/min"
+        )
+
+    def stop(self, *_):
+        # Первый сигнал: новые файлы не берем, дожидаемся начатых.
+        # Повторный: выходим сразу, начатые файлы обработаются при следующем запуске
+        if self.stopping:
+            raise KeyboardInterrupt
+        self.stopping = True
+        print(f"Stopping: waiting for {len(self.running)} running file(s), press Ctrl+C again to abort",
+              file=sys.stderr)
+
+    def run(self, poll_interval=POLL_INTERVAL, status_interval=STATUS_INTERVAL):
+        signal.signal(signal.SIGINT, self.stop)
+        if hasattr(signal, "SIGTERM"):
+            signal.signal(signal.SIGTERM, self.stop)
+
+        self.save_state()
+        print(f"Watching {self.watch_dir} -> {self.output_dir}, {self.workers} worker(s)")
+        self.pool = self.new_pool()
+        last_scan = last_report = 0.0
+        try:
+            while not self.stopping or self.running:
+                now = time.time()
+                if not self.stopping and now - last_scan >= poll_interval:
+                    self.scan()
+                    last_scan = now
+                self.submit()
+                if now - last_report >= status_interval:
+                    self.report()
+                    last_report = now
+                self.collect(min(poll_interval, 1.0))
+        except KeyboardInterrupt:
+            for future in self.running:
+                future.cancel()
+            self.pool.shutdown(wait=False, cancel_futures=True)
+        else:
+            self.pool.shutdown()
+        self.save_state()
+        self.report()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch a folder and convert incoming PDF rate tables to XLSX")
+    parser.add_argument("folder", help="directory where PDF files arrive")
+    parser.add_argument("-o", "--output-dir", default="output")
+    parser.add_argument("-c", "--columns", type=columns_arg,
+                        help="columns to export, e.g. 1,3,5; saved and reused on the next start (default: saved or all)")
+    parser.add_argument("--all-columns", action="store_true", help="forget the saved column selection")
+    parser.add_argument("--engine", choices=["table", "pymupdf", "camelot", "auto"], default="table")
+    parser.add_argument("--flavor", choices=["lattice", "stream"], default="lattice", help="camelot flavor")
+    parser.add_argument("-j", "--workers", type=int, default=DEFAULT_WORKERS, help="files converted at the same time")
+    parser.add_argument("--max-memory-mb", type=int, help="memory ceiling per worker process")
+    parser.add_argument("--normalize", action="store_true",
+                        help="drop repeated headers and empty rows, join rows split across pages")
+    parser.add_argument("--typed", action="store_true", help="write prices and other numbers as numeric cells")
+    parser.add_argument("--pages", help="pages to extract, e.g. 1-5,8 (default: all)")
+    parser.add_argument("--prefilter", action="store_true", help="extract only pages that look like ruled tables")
+    parser.add_argument("--template", help="fill a copy of this workbook instead of creating a new one")
+    parser.add_argument("--sheet", help="template sheet to fill (default: first)")
+    parser.add_argument("--anchor", default="A12", help="template cell where the data starts (default: A12)")
+    parser.add_argument("--poll", type=float, default=POLL_INTERVAL, help="seconds between folder checks")
+    parser.add_argument("--status-interval", type=float, default=STATUS_INTERVAL,
+                        help="seconds between counter reports")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.folder):
+        print(f"Folder not found: {args.folder}", file=sys.stderr)
+        return 2
+
+    options = {
+        "engine": args.engine,
+        "params": {"flavor": args.flavor, "strip_text": "\n"} if args.engine == "camelot" else {},
+        "max_memory_mb": args.max_memory_mb,
+        "normalize": args.normalize,
+        "typed": args.typed,
+        "template": (args.template, args.sheet, args.anchor) if args.template else None,
+        "pages": parse_page_range(args.pages),
+        "prefilter": args.prefilter,
+    }
+    watcher = FolderWatcher(args.folder, args.output_dir, args.columns, args.workers, options)
+    if args.all_columns:
+        watcher.columns = None
+    if watcher.columns is not None:
+        print(f"Columns: {','.join(str(i + 1) for i in watcher.columns)}")
+    watcher.run(args.poll, args.status_interval)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
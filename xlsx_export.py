@@ -0,0 +1,148 @@
+from timing import TIMER
+
+# pandas и openpyxl импортируются внутри функций, при первом экспорте
+
+
+def to_frame(data):
+    # Приводим результат извлечения к одному DataFrame:
+    # DataFrame, список DataFrame (Camelot) или список строк (pdfplumber)
+    import pandas as pd
+
+    if isinstance(data, pd.DataFrame):
+        return data
+    if data and all(isinstance(item, pd.DataFrame) for item in data):
+        return pd.concat(data, ignore_index=True)
+    return pd.DataFrame(data)
+
+
+def select_columns(data, selected_columns):
+    # DataFrame только с выбранными столбцами (индексы с нуля)
+    return to_frame(data).iloc[:, selected_columns]
+
+
+def write_table(df_selected, file_path):
+    # Новая книга: заголовки жирным, все ячейки по центру и с рамкой
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment, Border, Side
+    from openpyxl.utils.dataframe import dataframe_to_rows
+
+    workbook = Workbook()
+    sheet = workbook.active
+
+    # Записываем заголовки столбцов
+    for col_num, header in enumerate(df_selected.columns, 1):
+        cell = sheet.cell(row=1, column=col_num, value=header)
+        cell.font = Font(bold=True)
+        cell.alignment = Alignment(horizontal='center')
+        cell.border = Border(
+            left=Side(style='thin'),
+            right=Side(style='thin'),
+            top=Side(style='thin'),
+            bottom=Side(style='thin')
+        )
+
+    # Записываем данные в Excel
+    for row in dataframe_to_rows(df_selected, index=False, header=False):
+        sheet.append(row)
+
+    # Применяем форматирование к данным
+    for row in sheet.iter_rows(min_row=2, max_row=sheet.max_row, min_col=1, max_col=sheet.max_column):
+        for cell in row:
+            cell.alignment = Alignment(horizontal='center')
+            cell.border = Border(
+                left=Side(style='thin'),
+                right=Side(style='thin'),
+                top=Side(style='thin'),
+                bottom=Side(style='thin')
+            )
+
+    # Сохраняем файл
+    with TIMER.stage("xlsx_save"):
+        workbook.save(file_path)
+
+
+def select_row_columns(rows, selected_columns):
+    # Генератор строк только с выбранными столбцами, без сборки DataFrame
+    for row in rows:
+        yield [row[i] if i < len(row) else None for i in selected_columns]
+
+
+def write_rows_streaming(rows, file_path, headers):
+    # То же оформление, что у write_table, но книга пишется потоково:
+    # строки из итератора сразу уходят в файл, стили общие (именованные)
+    # на все ячейки. Возвращает число записанных строк
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, Alignment, Border, Side, NamedStyle
+
+    # Тонкая рамка со всех сторон
+    thin_border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    workbook = Workbook(write_only=True)
+    header_style = NamedStyle(name="rate_header", font=Font(bold=True),
+                              alignment=Alignment(horizontal='center'), border=thin_border)
+    cell_style = NamedStyle(name="rate_cell", alignment=Alignment(horizontal='center'), border=thin_border)
+    workbook.add_named_style(header_style)
+    workbook.add_named_style(cell_style)
+    sheet = workbook.create_sheet()
+
+    def styled(value, style):
+        # Пустые числовые ячейки (NaN) пишем пустыми
+        cell = WriteOnlyCell(sheet, value=None if value != value else value)
+        cell.style = style
+        return cell
+
+    # Записываем заголовки столбцов
+    sheet.append([styled(header, "rate_header") for header in headers])
+
+    # Записываем данные построчно
+    count = 0
+    with TIMER.stage("xlsx_write_rows"):
+        for row in rows:
+            sheet.append([styled(value, "rate_cell") for value in row])
+            count += 1
+
+    # Сохраняем файл
+    with TIMER.stage("xlsx_save", rows=count):
+        workbook.save(file_path)
+    return count
+
+
+def write_table_streaming(df_selected, file_path):
+    return write_rows_streaming(df_selected.itertuples(index=False, name=None), file_path, list(df_selected.columns))
+
+
+def write_into_workbook(df_selected, file_path, start_row=12):
+    # Запись в существующую книгу (шаблон) начиная с указанной строки
+    from openpyxl import Workbook, load_workbook
+    from openpyxl.styles import Font, Alignment
+
+    try:
+        workbook = load_workbook(file_path)
+    except FileNotFoundError:
+        workbook = Workbook()
+
+    # Выбираем активный лист (или создаем новый)
+    sheet = workbook.active
+
+    # Записываем заголовки столбцов
+    for col_num, header in enumerate(df_selected.columns, 1):
+        sheet.cell(row=start_row - 1, column=col_num, value=header).font = Font(bold=True)
+
+    # Записываем данные в Excel, начиная с указанной строки
+    for i, row in enumerate(df_selected.itertuples(index=False)):
+        for j, value in enumerate(row):
+            sheet.cell(row=start_row + i, column=j + 1, value=None if value != value else value)
+
+    # Выравнивание текста по центру
+    for row in sheet.iter_rows(min_row=start_row - 1, max_row=start_row + len(df_selected) - 1):
+        for cell in row:
+            cell.alignment = Alignment(horizontal='center')
+
+    # Сохраняем файл
+    with TIMER.stage("xlsx_save"):
+        workbook.save(file_path)
@@ -0,0 +1,257 @@
+import os
+import re
+import math
+import struct
+import zlib
+import numbers
+import zipfile
+import posixpath
+from xml.sax.saxutils import escape, unescape
+
+from timing import TIMER
+
+
+# Запись данных в готовую книгу-шаблон без openpyxl: в пакете xlsx меняется
+# только XML нужного листа (ячейки в строках вставки), остальные части файла
+# копируются как есть — сжатыми байтами, без распаковки и повторного сжатия.
+# Время зависит от числа вставленных строк, а не от размера шаблона.
+
+_SHEET_DATA = re.compile(r"<sheetData\b[^>]*?(?:/>|>(.*?)</sheetData>)", re.S)
+_ROW = re.compile(r"<row\b([^>]*?)(?:/>|>(.*?)</row>)", re.S)
+_CELL = re.compile(r"<c\b([^>]*?)(?:/>|>.*?</c>)", re.S)
+_ATTR = r'\b{}="([^"]*)"'
+_DIMENSION = re.compile(r'(<dimension\b[^>]*?\bref=")([^"]*)(")')
+_CELL_REF = re.compile(r"([A-Z]+)(\d+)")
+# Символы, недопустимые в XML
+_ILLEGAL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+# Заголовки ZIP: локальный, запись центрального каталога, конец каталога
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_CENTRAL_HEADER = struct.Struct("<4s6H3L5H2L")
+_END_RECORD = struct.Struct("<4s4H2LH")
+# Флаги ZIP: размеры после данных (дескриптор) и имена в UTF-8
+_FLAG_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+
+
+def column_index(letters):
+    # "A" -> 1, "AB" -> 28
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index
+
+
+def column_letters(index):
+    letters = ""
+    while index:
+        index, rest = divmod(index - 1, 26)
+        letters = chr(ord("A") + rest) + letters
+    return letters
+
+
+def parse_anchor(anchor):
+    # "B12" -> (12, 2)
+    match = _CELL_REF.fullmatch(anchor.strip().upper())
+    if not match:
+        raise ValueError(f"bad anchor cell: {anchor!r}")
+    return int(match.group(2)), column_index(match.group(1))
+
+
+def _attr(name, text):
+    match = re.search(_ATTR.format(name), text)
+    return match.group(1) if match else None
+
+
+def find_sheet_part(package, sheet=None):
+    # Путь XML листа внутри пакета: по имени листа или первый лист книги
+    workbook = package.read("xl/workbook.xml").decode("utf-8")
+    rels = package.read("xl/_rels/workbook.xml.rels").decode("utf-8")
+    sheets = re.findall(r"<sheet\b([^>]*?)/?>", workbook)
+    if not sheets:
+        raise ValueError("workbook has no sheets")
+    names = [unescape(_attr("name", attrs) or "", {"&quot;": '"', "&apos;": "'"}) for attrs in sheets]
+    if sheet is None:
+        attrs = sheets[0]
+    elif sheet in names:
+        attrs = sheets[names.index(sheet)]
+    else:
+        raise ValueError(f"sheet {sheet!r} not found, available: {', '.join(names)}")
+
+    rel_id = re.search(r'\b\w+:id="([^"]*)"', attrs).group(1)
+    for rel in re.findall(r"<Relationship\b([^>]*?)/?>", rels):
+        if _attr("Id", rel) == rel_id:
+            target = _attr("Target", rel)
+            if target.startswith("/"):
+                return target.lstrip("/")
+            return posixpath.normpath(posixpath.join("xl", target))
+    raise ValueError(f"sheet relationship {rel_id} not found")
+
+
+def cell_xml(ref, value, style=None):
+    # Ячейка с числом или строкой (inlineStr — общий список строк книги не трогаем)
+    style_attr = f' s="{style}"' if style is not None else ""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return f'<c r="{ref}"{style_attr}/>' if style is not None else ""
+    if isinstance(value, bool):
+        return f'<c r="{ref}"{style_attr} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Real) and math.isfinite(value):
+        number = repr(float(value)) if isinstance(value, float) else str(int(value))
+        return f'<c r="{ref}"{style_attr}><v>{number}</v></c>'
+    text = escape(_ILLEGAL.sub("", str(value)))
+    return f'<c r="{ref}"{style_attr} t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _fill_row(number, attrs, body, values, first_column):
+    # Строка листа с новыми значениями в столбцах first_column...;
+    # остальные ячейки строки и стили заменяемых ячеек сохраняются
+    cells = {}
+    for match in _CELL.finditer(body or ""):
+        ref = _attr("r", match.group(1))
+        cells[column_index(_CELL_REF.fullmatch(ref).group(1))] = match.group(0)
+    for offset, value in enumerate(values):
+        column = first_column + offset
+        old = cells.get(column)
+        style = _attr("s", old) if old else None
+        cells[column] = cell_xml(f"{column_letters(column)}{number}", value, style)
+    # Атрибут spans необязательный и после вставки мог бы стать неверным
+    attrs = re.sub(r'\s+spans="[^"]*"', "", attrs or "")
+    return f"<row{attrs}>{''.join(cells[column] for column in sorted(cells))}</row>"
+
+
+def _fill_sheet_data(sheet_data, rows, start_row, first_column):
+    # Новое содержимое sheetData: строки до и после вставки копируются как есть
+    rows = list(rows)
+    end_row = start_row + len(rows) - 1
+    parts = []
+    position = start_row
+    for match in _ROW.finditer(sheet_data):
+        number = _attr("r", match.group(1))
+        if number is None:
+            raise ValueError("sheet rows without numbers are not supported")
+        number = int(number)
+        if number < start_row or number > end_row:
+            # Недостающие строки вставки идут перед первой строкой шаблона после них
+            while number > end_row and position <= end_row:
+                parts.append(_fill_row(position, f' r="{position}"', "", rows[position - start_row], first_column))
+                position += 1
+            parts.append(match.group(0))
+            continue
+        while position < number:
+            parts.append(_fill_row(position, f' r="{position}"', "", rows[position - start_row], first_column))
+            position += 1
+        parts.append(_fill_row(number, match.group(1), match.group(2), rows[number - start_row], first_column))
+        position = number + 1
+    while position <= end_row:
+        parts.append(_fill_row(position, f' r="{position}"', "", rows[position - start_row], first_column))
+        position += 1
+    return "".join(parts), end_row
+
+
+def _extend_dimension(sheet_xml, last_row, last_column):
+    # Диапазон листа в <dimension> расширяем до вставленных данных
+    def replace(match):
+        refs = [_CELL_REF.fullmatch(ref) for ref in match.group(2).split(":")]
+        if not all(refs):
+            return match.group(0)
+        first = refs[0]
+        last = refs[-1]
+        row = max(int(last.group(2)), last_row)
+        column = max(column_index(last.group(1)), last_column)
+        return f"{match.group(1)}{first.group(0)}:{column_letters(column)}{row}{match.group(3)}"
+    return _DIMENSION.sub(replace, sheet_xml, count=1)
+
+
+def _drop_calc_chain(name, data):
+    # Цепочку вычислений Excel перестроит сам; ссылки на нее убираем
+    text = data.decode("utf-8")
+    if name == "[Content_Types].xml":
+        text = re.sub(r'<Override\b[^>]*?PartName="/xl/calcChain\.xml"[^>]*?/>', "", text)
+    else:
+        text = re.sub(r'<Relationship\b[^>]*?Target="[^"]*calcChain\.xml"[^>]*?/>', "", text)
+    return text.encode("utf-8")
+
+
+def _dos_time(date_time):
+    year, month, day, hour, minute, second = date_time
+    return hour << 11 | minute << 5 | second // 2, (year - 1980) << 9 | month << 5 | day
+
+
+def _write_package(package, template_path, output_path, replaced):
+    # Пакет xlsx в output_path: части из replaced (имя -> новые данные, None —
+    # удалить) сжимаются заново, остальные копируются из шаблона сжатыми
+    # байтами. zipfile так копировать не умеет, поэтому ZIP пишется здесь
+    # (без ZIP64 — шаблоны книг меньше 4 ГБ)
+    directory = []
+    with open(template_path, "rb") as source, open(output_path, "wb") as output:
+        for info in package.infolist():
+            if info.filename in replaced:
+                data = replaced[info.filename]
+                if data is None:
+                    continue
+                compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+                raw = compressor.compress(data) + compressor.flush()
+                method, crc, size, flags = zipfile.ZIP_DEFLATED, zlib.crc32(data), len(data), 0
+            else:
+                # Данные части идут за ее локальным заголовком с именем и extra
+                source.seek(info.header_offset)
+                header = _LOCAL_HEADER.unpack(source.read(_LOCAL_HEADER.size))
+                source.seek(header[-2] + header[-1], os.SEEK_CUR)
+                raw = source.read(info.compress_size)
+                method, crc, size, flags = info.compress_type, info.CRC, info.file_size, info.flag_bits
+            # Размеры пишутся в заголовок, дескриптор после данных не нужен
+            flags = (flags & ~_FLAG_DESCRIPTOR) | _FLAG_UTF8
+            name = info.filename.encode("utf-8")
+            offset = output.tell()
+            dos_time, dos_date = _dos_time(info.date_time)
+            output.write(_LOCAL_HEADER.pack(
+                b"PK\x03\x04", 20, flags, method, dos_time, dos_date, crc, len(raw), size, len(name), 0
+            ) + name)
+            output.write(raw)
+            directory.append(_CENTRAL_HEADER.pack(
+                b"PK\x01\x02", 20, 20, flags, method, dos_time, dos_date, crc, len(raw), size, len(name),
+                0, 0, 0, 0, info.external_attr, offset
+            ) + name)
+        start = output.tell()
+        output.write(b"".join(directory))
+        output.write(_END_RECORD.pack(b"PK\x05\x06", 0, 0, len(directory), len(directory), output.tell() - start,
+                                      start, 0))
+
+
+def fill_template(rows, template_path, output_path=None, sheet=None, anchor="A12"):
+    # Запись строк в лист шаблона, начиная с ячейки anchor (левый верхний угол
+    # данных). sheet — имя листа (по умолчанию первый). Без output_path
+    # шаблон обновляется на месте. Возвращает число записанных строк
+    start_row, first_column = parse_anchor(anchor)
+    output_path = output_path or template_path
+    tmp_path = output_path + ".tmp"
+    rows = [list(row) for row in rows]
+
+    with zipfile.ZipFile(template_path) as package:
+        sheet_part = find_sheet_part(package, sheet)
+        has_calc_chain = "xl/calcChain.xml" in package.namelist()
+
+        with TIMER.stage("template_fill_sheet", rows=len(rows)):
+            sheet_xml = package.read(sheet_part).decode("utf-8")
+            match = _SHEET_DATA.search(sheet_xml)
+            if match is None:
+                raise ValueError(f"{sheet_part} has no sheetData")
+            if rows:
+                sheet_data, last_row = _fill_sheet_data(match.group(1) or "", rows, start_row, first_column)
+                last_column = first_column + max(len(row) for row in rows) - 1
+                sheet_xml = (
+                    sheet_xml[:match.start()] + f"<sheetData>{sheet_data}</sheetData>" + sheet_xml[match.end():]
+                )
+                sheet_xml = _extend_dimension(sheet_xml, last_row, last_column)
+
+        replaced = {sheet_part: sheet_xml.encode("utf-8")}
+        if has_calc_chain:
+            replaced["xl/calcChain.xml"] = None
+            for name in ("[Content_Types].xml", "xl/_rels/workbook.xml.rels"):
+                replaced[name] = _drop_calc_chain(name, package.read(name))
+
+        with TIMER.stage("template_copy_parts"):
+            _write_package(package, template_path, tmp_path, replaced)
+
+    os.replace(tmp_path, output_path)
+    return len(rows)
@@ -1,12 +1,19 @@
+import os
 import sys
-import pdfplumber
-import pandas as pd
+import time
+
+# Момент запуска — для замера холодного старта
+STARTED = time.perf_counter()
+
 from PyQt6.QtWidgets import (
-    QApplication, QMainWindow, QVBoxLayout, QWidget, QPushButton, QTableWidget, QTableWidgetItem, QFileDialog, QCheckBox
+    QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QTableView, QFileDialog, QCheckBox,
+    QHeaderView, QProgressBar
 )
 from PyQt6.QtCore import Qt
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, Alignment
+from startup import after_window_shown
+from gui_workers import ExtractionWorker
+from table_model import DataTableModel
+from xlsx_export import select_columns, write_into_workbook
 
 
 class PDFViewerApp(QMainWindow):
@@ -28,8 +35,24 @@ class PDFViewerApp(QMainWindow):
         self.btn_open_pdf.clicked.connect(self.open_pdf)
         self.layout.addWidget(self.btn_open_pdf)
 
+        # Прогресс поиска таблицы и кнопка отмены
+        self.progress_layout = QHBoxLayout()
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setVisible(False)
+        self.progress_layout.addWidget(self.progress_bar)
+        self.btn_cancel = QPushButton("Cancel", self)
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel.clicked.connect(self.cancel_extraction)
+        self.progress_layout.addWidget(self.btn_cancel)
+        self.progress_layout.addStretch()
+        self.layout.addLayout(self.progress_layout)
+
         # Таблица для отображения данных
-        self.table = QTableWidget(self)
+        # Ячейки отдаются представлению моделью только для видимых строк
+        self.model = DataTableModel(self)
+        self.table = QTableView(self)
+        self.table.setModel(self.model)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         self.layout.addWidget(self.table)
 
         # Кнопка для экспорта выбранных столбцов
@@ -40,42 +63,75 @@ class PDFViewerApp(QMainWindow):
         # Переменные для хранения данных
         self.data = None
         self.checkboxes = []
+        self.worker = None
 
     def open_pdf(self):
         # Открываем диалог выбора файла
         file_path, _ = QFileDialog.getOpenFileName(self, "Open PDF File", "", "PDF Files (*.pdf)")
         if file_path:
-            # Извлекаем таблицу из PDF
-            self.data = self.extract_table_from_pdf(file_path)
-            if self.data:
-                # Отображаем данные в таблице
-                self.display_data_in_table(self.data)
-
-    def extract_table_from_pdf(self, file_path):
-        # Используем pdfplumber для извлечения таблиц
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                # Извлекаем таблицу с текущей страницы
-                table = page.extract_table()
-                if table:
-                    return table
-        return None
+            # Извлекаем таблицу из PDF в фоновом потоке
+            self.start_extraction(file_path)
 
-    def display_data_in_table(self, data):
-        # Очищаем таблицу
-        self.table.setRowCount(0)
-        self.table.setColumnCount(0)
+    def start_extraction(self, file_path):
+        self.cancel_extraction()
+        self.data = None
 
-        # Устанавливаем количество строк и столбцов
-        if data:
-            self.table.setRowCount(len(data))
-            self.table.setColumnCount(len(data[0]))
+        # Страницы pdfplumber читаются по одной, до первой найденной таблицы
+        self.worker = ExtractionWorker(file_path, "table", 1, parent=self)
+        self.worker.rows_ready.connect(self.on_table_found)
+        self.worker.progress.connect(self.on_extraction_progress)
+        self.worker.failed.connect(self.on_extraction_failed)
+        self.worker.finished.connect(self.on_extraction_finished)
+
+        self.btn_open_pdf.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.worker.start()
+
+    def cancel_extraction(self):
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.worker.wait()
+
+    def on_extraction_progress(self, done, total):
+        if self.sender() is not self.worker:
+            return
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(done)
+
+    def on_extraction_failed(self, message):
+        if self.sender() is self.worker:
+            print(f"Error extracting tables: {message}")
+
+    def on_table_found(self, table):
+        # Первая таблица документа; остальные страницы не нужны. Сигнал от
+        # уже отмененного потока не трогает текущую таблицу
+        if self.sender() is not self.worker or self.data:
+            return
+        self.worker.cancel()
+        self.data = table
+        # Отображаем данные в таблице
+        self.display_data_in_table(self.data)
+
+    def on_extraction_finished(self):
+        if self.sender() is not self.worker:
+            return
+        self.btn_open_pdf.setEnabled(True)
+        self.btn_cancel.setEnabled(False)
+        self.progress_bar.setVisible(False)
+        self.worker = None
+
+    def closeEvent(self, event):
+        # Не оставляем работающий поток при закрытии окна
+        self.cancel_extraction()
+        super().closeEvent(event)
 
-            # Заполняем таблицу данными
-            for i, row in enumerate(data):
-                for j, item in enumerate(row):
-                    self.table.setItem(i, j, QTableWidgetItem(str(item)))
+    def display_data_in_table(self, data):
+        # Передаем данные модели целиком, ячейки создаются только при отрисовке
+        self.model.set_data(data)
 
+        if data:
             # Добавляем чекбоксы для выбора столбцов
             self.add_column_checkboxes(len(data[0]))
 
@@ -97,45 +153,17 @@ class PDFViewerApp(QMainWindow):
             # Получаем индексы выбранных столбцов
             selected_columns = [i for i, checkbox in enumerate(self.checkboxes) if checkbox.isChecked()]
             if selected_columns:
-                # Создаем DataFrame с выбранными столбцами
-                df = pd.DataFrame(self.data)
-                df_selected = df.iloc[:, selected_columns]
-
                 # Открываем диалог для выбора Excel-файла
                 file_path, _ = QFileDialog.getSaveFileName(self, "Save File", "", "Excel Files (*.xlsx)")
                 if file_path:
-                    # Загружаем или создаем Excel-файл
-                    try:
-                        workbook = load_workbook(file_path)
-                    except FileNotFoundError:
-                        workbook = Workbook()
-
-                    # Выбираем активный лист (или создаем новый)
-                    sheet = workbook.active
-
-                    # Указываем строку, с которой начнется запись данных (например, строка 12)
-                    start_row = 12
-
-                    # Записываем заголовки столбцов
-                    for col_num, header in enumerate(df_selected.columns, 1):
-                        sheet.cell(row=start_row - 1, column=col_num, value=header).font = Font(bold=True)
-
-                    # Записываем данные в Excel, начиная с указанной строки
-                    for i, row in enumerate(df_selected.itertuples(index=False)):
-                        for j, value in enumerate(row):
-                            sheet.cell(row=start_row + i, column=j + 1, value=value)
-
-                    # Выравнивание текста по центру
-                    for row in sheet.iter_rows(min_row=start_row - 1, max_row=start_row + len(df_selected) - 1):
-                        for cell in row:
-                            cell.alignment = Alignment(horizontal='center')
-
-                    # Сохраняем файл
-                    workbook.save(file_path)
+                    # Записываем в книгу начиная с 12-й строки
+                    write_into_workbook(select_columns(self.data, selected_columns), file_path, start_row=12)
 
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = PDFViewerApp()
     window.show()
+    # Тяжелые библиотеки догружаются в фоне уже после показа окна
+    after_window_shown(app, STARTED, os.path.basename(__file__), ("pdfplumber", "pandas", "openpyxl"))
     sys.exit(app.exec())
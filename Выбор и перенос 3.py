@@ -1,13 +1,30 @@
+import os
 import sys
-import pdfplumber
-import pandas as pd
+import time
+from bisect import bisect_left
+
+# Момент запуска — для замера холодного старта
+STARTED = time.perf_counter()
+
 from PyQt6.QtWidgets import (
-    QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QTableWidget, QTableWidgetItem, QFileDialog, QCheckBox, QHeaderView
+    QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QTableView, QFileDialog, QCheckBox, QHeaderView,
+    QLabel, QSpinBox, QProgressBar, QLineEdit, QComboBox, QSplitter
 )
 from PyQt6.QtCore import Qt
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, Border, Side
-from openpyxl.utils.dataframe import dataframe_to_rows
+from startup import after_window_shown
+from pdf_extract import to_rows, DEFAULT_WORKERS
+from gui_workers import ExtractionWorker, ServiceExtractionWorker, RetuneWorker, SessionWorker
+from extract_cache import ExtractionCache
+from timing import TIMER
+from stats_dialog import StatsDialog
+from table_settings_dialog import TableSettingsDialog
+from table_model import DataTableModel
+from rate_index import RateIndex
+from table_normalize import normalize_rows
+from columnar import ColumnarTable
+from xlsx_export import write_rows_streaming
+from page_preview import PagePreview
+from session import merge_documents, SOURCE_COLUMNS
 
 
 class PDFViewerApp(QMainWindow):
@@ -24,18 +41,93 @@ class PDFViewerApp(QMainWindow):
         self.setCentralWidget(self.central_widget)
         self.layout = QVBoxLayout(self.central_widget)
 
-        # Кнопка для выбора PDF
+        # Кнопка для выбора PDF (несколько файлов сводятся в одну таблицу)
         self.btn_open_pdf = QPushButton("Open PDF", self)
         self.btn_open_pdf.clicked.connect(self.open_pdf)
         self.layout.addWidget(self.btn_open_pdf)
 
+        # Количество процессов для извлечения
+        self.workers_layout = QHBoxLayout()
+        self.workers_layout.addWidget(QLabel("Processes:", self))
+        self.workers_spin = QSpinBox(self)
+        self.workers_spin.setRange(1, 64)
+        self.workers_spin.setValue(DEFAULT_WORKERS)
+        self.workers_layout.addWidget(self.workers_spin)
+
+        # Движок извлечения: auto сначала пробует PyMuPDF, а Camelot — только где нужно
+        self.workers_layout.addWidget(QLabel("Engine:", self))
+        self.engine_combo = QComboBox(self)
+        self.engine_combo.addItems(["table", "pymupdf", "auto", "camelot"])
+        self.workers_layout.addWidget(self.engine_combo)
+
+        # Чистка таблицы после извлечения: повторы шапки, пустые строки, переносы через страницу
+        self.normalize_checkbox = QCheckBox("Clean up", self)
+        self.normalize_checkbox.setChecked(True)
+        self.workers_layout.addWidget(self.normalize_checkbox)
+
+        # Цены и другие числа переводятся из текста в числа ("1 234,50" -> 1234.5)
+        self.types_checkbox = QCheckBox("Numbers", self)
+        self.types_checkbox.setChecked(True)
+        self.workers_layout.addWidget(self.types_checkbox)
+
+        # Извлечение через локальную службу (extract_service.py) вместо своих процессов
+        self.service_checkbox = QCheckBox("Service", self)
+        self.service_checkbox.setToolTip("Extract with the local extraction service (extract_service.py)")
+        self.workers_layout.addWidget(self.service_checkbox)
+
+        # Прогресс извлечения и кнопка отмены
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setVisible(False)
+        self.workers_layout.addWidget(self.progress_bar)
+        self.btn_cancel = QPushButton("Cancel", self)
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel.clicked.connect(self.cancel_extraction)
+        self.workers_layout.addWidget(self.btn_cancel)
+
+        # Пересборка таблиц с другими настройками по сохраненной разметке страниц
+        self.btn_retune = QPushButton("Re-extract...", self)
+        self.btn_retune.setEnabled(False)
+        self.btn_retune.clicked.connect(self.open_retune_dialog)
+        self.workers_layout.addWidget(self.btn_retune)
+
+        # Время по этапам обработки
+        self.btn_stats = QPushButton("Stats", self)
+        self.btn_stats.clicked.connect(self.show_stats)
+        self.workers_layout.addWidget(self.btn_stats)
+        self.workers_layout.addStretch()
+        self.layout.addLayout(self.workers_layout)
+
         # Горизонтальный layout для чекбоксов
         self.checkbox_layout = QHBoxLayout()
         self.layout.addLayout(self.checkbox_layout)
 
+        # Поиск по шифру и наименованию: таблица фильтруется по мере ввода
+        self.search_layout = QHBoxLayout()
+        self.search_layout.addWidget(QLabel("Search:", self))
+        self.search_edit = QLineEdit(self)
+        self.search_edit.setPlaceholderText("Code or description")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.setEnabled(False)
+        self.search_edit.textChanged.connect(self.filter_rows)
+        self.search_layout.addWidget(self.search_edit)
+        self.layout.addLayout(self.search_layout)
+
         # Таблица для отображения данных
-        self.table = QTableWidget(self)
-        self.layout.addWidget(self.table)
+        # Ячейки отдаются представлению моделью только для видимых строк
+        self.model = DataTableModel(self)
+        self.table = QTableView(self)
+        self.table.setModel(self.model)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.selectionModel().currentRowChanged.connect(self.on_current_row_changed)
+
+        # Справа — страница PDF, с которой взята выбранная строка
+        self.preview = PagePreview(self)
+        self.splitter = QSplitter(Qt.Orientation.Horizontal, self)
+        self.splitter.addWidget(self.table)
+        self.splitter.addWidget(self.preview)
+        self.splitter.setStretchFactor(0, 3)
+        self.splitter.setStretchFactor(1, 2)
+        self.layout.addWidget(self.splitter)
 
         # Кнопка для экспорта выбранных столбцов
         self.btn_export = QPushButton("Export Selected Columns", self)
@@ -44,48 +136,298 @@ class PDFViewerApp(QMainWindow):
 
         # Переменные для хранения данных
         self.data = None
+        # Для каждой строки — номер куска страниц, и диапазоны страниц кусков
+        self.row_chunks = []
+        self.chunk_ranges = []
         self.checkboxes = []
+        self.worker = None
+        self.index = None
+        self.engine = "table"
+        self.file_path = None
+        self.settings_dialog = None
+        self.retuning = False
+        # Текст ошибки последнего извлечения
+        self.extraction_error = None
+        # Сессия из нескольких документов: файлы, страницы по документам,
+        # (документ, страница) для каждой строки и итоги документов
+        self.session_files = []
+        self.session_results = []
+        self.row_sources = []
+        self.session_errors = []
+        # Заголовки столбцов при экспорте; None — номера столбцов
+        self.column_headers = None
+
+        # Кэш извлеченных страниц на диске
+        self.cache = ExtractionCache()
 
     def open_pdf(self):
-        # Открываем диалог выбора файла
-        file_path, _ = QFileDialog.getOpenFileName(self, "Open PDF File", "", "PDF Files (*.pdf)")
-        if file_path:
-            # Извлекаем таблицу из PDF
-            self.data = self.extract_table_from_pdf(file_path)
+        # Открываем диалог выбора файлов
+        file_paths, _ = QFileDialog.getOpenFileNames(self, "Open PDF Files", "", "PDF Files (*.pdf)")
+        if len(file_paths) == 1:
+            # Извлекаем таблицу из PDF в фоновом потоке, строки приходят постранично
+            self.start_extraction(file_paths[0])
+        elif file_paths:
+            self.start_session(file_paths)
+
+    def reset_table(self, file_path=None):
+        # Очищаем таблицу перед приемом новых строк
+        self.cancel_extraction()
+        if self.retuning and self.settings_dialog is not None:
+            # Незаконченную пересборку сменило новое извлечение
+            self.settings_dialog.set_busy(False, "Replaced by a newer extraction")
+        self.file_path = file_path
+        self.retuning = False
+        self.session_files = []
+        self.session_results = []
+        self.row_sources = []
+        self.session_errors = []
+        self.column_headers = None
+        self.data = []
+        self.row_chunks = []
+        self.chunk_ranges = []
+        self.model.clear()
+        self.preview.set_document(file_path)
+        self.index = None
+        self.search_edit.clear()
+        self.search_edit.setEnabled(False)
+
+    def start_extraction(self, file_path, retune=None):
+        # retune — (настройки таблиц, все таблицы страницы) для повторного извлечения
+        self.reset_table(file_path)
+        self.retuning = retune is not None
+
+        engine = self.engine_combo.currentText()
+        if retune is not None:
+            # Строки собираются из разметки страниц, как у движка table
+            self.engine = "table"
+            settings, all_tables = retune
+            self.worker = RetuneWorker(file_path, settings, all_tables, self.workers_spin.value(), self.cache, self)
+            if self.settings_dialog is not None:
+                self.settings_dialog.set_busy(True, "Re-extracting...")
+        elif self.service_checkbox.isChecked():
+            # От службы строки приходят уже готовыми списками при любом движке
+            self.engine = "table"
+            self.worker = ServiceExtractionWorker(file_path, engine, parent=self)
+        else:
+            self.engine = engine
+            self.worker = ExtractionWorker(file_path, engine, self.workers_spin.value(), cache=self.cache, parent=self)
+        self.worker.range_ready.connect(self.on_range_ready)
+        self.worker.rows_ready.connect(self.append_rows_to_table)
+        self.run_worker()
+
+    def start_session(self, file_paths):
+        # Несколько PDF извлекаются одновременно на общем пуле процессов
+        # и сводятся в одну таблицу со столбцами документа и страницы
+        self.reset_table()
+        self.session_files = list(file_paths)
+        self.session_results = [[] for _ in file_paths]
+        self.session_errors = [None] * len(file_paths)
+        self.engine = self.engine_combo.currentText()
+        self.worker = SessionWorker(self.session_files, self.engine, self.workers_spin.value(), cache=self.cache,
+                                    parent=self)
+        self.worker.pages_ready.connect(self.on_session_pages)
+        self.worker.document_finished.connect(self.on_document_finished)
+        self.run_worker()
+
+    def run_worker(self):
+        self.worker.progress.connect(self.on_extraction_progress)
+        self.worker.failed.connect(self.on_extraction_failed)
+        self.worker.finished.connect(self.on_extraction_finished)
+        self.extraction_error = None
+
+        self.btn_open_pdf.setEnabled(False)
+        self.btn_export.setEnabled(False)
+        self.btn_retune.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.extraction_started = time.perf_counter()
+        self.worker.start()
+
+    def cancel_extraction(self):
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.worker.wait()
+
+    def on_extraction_progress(self, done, total):
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(done)
+
+    def on_extraction_failed(self, message):
+        if self.sender() is not self.worker:
+            return
+        print(f"Error extracting tables: {message}")
+        self.extraction_error = message
+        if self.retuning and self.settings_dialog is not None:
+            self.settings_dialog.show_error(message)
+
+    def on_extraction_finished(self):
+        # Сигнал от уже отмененного потока не трогает текущий
+        if self.sender() is not self.worker:
+            return
+        self.btn_open_pdf.setEnabled(True)
+        self.btn_export.setEnabled(True)
+        self.btn_retune.setEnabled(self.file_path is not None)
+        self.btn_cancel.setEnabled(False)
+        self.progress_bar.setVisible(False)
+        self.worker = None
+        TIMER.add("open_pdf", self.extraction_started, time.perf_counter())
+
+        stats = self.cache.stats()
+        message = f"Cache: {stats['hits']} hits, {stats['misses']} misses"
+        if self.session_files:
+            message = self.session_report() + " | " + message
+        self.statusBar().showMessage(message)
+
+        if self.session_files:
+            # Сводная таблица: документы по порядку, каждый очищен отдельно;
+            # документы с ошибкой в нее не входят
+            names = [os.path.basename(path) for path in self.session_files]
+            results = [pages if not error else [] for pages, error in zip(self.session_results, self.session_errors)]
+            self.data, self.row_sources = merge_documents(results, names, self.normalize_checkbox.isChecked())
+            self.session_results = []
             if self.data:
-                # Отображаем данные в таблице
-                self.display_data_in_table(self.data)
-
-    def extract_table_from_pdf(self, file_path):
-        # Используем pdfplumber для извлечения таблиц
-        tables = []
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                # Извлекаем таблицу с текущей страницы
-                table = page.extract_table()
-                if table:
-                    tables.extend(table)
-        return tables
-
-    def display_data_in_table(self, data):
-        # Очищаем таблицу
-        self.table.setRowCount(0)
-        self.table.setColumnCount(0)
-
-        # Устанавливаем количество строк и столбцов
-        if data:
-            self.table.setRowCount(len(data))
-            self.table.setColumnCount(len(data[0]))
-
-            # Заполняем таблицу данными
-            for i, row in enumerate(data):
-                for j, item in enumerate(row):
-                    self.table.setItem(i, j, QTableWidgetItem(str(item) if item else ""))
-
-            # Добавляем чекбоксы для выбора столбцов
-            self.add_column_checkboxes(len(data[0]))
-
-    def add_column_checkboxes(self, num_columns):
+                self.column_headers = SOURCE_COLUMNS + list(range(max(len(row) for row in self.data) - 2))
+        elif self.data and self.normalize_checkbox.isChecked():
+            self.data, self.row_chunks = normalize_rows(self.data, self.row_chunks, return_pages=True)
+
+        if self.data:
+            # Показанные по ходу извлечения строки заменяем очищенной таблицей,
+            # которая дальше хранится по столбцам (в разы меньше памяти)
+            self.data = ColumnarTable.from_rows(self.data, typed=self.types_checkbox.isChecked())
+            self.model.set_data(self.data)
+        elif self.session_files:
+            self.model.clear()
+
+        # Добавляем чекбоксы для выбора столбцов по уже полученным строкам
+        if self.data:
+            self.add_column_checkboxes(self.model.columnCount(), self.column_headers)
+            self.build_index(self.data)
+
+        if self.retuning and self.settings_dialog is not None and self.extraction_error is None:
+            self.settings_dialog.show_result(len(self.data), time.perf_counter() - self.extraction_started)
+        self.retuning = False
+
+    def on_range_ready(self, first, last):
+        # Сигнал от уже отмененного потока не трогает текущий
+        if self.sender() is self.worker:
+            self.chunk_ranges.append((first, last))
+
+    def append_rows_to_table(self, rows):
+        # Дописываем строки очередной страницы в конец таблицы
+        if self.sender() is not self.worker:
+            return
+        rows = to_rows(rows, self.engine)
+        if not rows:
+            return
+        self.data.extend(rows)
+        self.row_chunks.extend([len(self.chunk_ranges) - 1] * len(rows))
+        with TIMER.stage("display_rows", rows=len(rows)):
+            self.model.append_chunk(rows)
+
+    def on_session_pages(self, index, pages):
+        # Страницы документа сессии: показываем сразу, с именем файла и страницей
+        if self.sender() is not self.worker:
+            return
+        self.session_results[index].extend(pages)
+        name = os.path.basename(self.session_files[index])
+        rows = []
+        for number, page_rows in pages:
+            rows.extend([name, number] + list(row) for row in page_rows)
+            self.row_sources.extend([(index, number)] * len(page_rows))
+        if rows:
+            self.data.extend(rows)
+            with TIMER.stage("display_rows", rows=len(rows)):
+                self.model.append_chunk(rows)
+
+    def on_document_finished(self, index, error):
+        if self.sender() is not self.worker:
+            return
+        self.session_errors[index] = error
+        if error:
+            print(f"Error extracting tables from {self.session_files[index]}: {error}")
+        self.statusBar().showMessage(self.session_report())
+
+    def session_report(self):
+        done = sum(1 for error in self.session_errors if error == "")
+        failed = [os.path.basename(path) for path, error in zip(self.session_files, self.session_errors) if error]
+        report = f"Documents: {done} of {len(self.session_files)} extracted"
+        if failed:
+            report += f", failed: {', '.join(failed)}"
+        return report
+
+    def build_index(self, data):
+        # Индекс по шифрам и тексту строк строится один раз после извлечения
+        self.index = RateIndex(data)
+        self.search_edit.setEnabled(True)
+
+    def filter_rows(self, text):
+        if self.index is None:
+            return
+        with TIMER.stage("filter_rows"):
+            rows = self.index.search(text)
+            self.model.set_row_filter(rows)
+        if rows is None:
+            self.statusBar().clearMessage()
+            return
+        self.statusBar().showMessage(f"Found {len(rows)} of {self.index.row_count} rows")
+
+        # Точное совпадение шифра выделяем
+        exact = self.index.find_code(text)
+        if exact:
+            position = bisect_left(rows, exact[0])
+            if position < len(rows) and rows[position] == exact[0]:
+                self.table.selectRow(position)
+
+    def on_current_row_changed(self, current, previous):
+        # Показываем страницу выбранной строки; отрисовка идет в фоне
+        if not current.isValid():
+            return
+        row = self.model.source_row(current.row())
+        if self.session_files:
+            # В сводной таблице страница известна точно, документ — свой у строки
+            if row < len(self.row_sources):
+                index, number = self.row_sources[row]
+                if self.preview.file_path != self.session_files[index]:
+                    self.preview.set_document(self.session_files[index])
+                self.preview.show_pages(number)
+            return
+        if row >= len(self.row_chunks):
+            return
+        first, last = self.chunk_ranges[self.row_chunks[row]]
+        self.preview.show_pages(first, last, self.preview_needle(self.data[row]))
+
+    def preview_needle(self, row):
+        # Короткий текст строки для поиска страницы внутри куска: шифр или первая непустая ячейка
+        values = [row[self.index.code_column]] if self.index is not None and self.index.code_column < len(row) else []
+        values += list(row)
+        for value in values:
+            if value is not None and value == value and str(value).strip():
+                return str(value).strip().split("\n")[0][:40]
+        return None
+
+    def open_retune_dialog(self):
+        if self.settings_dialog is None:
+            self.settings_dialog = TableSettingsDialog(self)
+            self.settings_dialog.apply_settings.connect(self.retune)
+        self.settings_dialog.show()
+        self.settings_dialog.raise_()
+
+    def retune(self, settings, all_tables):
+        # Первый раз страницы размечаются заново, дальше — только сборка таблиц
+        if self.file_path is not None:
+            self.start_extraction(self.file_path, (settings, all_tables))
+
+    def show_stats(self):
+        StatsDialog(TIMER, self).exec()
+
+    def closeEvent(self, event):
+        # Не оставляем работающие потоки при закрытии окна
+        self.cancel_extraction()
+        self.preview.close_renderer()
+        super().closeEvent(event)
+
+    def add_column_checkboxes(self, num_columns, headers=None):
         # Очищаем предыдущие чекбоксы
         for checkbox in self.checkboxes:
             self.checkbox_layout.removeWidget(checkbox)
@@ -94,7 +436,10 @@ class PDFViewerApp(QMainWindow):
 
         # Создаем чекбоксы для каждого столбца
         for i in range(num_columns):
-            checkbox = QCheckBox(f"Column {i + 1}", self)
+            if headers is not None and isinstance(headers[i], str):
+                checkbox = QCheckBox(headers[i], self)
+            else:
+                checkbox = QCheckBox(f"Column {i + 1}", self)
             self.checkboxes.append(checkbox)
             self.checkbox_layout.addWidget(checkbox)
 
@@ -103,50 +448,21 @@ class PDFViewerApp(QMainWindow):
             # Получаем индексы выбранных столбцов
             selected_columns = [i for i, checkbox in enumerate(self.checkboxes) if checkbox.isChecked()]
             if selected_columns:
-                # Создаем DataFrame с выбранными столбцами
-                df = pd.DataFrame(self.data)
-                df_selected = df.iloc[:, selected_columns]
-
                 # Открываем диалог для выбора Excel-файла
                 file_path, _ = QFileDialog.getSaveFileName(self, "Save File", "", "Excel Files (*.xlsx)")
                 if file_path:
-                    # Создаем Excel-файл
-                    workbook = Workbook()
-                    sheet = workbook.active
-
-                    # Записываем заголовки столбцов
-                    for col_num, header in enumerate(df_selected.columns, 1):
-                        cell = sheet.cell(row=1, column=col_num, value=header)
-                        cell.font = Font(bold=True)
-                        cell.alignment = Alignment(horizontal='center')
-                        cell.border = Border(
-                            left=Side(style='thin'),
-                            right=Side(style='thin'),
-                            top=Side(style='thin'),
-                            bottom=Side(style='thin')
-                        )
-
-                    # Записываем данные в Excel
-                    for row in dataframe_to_rows(df_selected, index=False, header=False):
-                        sheet.append(row)
-
-                    # Применяем форматирование к данным
-                    for row in sheet.iter_rows(min_row=2, max_row=sheet.max_row, min_col=1, max_col=sheet.max_column):
-                        for cell in row:
-                            cell.alignment = Alignment(horizontal='center')
-                            cell.border = Border(
-                                left=Side(style='thin'),
-                                right=Side(style='thin'),
-                                top=Side(style='thin'),
-                                bottom=Side(style='thin')
-                            )
-
-                    # Сохраняем файл
-                    workbook.save(file_path)
+                    # Строки пишутся в файл по одной, без промежуточного DataFrame
+                    with TIMER.stage("export_selected_columns", columns=len(selected_columns)):
+                        headers = selected_columns
+                        if self.column_headers is not None:
+                            headers = [self.column_headers[i] for i in selected_columns]
+                        write_rows_streaming(self.data.iter_rows(selected_columns), file_path, headers)
 
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = PDFViewerApp()
     window.show()
+    # Тяжелые библиотеки догружаются в фоне уже после показа окна
+    after_window_shown(app, STARTED, os.path.basename(__file__), ("pdfplumber", "pandas", "openpyxl"))
     sys.exit(app.exec())
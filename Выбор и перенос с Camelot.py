@@ -1,13 +1,29 @@
+import os
 import sys
-import pandas as pd
+import time
+from bisect import bisect_left
+
+# Момент запуска — для замера холодного старта
+STARTED = time.perf_counter()
+
 from PyQt6.QtWidgets import (
-    QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QTableWidget, QTableWidgetItem, QFileDialog, QCheckBox
+    QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QTableView, QFileDialog, QCheckBox, QHeaderView,
+    QLabel, QSpinBox, QProgressBar, QLineEdit
 )
 from PyQt6.QtCore import Qt
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, Border, Side
-from openpyxl.utils.dataframe import dataframe_to_rows
-import camelot
+from startup import after_window_shown
+from pdf_extract import DEFAULT_WORKERS
+from page_classify import parse_page_range, format_page_range
+from gui_workers import ExtractionWorker
+from extract_cache import ExtractionCache
+from timing import TIMER
+from stats_dialog import StatsDialog
+from table_model import DataTableModel
+from rate_index import RateIndex
+from table_normalize import normalize_frames
+from column_types import convert_types
+from columnar import ColumnarTable
+from xlsx_export import write_rows_streaming
 
 
 class PDFViewerApp(QMainWindow):
@@ -29,12 +45,72 @@ class PDFViewerApp(QMainWindow):
         self.btn_open_pdf.clicked.connect(self.open_pdf)
         self.layout.addWidget(self.btn_open_pdf)
 
+        # Количество процессов для извлечения
+        self.workers_layout = QHBoxLayout()
+        self.workers_layout.addWidget(QLabel("Processes:", self))
+        self.workers_spin = QSpinBox(self)
+        self.workers_spin.setRange(1, 64)
+        self.workers_spin.setValue(DEFAULT_WORKERS)
+        self.workers_layout.addWidget(self.workers_spin)
+
+        # Чистка таблицы после извлечения: повторы шапки, пустые строки, переносы через страницу
+        self.normalize_checkbox = QCheckBox("Clean up", self)
+        self.normalize_checkbox.setChecked(True)
+        self.workers_layout.addWidget(self.normalize_checkbox)
+
+        # Цены и другие числа переводятся из текста в числа ("1 234,50" -> 1234.5)
+        self.types_checkbox = QCheckBox("Numbers", self)
+        self.types_checkbox.setChecked(True)
+        self.workers_layout.addWidget(self.types_checkbox)
+
+        # Camelot получает только страницы с таблицами с линиями (быстрая разметка
+        # по графике PDF) или явно заданные страницы, например 1-5, 8
+        self.prefilter_checkbox = QCheckBox("Table pages only", self)
+        self.prefilter_checkbox.setChecked(True)
+        self.workers_layout.addWidget(self.prefilter_checkbox)
+        self.workers_layout.addWidget(QLabel("Pages:", self))
+        self.pages_edit = QLineEdit(self)
+        self.pages_edit.setPlaceholderText("all")
+        self.pages_edit.setMaximumWidth(100)
+        self.workers_layout.addWidget(self.pages_edit)
+
+        # Прогресс извлечения и кнопка отмены
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setVisible(False)
+        self.workers_layout.addWidget(self.progress_bar)
+        self.btn_cancel = QPushButton("Cancel", self)
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel.clicked.connect(self.cancel_extraction)
+        self.workers_layout.addWidget(self.btn_cancel)
+
+        # Время по этапам обработки
+        self.btn_stats = QPushButton("Stats", self)
+        self.btn_stats.clicked.connect(self.show_stats)
+        self.workers_layout.addWidget(self.btn_stats)
+        self.workers_layout.addStretch()
+        self.layout.addLayout(self.workers_layout)
+
         # Горизонтальный layout для чекбоксов
         self.checkbox_layout = QHBoxLayout()
         self.layout.addLayout(self.checkbox_layout)
 
+        # Поиск по шифру и наименованию: таблица фильтруется по мере ввода
+        self.search_layout = QHBoxLayout()
+        self.search_layout.addWidget(QLabel("Search:", self))
+        self.search_edit = QLineEdit(self)
+        self.search_edit.setPlaceholderText("Code or description")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.setEnabled(False)
+        self.search_edit.textChanged.connect(self.filter_rows)
+        self.search_layout.addWidget(self.search_edit)
+        self.layout.addLayout(self.search_layout)
+
         # Таблица для отображения данных
-        self.table = QTableWidget(self)
+        # Ячейки отдаются представлению моделью только для видимых строк
+        self.model = DataTableModel(self)
+        self.table = QTableView(self)
+        self.table.setModel(self.model)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         self.layout.addWidget(self.table)
 
         # Кнопка для экспорта выбранных столбцов
@@ -44,57 +120,159 @@ class PDFViewerApp(QMainWindow):
 
         # Переменные для хранения данных
         self.data = None
+        self.frames = []
         self.checkboxes = []
+        self.worker = None
+        self.pages_report = ""
+        self.index = None
+
+        # Кэш извлеченных страниц на диске
+        self.cache = ExtractionCache()
 
     def open_pdf(self):
         # Открываем диалог выбора файла
         file_path, _ = QFileDialog.getOpenFileName(self, "Open PDF File", "", "PDF Files (*.pdf)")
         if file_path:
-            # Извлекаем таблицу из PDF с помощью Camelot
-            self.data = self.extract_table_from_pdf(file_path)
-            if self.data is not None:
-                # Отображаем данные в таблице
-                self.display_data_in_table(self.data)
+            # Извлекаем таблицу из PDF с помощью Camelot в фоновом потоке
+            self.start_extraction(file_path)
+
+    def start_extraction(self, file_path):
+        self.cancel_extraction()
+
+        # Очищаем таблицу перед приемом новых таблиц
+        self.data = None
+        self.frames = []
+        self.model.clear()
+        self.index = None
+        self.search_edit.clear()
+        self.search_edit.setEnabled(False)
 
-    def extract_table_from_pdf(self, file_path):
         try:
-            # Используем Camelot для извлечения таблиц с более точными параметрами
-            tables = camelot.read_pdf(
-                file_path,
-                pages="all",
-                flavor="lattice",  # Используем lattice для таблиц с четкими границами
-                strip_text="\n",   # Убираем лишние переносы строк
-                suppress_stdout=True  # Отключаем лишние сообщения
-            )
-
-            if tables:
-                # Объединяем все таблицы в один DataFrame
-                df = pd.concat([table.df for table in tables], ignore_index=True)
-                return df
-            else:
-                print("No tables found in the PDF.")
-                return None
-        except Exception as e:
-            print(f"Error extracting tables: {e}")
-            return None
-
-    def display_data_in_table(self, data):
-        # Очищаем таблицу
-        self.table.setRowCount(0)
-        self.table.setColumnCount(0)
-
-        # Устанавливаем количество строк и столбцов
-        if not data.empty:
-            self.table.setRowCount(data.shape[0])
-            self.table.setColumnCount(data.shape[1])
-
-            # Заполняем таблицу данными
-            for i, row in data.iterrows():
-                for j, item in enumerate(row):
-                    self.table.setItem(i, j, QTableWidgetItem(str(item) if pd.notna(item) else ""))
-
-            # Добавляем чекбоксы для выбора столбцов
-            self.add_column_checkboxes(data.shape[1])
+            pages = parse_page_range(self.pages_edit.text())
+        except ValueError:
+            self.statusBar().showMessage(f"Bad page range: {self.pages_edit.text()}")
+            return
+
+        params = {"flavor": "lattice", "strip_text": "\n"}
+        self.worker = ExtractionWorker(
+            file_path, "camelot", self.workers_spin.value(), params, self.cache, parent=self,
+            pages=pages, prefilter=self.prefilter_checkbox.isChecked()
+        )
+        self.worker.pages_selected.connect(self.on_pages_selected)
+        self.pages_report = ""
+        self.worker.rows_ready.connect(self.append_frames_to_table)
+        self.worker.progress.connect(self.on_extraction_progress)
+        self.worker.failed.connect(lambda message: print(f"Error extracting tables: {message}"))
+        self.worker.finished.connect(self.on_extraction_finished)
+
+        self.btn_open_pdf.setEnabled(False)
+        self.btn_export.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.extraction_started = time.perf_counter()
+        self.worker.start()
+
+    def cancel_extraction(self):
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.worker.wait()
+
+    def on_extraction_progress(self, done, total):
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(done)
+
+    def on_pages_selected(self, pages):
+        # Какие страницы ушли в Camelot: по этому списку можно задать страницы вручную
+        self.pages_report = f"Camelot pages: {format_page_range(pages) or 'none'}"
+        self.statusBar().showMessage(self.pages_report)
+
+    def on_extraction_finished(self):
+        # Сигнал от уже отмененного потока не трогает текущий
+        if self.sender() is not self.worker:
+            return
+        self.btn_open_pdf.setEnabled(True)
+        self.btn_export.setEnabled(True)
+        self.btn_cancel.setEnabled(False)
+        self.progress_bar.setVisible(False)
+        self.worker = None
+        TIMER.add("open_pdf", self.extraction_started, time.perf_counter())
+
+        stats = self.cache.stats()
+        self.statusBar().showMessage(
+            " | ".join(filter(None, [self.pages_report, f"Cache: {stats['hits']} hits, {stats['misses']} misses"]))
+        )
+
+        if self.frames and self.normalize_checkbox.isChecked():
+            # Таблицы страниц склеиваются и чистятся, показанное по ходу заменяется
+            self.data = normalize_frames(self.frames)
+            self.model.set_data(self.data)
+        elif self.frames:
+            import pandas as pd
+
+            # Объединяем все полученные таблицы в один DataFrame
+            with TIMER.stage("concat", tables=len(self.frames)):
+                self.data = pd.concat(self.frames, ignore_index=True)
+
+        if self.data is not None and not self.data.empty:
+            # Дальше таблица хранится по столбцам (в разы меньше памяти)
+            kinds = {}
+            if self.types_checkbox.isChecked():
+                self.data, kinds = convert_types(self.data)
+            self.data = ColumnarTable.from_frame(self.data, kinds)
+            self.model.set_data(self.data)
+
+        if self.data is not None and len(self.data):
+            self.add_column_checkboxes(self.data.shape[1])
+            self.build_index(self.data)
+        else:
+            # Пустая таблица и никаких столбцов от прошлого файла
+            self.data = ColumnarTable([], 0)
+            self.model.set_data(self.data)
+            self.add_column_checkboxes(0)
+            print("No tables found in the PDF.")
+
+    def append_frames_to_table(self, frames):
+        # Дописываем таблицы очередной страницы в конец таблицы
+        if self.sender() is not self.worker:
+            return
+        self.frames.extend(frames)
+        for df in frames:
+            with TIMER.stage("display_rows", rows=df.shape[0]):
+                self.model.append_chunk(df)
+
+    def build_index(self, data):
+        # Индекс по шифрам и тексту строк строится один раз после извлечения
+        if hasattr(data, "itertuples"):
+            data = data.itertuples(index=False, name=None)
+        self.index = RateIndex(data)
+        self.search_edit.setEnabled(True)
+
+    def filter_rows(self, text):
+        if self.index is None:
+            return
+        with TIMER.stage("filter_rows"):
+            rows = self.index.search(text)
+            self.model.set_row_filter(rows)
+        if rows is None:
+            self.statusBar().clearMessage()
+            return
+        self.statusBar().showMessage(f"Found {len(rows)} of {self.index.row_count} rows")
+
+        # Точное совпадение шифра выделяем
+        exact = self.index.find_code(text)
+        if exact:
+            position = bisect_left(rows, exact[0])
+            if position < len(rows) and rows[position] == exact[0]:
+                self.table.selectRow(position)
+
+    def show_stats(self):
+        StatsDialog(TIMER, self).exec()
+
+    def closeEvent(self, event):
+        # Не оставляем работающий поток при закрытии окна
+        self.cancel_extraction()
+        super().closeEvent(event)
 
     def add_column_checkboxes(self, num_columns):
         # Очищаем предыдущие чекбоксы
@@ -114,50 +292,18 @@ class PDFViewerApp(QMainWindow):
             # Получаем индексы выбранных столбцов
             selected_columns = [i for i, checkbox in enumerate(self.checkboxes) if checkbox.isChecked()]
             if selected_columns:
-                # Создаем DataFrame с выбранными столбцами
-                df_selected = self.data.iloc[:, selected_columns]
-
                 # Открываем диалог для выбора Excel-файла
                 file_path, _ = QFileDialog.getSaveFileName(self, "Save File", "", "Excel Files (*.xlsx)")
                 if file_path:
-                    # Создаем Excel-файл
-                    workbook = Workbook()
-                    sheet = workbook.active
-
-                    # Записываем заголовки столбцов
-                    for col_num, header in enumerate(df_selected.columns, 1):
-                        cell = sheet.cell(row=1, column=col_num, value=header)
-                        cell.font = Font(bold=True)
-                        cell.alignment = Alignment(horizontal='center')
-                        cell.border = Border(
-                            left=Side(style='thin'),
-                            right=Side(style='thin'),
-                            top=Side(style='thin'),
-                            bottom=Side(style='thin')
-                        )
-
-                    # Записываем данные в Excel
-                    for row in dataframe_to_rows(df_selected, index=False, header=False):
-                        sheet.append(row)
-
-                    # Применяем форматирование к данным
-                    for row in sheet.iter_rows(min_row=2, max_row=sheet.max_row, min_col=1, max_col=sheet.max_column):
-                        for cell in row:
-                            cell.alignment = Alignment(horizontal='center')
-                            cell.border = Border(
-                                left=Side(style='thin'),
-                                right=Side(style='thin'),
-                                top=Side(style='thin'),
-                                bottom=Side(style='thin')
-                            )
-
-                    # Сохраняем файл
-                    workbook.save(file_path)
+                    with TIMER.stage("export_selected_columns", columns=len(selected_columns)):
+                        write_rows_streaming(self.data.iter_rows(selected_columns), file_path, selected_columns)
 
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = PDFViewerApp()
     window.show()
+    # Тяжелые библиотеки догружаются в фоне уже после показа окна
+    after_window_shown(app, STARTED, os.path.basename(__file__), ("pandas", "camelot", "openpyxl"))
     sys.exit(app.exec())
 
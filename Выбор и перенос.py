@@ -1,13 +1,21 @@
+import os
 import sys
-import fitz as pymupdf  # PyMuPDF
-import pandas as pd
+import time
+
+# Момент запуска — для замера холодного старта
+STARTED = time.perf_counter()
+
 from PyQt6.QtWidgets import (
-    QApplication, QMainWindow, QVBoxLayout, QWidget, QPushButton, QTableWidget, QTableWidgetItem, QFileDialog, QCheckBox
+    QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QTableView, QFileDialog, QCheckBox, QHeaderView,
+    QLabel, QSpinBox, QLineEdit, QMessageBox, QProgressBar
 )
 from PyQt6.QtCore import Qt
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, Alignment
-import pdfplumber
+from startup import after_window_shown
+from pdf_extract import DEFAULT_WORKERS
+from gui_workers import ExtractionWorker
+from table_model import DataTableModel
+from xlsx_export import select_columns, write_into_workbook
+from xlsx_template import fill_template, parse_anchor
 
 
 class PDFViewerApp(QMainWindow):
@@ -29,10 +37,46 @@ class PDFViewerApp(QMainWindow):
         self.btn_open_pdf.clicked.connect(self.open_pdf)
         self.layout.addWidget(self.btn_open_pdf)
 
+        # Количество процессов для извлечения
+        self.workers_layout = QHBoxLayout()
+        self.workers_layout.addWidget(QLabel("Processes:", self))
+        self.workers_spin = QSpinBox(self)
+        self.workers_spin.setRange(1, 64)
+        self.workers_spin.setValue(DEFAULT_WORKERS)
+        self.workers_layout.addWidget(self.workers_spin)
+
+        # Прогресс извлечения и кнопка отмены
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setVisible(False)
+        self.workers_layout.addWidget(self.progress_bar)
+        self.btn_cancel = QPushButton("Cancel", self)
+        self.btn_cancel.setEnabled(False)
+        self.btn_cancel.clicked.connect(self.cancel_extraction)
+        self.workers_layout.addWidget(self.btn_cancel)
+        self.workers_layout.addStretch()
+        self.layout.addLayout(self.workers_layout)
+
         # Таблица для отображения данных
-        self.table = QTableWidget(self)
+        # Ячейки отдаются представлению моделью только для видимых строк
+        self.model = DataTableModel(self)
+        self.table = QTableView(self)
+        self.table.setModel(self.model)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         self.layout.addWidget(self.table)
 
+        # Куда писать в шаблоне: лист (пусто — первый) и левая верхняя ячейка данных
+        self.template_layout = QHBoxLayout()
+        self.template_layout.addWidget(QLabel("Sheet:", self))
+        self.sheet_edit = QLineEdit(self)
+        self.sheet_edit.setPlaceholderText("first sheet")
+        self.template_layout.addWidget(self.sheet_edit)
+        self.template_layout.addWidget(QLabel("Start cell:", self))
+        self.anchor_edit = QLineEdit("A12", self)
+        self.anchor_edit.setMaximumWidth(80)
+        self.template_layout.addWidget(self.anchor_edit)
+        self.template_layout.addStretch()
+        self.layout.addLayout(self.template_layout)
+
         # Кнопка для экспорта выбранных столбцов
         self.btn_export = QPushButton("Export Selected Columns", self)
         self.btn_export.clicked.connect(self.export_selected_columns)
@@ -41,41 +85,77 @@ class PDFViewerApp(QMainWindow):
         # Переменные для хранения данных
         self.data = None
         self.checkboxes = []
+        self.worker = None
 
     def open_pdf(self):
         # Открываем диалог выбора файла
         file_path, _ = QFileDialog.getOpenFileName(self, "Open PDF File", "", "PDF Files (*.pdf)")
         if file_path:
-            # Распознаем текст из PDF
-            self.data = self.extract_tables_from_pdf(file_path)
-            # Отображаем данные в таблице
-            self.display_data_in_table(self.data)
-
-    def extract_tables_from_pdf(self, file_path):
-        # Используем pdfplumber для извлечения таблиц
-        tables = []
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                tables.extend(page.extract_tables())
-        return tables
-
-    def display_data_in_table(self, data):
-        # Очищаем таблицу
-        self.table.setRowCount(0)
-        self.table.setColumnCount(0)
-
-        # Устанавливаем количество строк и столбцов
-        if data:
-            self.table.setRowCount(len(data))
-            self.table.setColumnCount(len(data[0]))
-
-            # Заполняем таблицу данными
-            for i, row in enumerate(data):
-                for j, item in enumerate(row):
-                    self.table.setItem(i, j, QTableWidgetItem(str(item)))
+            # Таблицы pdfplumber извлекаются в фоновом потоке, окно не замирает
+            self.start_extraction(file_path)
+
+    def start_extraction(self, file_path):
+        self.cancel_extraction()
+
+        # Очищаем таблицу перед приемом новых таблиц
+        self.data = []
+        self.model.clear()
+        self.add_column_checkboxes(0)
+
+        # Страницы делятся между процессами
+        self.worker = ExtractionWorker(file_path, "tables", self.workers_spin.value(), parent=self)
+        self.worker.rows_ready.connect(self.append_tables_to_table)
+        self.worker.progress.connect(self.on_extraction_progress)
+        self.worker.failed.connect(self.on_extraction_failed)
+        self.worker.finished.connect(self.on_extraction_finished)
+
+        self.btn_open_pdf.setEnabled(False)
+        self.btn_export.setEnabled(False)
+        self.btn_cancel.setEnabled(True)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.worker.start()
+
+    def cancel_extraction(self):
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.worker.wait()
+
+    def on_extraction_progress(self, done, total):
+        if self.sender() is not self.worker:
+            return
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(done)
+
+    def on_extraction_failed(self, message):
+        if self.sender() is self.worker:
+            print(f"Error extracting tables: {message}")
+
+    def append_tables_to_table(self, tables):
+        # Дописываем таблицы очередных страниц; сигнал от уже отмененного
+        # потока не трогает текущую таблицу
+        if self.sender() is not self.worker:
+            return
+        self.data.extend(tables)
+        self.model.append_chunk(tables)
+
+    def on_extraction_finished(self):
+        if self.sender() is not self.worker:
+            return
+        self.btn_open_pdf.setEnabled(True)
+        self.btn_export.setEnabled(True)
+        self.btn_cancel.setEnabled(False)
+        self.progress_bar.setVisible(False)
+        self.worker = None
 
+        if self.data:
             # Добавляем чекбоксы для выбора столбцов
-            self.add_column_checkboxes(len(data[0]))
+            self.add_column_checkboxes(len(self.data[0]))
+
+    def closeEvent(self, event):
+        # Не оставляем работающий поток при закрытии окна
+        self.cancel_extraction()
+        super().closeEvent(event)
 
     def add_column_checkboxes(self, num_columns):
         # Очищаем предыдущие чекбоксы
@@ -95,45 +175,28 @@ class PDFViewerApp(QMainWindow):
             # Получаем индексы выбранных столбцов
             selected_columns = [i for i, checkbox in enumerate(self.checkboxes) if checkbox.isChecked()]
             if selected_columns:
-                # Создаем DataFrame с выбранными столбцами
-                df = pd.DataFrame(self.data)
-                df_selected = df.iloc[:, selected_columns]
-
                 # Открываем диалог для выбора Excel-файла
                 file_path, _ = QFileDialog.getSaveFileName(self, "Save File", "", "Excel Files (*.xlsx)")
                 if file_path:
-                    # Загружаем или создаем Excel-файл
+                    df_selected = select_columns(self.data, selected_columns)
+                    anchor = self.anchor_edit.text().strip() or "A12"
                     try:
-                        workbook = load_workbook(file_path)
-                    except FileNotFoundError:
-                        workbook = Workbook()
-
-                    # Выбираем активный лист (или создаем новый)
-                    sheet = workbook.active
-
-                    # Указываем строку, с которой начнется запись данных (например, строка 12)
-                    start_row = 12
-
-                    # Записываем заголовки столбцов
-                    for col_num, header in enumerate(df_selected.columns, 1):
-                        sheet.cell(row=start_row - 1, column=col_num, value=header).font = Font(bold=True)
-
-                    # Записываем данные в Excel, начиная с указанной строки
-                    for i, row in enumerate(df_selected.itertuples(index=False)):
-                        for j, value in enumerate(row):
-                            sheet.cell(row=start_row + i, column=j + 1, value=value)
-
-                    # Выравнивание текста по центру
-                    for row in sheet.iter_rows(min_row=start_row - 1, max_row=start_row + len(df_selected) - 1):
-                        for cell in row:
-                            cell.alignment = Alignment(horizontal='center')
-
-                    # Сохраняем файл
-                    workbook.save(file_path)
+                        start_row, _ = parse_anchor(anchor)
+                        if os.path.exists(file_path):
+                            # Готовый шаблон: меняются только ячейки данных на нужном листе
+                            fill_template(df_selected.itertuples(index=False, name=None), file_path,
+                                          sheet=self.sheet_edit.text().strip() or None, anchor=anchor)
+                        else:
+                            # Новая книга с заголовками над данными
+                            write_into_workbook(df_selected, file_path, start_row=start_row)
+                    except (ValueError, OSError) as e:
+                        QMessageBox.warning(self, "Export", str(e))
 
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = PDFViewerApp()
     window.show()
+    # Тяжелые библиотеки догружаются в фоне уже после показа окна
+    after_window_shown(app, STARTED, os.path.basename(__file__), ("pdfplumber", "pandas", "openpyxl"))
     sys.exit(app.exec())